@@ -0,0 +1,191 @@
+"""
+Vectorized player statistics for the web dashboard
+Player counters are loaded into columnar NumPy arrays once per database version
+"""
+
+import logging
+import threading
+from itertools import chain
+import numpy as np
+
+from backends import SQLiteBackend
+
+logger = logging.getLogger(__name__)
+
+# Column order of the loaded stats matrix
+COLUMNS = ('id', 'wins', 'losses', 'draws', 'kills', 'deaths')
+PERCENTILES = (25, 50, 75, 90, 99)
+
+class StatsAnalytics:
+    """Columnar, cached analytics over the players table"""
+
+    def __init__(self, db_path="duel_lords.db", min_matches_for_leaders=5, backend=None):
+        self.backend = backend or SQLiteBackend(db_path)
+        self.min_matches_for_leaders = min_matches_for_leaders
+        self._lock = threading.Lock()
+        self._conn = None
+        self._version = None
+        self._columns = None
+        self._summary = None
+        self._feed = None
+
+    def follow(self, feed):
+        """Invalidate from a ChangeFeed instead of checking PRAGMA data_version on every query"""
+        self._feed = feed
+        feed.subscribe(self._on_changes)
+
+    def _on_changes(self, changes):
+        if changes.leaderboard:
+            self.invalidate()
+
+    def _connection(self):
+        """Long-lived read connection, so PRAGMA data_version sees other writers"""
+        if self._conn is None:
+            self._conn = self.backend.connect()
+        return self._conn
+
+    def _load(self):
+        """Load active player counters into one int64 array per column"""
+        cursor = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM players WHERE is_active = 1"
+        )
+        # One scan straight into a flat array; a separate COUNT(*) could see a different
+        # number of rows than the SELECT when a write commits in between
+        flat = np.fromiter(chain.from_iterable(cursor), dtype=np.int64)
+        # End the read so PostgreSQL does not hold its snapshot until the next load
+        self._connection().commit()
+        matrix = flat.reshape(-1, len(COLUMNS))
+        return {name: np.ascontiguousarray(matrix[:, i]) for i, name in enumerate(COLUMNS)}
+
+    def _refresh(self):
+        """Reload arrays and drop computed results if the database changed"""
+        if self._feed is not None:
+            if self._columns is None:
+                self._columns = self._load()
+                self._summary = None
+            return self._columns
+        version = self.backend.data_version(self._connection())
+        if version != self._version or self._columns is None:
+            self._columns = self._load()
+            self._summary = None
+            self._version = version
+        return self._columns
+
+    def invalidate(self):
+        """Force a reload on the next query"""
+        with self._lock:
+            self._columns = None
+            self._summary = None
+
+    def summary(self, leaders=10):
+        """Aggregates, percentiles, win-rate distribution and K/D leaders"""
+        with self._lock:
+            try:
+                columns = self._refresh()
+            except self.backend.Error as e:
+                logger.error(f"Error loading player stats: {e}")
+                return self._empty_summary()
+
+            if self._summary is None or self._summary['_leaders'] != leaders:
+                self._summary = self._compute(columns, leaders)
+            return {key: value for key, value in self._summary.items() if not key.startswith('_')}
+
+    def _compute(self, columns, leaders):
+        """Vectorized computation of every dashboard figure"""
+        wins = columns['wins']
+        losses = columns['losses']
+        draws = columns['draws']
+        kills = columns['kills']
+        deaths = columns['deaths']
+        matches = wins + losses + draws
+        played = matches > 0
+
+        win_rate = np.divide(wins * 100.0, matches, out=np.zeros(len(wins)), where=played)
+        kd_ratio = kills / np.maximum(deaths, 1)
+
+        # Each match is counted once per participant
+        total_matches = int(matches.sum())
+        summary = {
+            '_leaders': leaders,
+            'totals': {
+                'players': int(len(wins)),
+                'active_players': int(played.sum()),
+                'wins': int(wins.sum()),
+                'losses': int(losses.sum()),
+                'draws': int(draws.sum()),
+                'kills': int(kills.sum()),
+                'deaths': int(deaths.sum()),
+                'matches': total_matches,
+            },
+            'averages': {
+                'win_rate': round(float(win_rate[played].mean()), 2) if played.any() else 0.0,
+                'kd_ratio': round(float(kd_ratio[played].mean()), 2) if played.any() else 0.0,
+                'kills_per_match': round(float(kills.sum() / total_matches), 2) if total_matches else 0.0,
+            },
+            'percentiles': self._percentiles(win_rate[played], kd_ratio[played], kills[played]),
+        }
+
+        histogram, edges = np.histogram(win_rate[played], bins=10, range=(0, 100))
+        summary['win_rate_distribution'] = {
+            'labels': [f"{int(low)}-{int(high)}%" for low, high in zip(edges[:-1], edges[1:])],
+            'counts': histogram.tolist(),
+        }
+
+        summary['kd_leaders'] = self._kd_leaders(
+            columns['id'], kd_ratio, kills, deaths, matches, leaders
+        )
+        return summary
+
+    @staticmethod
+    def _percentiles(win_rate, kd_ratio, kills):
+        """Percentile table for the main per-player metrics"""
+        result = {}
+        for name, values in (('win_rate', win_rate), ('kd_ratio', kd_ratio), ('kills', kills)):
+            if len(values) == 0:
+                result[name] = {f"p{p}": 0 for p in PERCENTILES}
+                continue
+            points = np.percentile(values, PERCENTILES)
+            result[name] = {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, points)}
+        return result
+
+    def _kd_leaders(self, ids, kd_ratio, kills, deaths, matches, leaders):
+        """Top K/D ratios among players with enough matches"""
+        eligible = np.flatnonzero(matches >= self.min_matches_for_leaders)
+        if len(eligible) == 0 or leaders <= 0:
+            return []
+
+        scores = kd_ratio[eligible]
+        if len(eligible) > leaders:
+            top = np.argpartition(-scores, leaders - 1)[:leaders]
+        else:
+            top = np.arange(len(eligible))
+        # Order by K/D, then kills, both descending
+        top = top[np.lexsort((-kills[eligible][top], -scores[top]))]
+        rows = eligible[top]
+
+        leader_ids = [int(player_id) for player_id in ids[rows]]
+        placeholders = ', '.join('?' * len(leader_ids))
+        names = dict(self._connection().execute(
+            f'SELECT id, username FROM players WHERE id IN ({placeholders})', leader_ids
+        ).fetchall())
+
+        return [{
+            'username': names.get(player_id, 'Unknown'),
+            'kd_ratio': round(float(kd_ratio[row]), 2),
+            'kills': int(kills[row]),
+            'deaths': int(deaths[row]),
+            'matches': int(matches[row]),
+        } for player_id, row in zip(leader_ids, rows)]
+
+    @staticmethod
+    def _empty_summary():
+        """Summary shape returned when the stats cannot be loaded"""
+        return {
+            'totals': {key: 0 for key in ('players', 'active_players', 'wins', 'losses',
+                                          'draws', 'kills', 'deaths', 'matches')},
+            'averages': {'win_rate': 0.0, 'kd_ratio': 0.0, 'kills_per_match': 0.0},
+            'percentiles': {name: {f"p{p}": 0 for p in PERCENTILES}
+                            for name in ('win_rate', 'kd_ratio', 'kills')},
+            'win_rate_distribution': {'labels': [], 'counts': []},
+            'kd_leaders': [],
+        }
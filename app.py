@@ -1,8 +1,14 @@
 import os
-from flask import Flask, render_template, jsonify
+import hmac
+import mimetypes
+from flask import (Flask, Response, render_template, jsonify, request, stream_with_context, send_from_directory,
+                   send_file, url_for)
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select, func
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from backends import sqlalchemy_url
+from assets import DIST_DIR, IMMUTABLE_CACHE, COMPRESS_MIN_SIZE, accepted_encoding, compress_response, load_manifest
 
 class Base(DeclarativeBase):
     pass
@@ -15,7 +21,8 @@ app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-prod
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
 # Configure the database
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///duel_lords.db"
+# Same database as the bot: its SQLite file, or PostgreSQL when DATABASE_URL is set
+app.config["SQLALCHEMY_DATABASE_URI"] = sqlalchemy_url('duel_lords.db')
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
@@ -24,36 +31,163 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 # Initialize the app with the extension
 db.init_app(app)
 
+# Fingerprinted asset names from `python main.py assets`; plain static files are used until it has run
+ASSET_MANIFEST = load_manifest()
+COMPRESS_THRESHOLD = int(os.environ.get('COMPRESS_MIN_SIZE', COMPRESS_MIN_SIZE))
+
+_data_manager = None
+_analytics = None
+_change_feed = None
+_cards = None
+
+# Rendered pages that only depend on player rows, dropped by the change feed
+_page_cache = {}
+_page_generation = 0
+
+def get_data_manager():
+    """Shared DatabaseManager for endpoints that read the bot's tables"""
+    global _data_manager, _change_feed
+    if _data_manager is None:
+        from database import DatabaseManager
+        from changefeed import ChangeFeed
+        manager = DatabaseManager()
+        manager.ensure_schema()
+        # Writes made by the bot process evict this process's caches
+        feed = ChangeFeed(backend=manager.backend)
+        feed.subscribe(manager.apply_changes)
+        feed.subscribe(evict_pages)
+        feed.start()
+        _change_feed = feed
+        _data_manager = manager
+    return _data_manager
+
+def get_analytics():
+    """Shared columnar stats cache, reloaded when the change feed reports player changes"""
+    global _analytics
+    if _analytics is None:
+        from analytics import StatsAnalytics
+        analytics = StatsAnalytics(backend=get_data_manager().backend)
+        analytics.follow(_change_feed)
+        _analytics = analytics
+    return _analytics
+
+def get_card_renderer():
+    """Shared card renderer, writing to the same on-disk cache as the bot"""
+    global _cards
+    if _cards is None:
+        from cards import card_renderer_from_env
+        renderer = card_renderer_from_env(get_data_manager())
+        _change_feed.subscribe(renderer.on_changes)
+        _cards = renderer
+    return _cards
+
+def evict_pages(changes):
+    """Change feed subscriber: drop rendered pages once any player row changed"""
+    global _page_generation
+    if changes.leaderboard:
+        _page_generation += 1
+        _page_cache.clear()
+
+def cached_page(name, render):
+    """Rendered page from memory, rendering it on first use after an eviction"""
+    page = _page_cache.get(name)
+    if page is None:
+        generation = _page_generation
+        page = render()
+        # A change that landed while rendering may not be in this copy
+        if generation == _page_generation:
+            _page_cache[name] = page
+    return page
+
+@app.before_request
+def ensure_schema():
+    """Make sure the bot's tables exist before requests are served"""
+    get_data_manager()
+
+@app.after_request
+def compress(response):
+    """Gzip or brotli-compress large text responses the client can decode"""
+    return compress_response(response, request.headers.get('Accept-Encoding', ''), COMPRESS_THRESHOLD)
+
+@app.template_global()
+def asset_url(name):
+    """URL of the built, fingerprinted copy of a static file, if there is one"""
+    built = ASSET_MANIFEST.get(name)
+    if built is None:
+        return url_for('static', filename=name)
+    return url_for('built_asset', filename=built)
+
+@app.route('/assets/<path:filename>')
+def built_asset(filename):
+    """Serve a fingerprinted asset, precompressed when possible, cached for a year"""
+    encoding = accepted_encoding(request.headers.get('Accept-Encoding', ''))
+    suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding)
+    variant = filename
+    if suffix and os.path.isfile(os.path.join(DIST_DIR, filename + suffix)):
+        variant = filename + suffix
+    else:
+        encoding = None
+    
+    response = send_from_directory(DIST_DIR, variant, mimetype=mimetypes.guess_type(filename)[0])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+        # Keep the .gz/.br file name out of the response
+        del response.headers['Content-Disposition']
+    response.vary.add('Accept-Encoding')
+    # The name changes whenever the content does, so clients never need to revalidate
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE
+    return response
+
+def top_player_rows(limit):
+    """Top players by wins as PlayerRow tuples, without building ORM entities"""
+    from models import Player
+    from rows import PlayerRow
+    
+    query = select(*(getattr(Player, field) for field in PlayerRow._fields)).order_by(
+        Player.wins.desc(), 
+        Player.kills.desc()
+    ).limit(limit)
+    return [PlayerRow._make(row) for row in db.session.execute(query)]
+
 @app.route('/')
 def index():
     """Homepage showing leaderboard and players"""
     from models import Player
     
-    with app.app_context():
-        # Get top players by wins
-        top_players = Player.query.order_by(
-            Player.wins.desc(), 
-            Player.kills.desc()
-        ).limit(10).all()
-        
-        # Get total player count
-        total_players = Player.query.count()
-        
-        return render_template('index.html', players=top_players, total_players=total_players)
+    def render():
+        with app.app_context():
+            # Get top players by wins
+            top_players = top_player_rows(10)
+            
+            # Get total player count
+            total_players = db.session.scalar(select(func.count(Player.id)))
+            
+            return render_template('index.html', players=top_players, total_players=total_players)
+    
+    return cached_page('index', render)
 
 @app.route('/leaderboard')
 def leaderboard():
     """Leaderboard page"""
-    from models import Player
+    def render():
+        with app.app_context():
+            # Get top players by wins
+            top_players = top_player_rows(20)
+            
+            return render_template('leaderboard.html', players=top_players, summary=get_analytics().summary())
     
-    with app.app_context():
-        # Get top players by wins
-        top_players = Player.query.order_by(
-            Player.wins.desc(), 
-            Player.kills.desc()
-        ).limit(20).all()
-        
-        return render_template('leaderboard.html', players=top_players)
+    return cached_page('leaderboard', render)
+
+@app.route('/stats')
+def stats():
+    """Tournament statistics dashboard"""
+    return render_template('stats.html', summary=get_analytics().summary())
+
+@app.route('/api/stats')
+def api_stats():
+    """Tournament statistics as JSON"""
+    leaders = request.args.get('leaders', 10, type=int)
+    return jsonify(get_analytics().summary(leaders=max(0, min(leaders, 100))))
 
 @app.route('/api/status')
 def api_status():
@@ -61,15 +195,107 @@ def api_status():
     return jsonify({
         'status': 'online',
         'bot': 'Duel Lords',
-        'message': 'Bot is running successfully!'
+        'message': 'Bot is running successfully!',
+        'change_feed': _change_feed.stats() if _change_feed is not None else None,
+        'cards': _cards.stats() if _cards is not None else None,
+        'writer': _data_manager.writer.stats() if _data_manager is not None else None
     })
 
+@app.route('/api/players/<discord_id>/sparkline')
+def api_player_sparkline(discord_id):
+    """Rank history series for a player, read from the packed history blob"""
+    limit = request.args.get('limit', 90, type=int)
+    points = get_data_manager().get_rank_history(discord_id, limit=max(1, min(limit, 365)))
+    
+    return jsonify({
+        'discord_id': discord_id,
+        'timestamps': [point['taken_at'].isoformat() + 'Z' for point in points],
+        'ranks': [point['rank'] for point in points],
+        'wins': [point['wins'] for point in points],
+        'kills': [point['kills'] for point in points]
+    })
+
+@app.route('/api/seasons')
+def api_season():
+    """Final standings and awards of a finished season, the latest by default"""
+    from seasons import season_report
+    season_id = request.args.get('season', type=int)
+    limit = request.args.get('limit', 20, type=int)
+    report = season_report(get_data_manager(), season_id, limit=max(1, min(limit, 500)))
+    if report is None:
+        return jsonify({'error': 'Season not found or not finished'}), 404
+    return jsonify(report)
+
+@app.route('/cards/leaderboard.png')
+def leaderboard_card():
+    """Leaderboard card image, the same file the bot attaches"""
+    cards = get_card_renderer()
+    path = cards.leaderboard_card(get_data_manager().get_leaderboard(), wait=True)
+    if path is None:
+        return jsonify({'error': 'The card could not be rendered'}), 500
+    return send_file(path, mimetype='image/png', max_age=60)
+
+@app.route('/cards/players/<discord_id>.png')
+def player_card(discord_id):
+    """Stat card image for one player"""
+    cards = get_card_renderer()
+    player = get_data_manager().get_player(discord_id)
+    if player is None:
+        return jsonify({'error': 'Player not found'}), 404
+    path = cards.player_card(player, wait=True)
+    if path is None:
+        return jsonify({'error': 'The card could not be rendered'}), 500
+    return send_file(path, mimetype='image/png', max_age=60)
+
+@app.route('/api/players/search')
+def api_player_search():
+    """Fuzzy player search by username"""
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 10, type=int)
+    if not query:
+        return jsonify({'query': query, 'results': []})
+    
+    results = get_data_manager().search_players(query, limit=max(1, min(limit, 50)))
+    return jsonify({'query': query, 'results': results})
+
+@app.route('/api/export/<any(players, matches):kind>')
+def api_export(kind):
+    """Stream a full table export as CSV or NDJSON, optionally gzipped"""
+    from export import FORMATS, export_stream, export_filename, next_cursor
+    
+    # Exports hold every Discord ID, so without a configured token there is no endpoint
+    token = os.environ.get('EXPORT_TOKEN', '')
+    if not token:
+        return jsonify({'error': 'Exports are disabled; set EXPORT_TOKEN to enable them'}), 404
+    supplied = request.args.get('token') or request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+        return jsonify({'error': 'A valid export token is required'}), 401
+    
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Unsupported format '{fmt}', use csv or ndjson"}), 400
+    compress = request.args.get('gzip', '0').lower() in ('1', 'true', 'yes')
+    after = max(0, request.args.get('after', 0, type=int))
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit < 1:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    
+    manager = get_data_manager()
+    headers = {
+        'Content-Disposition': f'attachment; filename="{export_filename(kind, fmt, compress)}"',
+        'X-Accel-Buffering': 'no'
+    }
+    if limit is not None:
+        resume = next_cursor(manager.db_path, kind, after, limit, backend=manager.backend)
+        if resume is not None:
+            headers['X-Export-Next-After'] = str(resume)
+    
+    mimetype = 'application/gzip' if compress else FORMATS[fmt][0]
+    chunks = export_stream(manager.db_path, kind, fmt, after=after, limit=limit, compress=compress,
+                           backend=manager.backend)
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
 @app.route('/keep_alive')
 def keep_alive():
     """Keep-alive endpoint for monitoring services"""
     return jsonify({'status': 'alive', 'message': 'Duel Lords bot is running!'})
-
-with app.app_context():
-    # Import models to ensure tables are created
-    import models
-    db.create_all()
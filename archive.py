@@ -0,0 +1,107 @@
+"""
+Archival of rows the live queries no longer need
+Removed players and finished matches older than a cutoff are moved, in small batches, from
+the hot tables into players_archive and matches_archive with their ids unchanged. The
+players_all and matches_all views read both, so archived records stay queryable.
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from database import ARCHIVE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Rows each table gives up to its archive; the hot table is aliased as h
+ARCHIVE_CONDITIONS = {
+    # Players with a match still scheduled stay until it is played or cancelled
+    'players': '''
+        h.is_active = 0 AND h.id NOT IN (
+            SELECT player1_id FROM matches WHERE status = 'scheduled'
+            UNION
+            SELECT player2_id FROM matches WHERE status = 'scheduled'
+        )
+    ''',
+    'matches': "h.status IN ('completed', 'cancelled') AND h.scheduled_time < ?",
+}
+
+class ArchiveResult(NamedTuple):
+    """Outcome of one archive run"""
+    players: int
+    matches: int
+    hot_players: int
+    hot_matches: int
+    duration: float
+
+class ArchiveManager:
+    """Moves cold rows out of the hot tables a batch per transaction"""
+
+    def __init__(self, db_manager, match_age_days: int = 30, batch_size: int = 500):
+        self.db = db_manager
+        self.match_age_days = match_age_days
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+
+    def _move(self, table: str, params=()) -> int:
+        """Archive every row of table matching its condition; returns how many moved"""
+        archived = ARCHIVE_COLUMNS[table]
+
+        def move_batch(cursor):
+            cursor.execute(f'''
+                INSERT INTO {table}_archive ({archived}, archived_at)
+                SELECT {archived}, CURRENT_TIMESTAMP FROM {table} h
+                WHERE {ARCHIVE_CONDITIONS[table]}
+                ORDER BY h.id
+                LIMIT ?
+                RETURNING id
+            ''', (*params, self.batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            if ids:
+                cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join('?' * len(ids))})", ids)
+            return len(ids)
+
+        moved = 0
+        while True:
+            # One write per batch, so other writes queued meanwhile are not held up for long
+            count = self.db.write(move_batch)
+            moved += count
+            if count < self.batch_size:
+                return moved
+
+    def run(self) -> ArchiveResult:
+        """Archive removed players and old finished matches, recording the run"""
+        with self._lock:
+            started = time.perf_counter()
+            cutoff = datetime.utcnow() - timedelta(days=self.match_age_days)
+            # Matches first, so players whose last match was just archived are not held back by it
+            matches = self._move('matches', (cutoff,))
+            players = self._move('players')
+
+            def record_run(cursor):
+                cursor.execute('SELECT (SELECT COUNT(*) FROM players), (SELECT COUNT(*) FROM matches)')
+                hot_players, hot_matches = cursor.fetchone()
+                duration = time.perf_counter() - started
+                cursor.execute('''
+                    INSERT INTO archive_runs (players, matches, hot_players, hot_matches, duration)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (players, matches, hot_players, hot_matches, duration))
+                return hot_players, hot_matches, duration
+
+            hot_players, hot_matches, duration = self.db.write(record_run)
+
+        result = ArchiveResult(players, matches, hot_players, hot_matches, duration)
+        logger.info(f"Archived {players} players and {matches} matches in {duration:.2f}s; "
+                    f"{hot_players} players and {hot_matches} matches remain in the hot tables")
+        return result
+
+def archive_manager_from_env(db_manager) -> ArchiveManager:
+    """ArchiveManager configured from the ARCHIVE_* environment variables"""
+    return ArchiveManager(
+        db_manager,
+        match_age_days=int(os.getenv('ARCHIVE_MATCHES_AFTER_DAYS', '30')),
+        batch_size=int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+    )
@@ -0,0 +1,293 @@
+"""
+Web dashboard served by aiohttp on the Discord bot's own event loop
+Used by the `async` run mode: handlers share the bot's DatabaseManager and caches and
+read live gateway state directly, without crossing threads
+"""
+
+import os
+import hmac
+import math
+import asyncio
+import logging
+import threading
+import mimetypes
+
+from aiohttp import web
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from assets import (STATIC_DIR, DIST_DIR, IMMUTABLE_CACHE, COMPRESS_MIN_SIZE, COMPRESSIBLE_TYPES,
+                    accepted_encoding, compress, load_manifest)
+from analytics import StatsAnalytics
+from seasons import season_report
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+BOT_KEY = web.AppKey('bot', object)
+ANALYTICS_KEY = web.AppKey('analytics', StatsAnalytics)
+TEMPLATES_KEY = web.AppKey('templates', Environment)
+COMPRESS_MIN_SIZE_KEY = web.AppKey('compress_min_size', int)
+
+def build_templates(manifest: dict) -> Environment:
+    """Jinja environment for the Flask templates, with the same asset_url helper"""
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=select_autoescape(['html'])
+    )
+    env.globals['asset_url'] = lambda name: (
+        f"/assets/{manifest[name]}" if name in manifest else f"/static/{name}"
+    )
+    return env
+
+def render(request: web.Request, template: str, **context) -> web.Response:
+    """Render a template into an HTML response"""
+    html = request.app[TEMPLATES_KEY].get_template(template).render(**context)
+    return web.Response(text=html, content_type='text/html')
+
+@web.middleware
+async def compression_middleware(request: web.Request, handler):
+    """Gzip or brotli-compress large text responses the client can decode"""
+    response = await handler(request)
+    if (not isinstance(response, web.Response) or response.status != 200
+            or 'Content-Encoding' in response.headers
+            or not response.content_type.startswith(COMPRESSIBLE_TYPES)):
+        return response
+
+    response.headers.add('Vary', 'Accept-Encoding')
+    encoding = accepted_encoding(request.headers.get('Accept-Encoding', ''))
+    body = response.body
+    if encoding is None or not isinstance(body, bytes) or len(body) < request.app[COMPRESS_MIN_SIZE_KEY]:
+        return response
+
+    response.body = compress(body, encoding)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+async def index(request: web.Request):
+    """Homepage showing leaderboard and players"""
+    bot = request.app[BOT_KEY]
+    players = await asyncio.to_thread(bot.db.get_leaderboard, 10)
+    summary = await asyncio.to_thread(request.app[ANALYTICS_KEY].summary)
+    return render(request, 'index.html', players=players, total_players=summary['totals']['players'])
+
+async def leaderboard(request: web.Request):
+    """Leaderboard page"""
+    bot = request.app[BOT_KEY]
+    players = await asyncio.to_thread(bot.db.get_leaderboard, 20)
+    summary = await asyncio.to_thread(request.app[ANALYTICS_KEY].summary)
+    return render(request, 'leaderboard.html', players=players, summary=summary)
+
+async def stats(request: web.Request):
+    """Tournament statistics dashboard"""
+    summary = await asyncio.to_thread(request.app[ANALYTICS_KEY].summary)
+    return render(request, 'stats.html', summary=summary)
+
+def query_int(request: web.Request, name: str, default: int) -> int:
+    """Integer query parameter, falling back to default like Flask's type=int"""
+    try:
+        return int(request.query.get(name, default))
+    except ValueError:
+        return default
+
+async def api_stats(request: web.Request):
+    """Tournament statistics as JSON"""
+    leaders = max(0, min(query_int(request, 'leaders', 10), 100))
+    summary = await asyncio.to_thread(request.app[ANALYTICS_KEY].summary, leaders)
+    return web.json_response(summary)
+
+def gateway_status(bot) -> dict:
+    """Live connection state of the bot, read on its own loop"""
+    latency = bot.latency
+    ready = bot.is_ready() and not bot.is_closed()
+    shards = [
+        {
+            'id': shard_id,
+            'latency_ms': None if math.isnan(shard_latency) or math.isinf(shard_latency)
+                          else round(shard_latency * 1000, 1),
+        }
+        for shard_id, shard_latency in getattr(bot, 'latencies', [(bot.shard_id or 0, latency)])
+    ]
+    return {
+        'status': 'online' if ready else ('offline' if bot.is_closed() else 'starting'),
+        'bot': 'Duel Lords',
+        'latency_ms': shards[0]['latency_ms'] if len(shards) == 1 else None,
+        'guilds': len(bot.guilds),
+        'shard_count': bot.shard_count or 1,
+        'shards': shards,
+        'ws_ratelimited': bot.is_ws_ratelimited() if ready else False,
+        'background_tasks_pending': bot.tasks.pending(),
+        'change_feed': bot.changes.stats(),
+        'cards': bot.cards.stats(),
+        'writer': bot.db.writer.stats(),
+        'pinned_leaderboards': bot.pinned.stats(),
+    }
+
+async def api_status(request: web.Request):
+    """Bot status with gateway latency and shard health"""
+    status = gateway_status(request.app[BOT_KEY])
+    return web.json_response(status, status=200 if status['status'] == 'online' else 503)
+
+async def api_player_sparkline(request: web.Request):
+    """Rank history series for a player, read from the packed history blob"""
+    discord_id = request.match_info['discord_id']
+    limit = max(1, min(query_int(request, 'limit', 90), 365))
+    points = await asyncio.to_thread(request.app[BOT_KEY].db.get_rank_history, discord_id, limit=limit)
+
+    return web.json_response({
+        'discord_id': discord_id,
+        'timestamps': [point['taken_at'].isoformat() + 'Z' for point in points],
+        'ranks': [point['rank'] for point in points],
+        'wins': [point['wins'] for point in points],
+        'kills': [point['kills'] for point in points]
+    })
+
+async def api_season(request: web.Request):
+    """Final standings and awards of a finished season, the latest by default"""
+    season_id = query_int(request, 'season', 0) or None
+    limit = max(1, min(query_int(request, 'limit', 20), 500))
+    report = await asyncio.to_thread(season_report, request.app[BOT_KEY].db, season_id, limit)
+    if report is None:
+        return web.json_response({'error': 'Season not found or not finished'}, status=404)
+    return web.json_response(report)
+
+async def api_export(request: web.Request):
+    """Stream a full table export as CSV or NDJSON, optionally gzipped"""
+    from export import FORMATS, export_stream, export_filename, next_cursor
+
+    # Exports hold every Discord ID, so without a configured token there is no endpoint
+    token = os.environ.get('EXPORT_TOKEN', '')
+    if not token:
+        return web.json_response({'error': 'Exports are disabled; set EXPORT_TOKEN to enable them'}, status=404)
+    supplied = request.query.get('token') or request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+        return web.json_response({'error': 'A valid export token is required'}, status=401)
+
+    kind = request.match_info['kind']
+    fmt = request.query.get('format', 'csv').lower()
+    if fmt not in FORMATS:
+        return web.json_response({'error': f"Unsupported format '{fmt}', use csv or ndjson"}, status=400)
+    compress = request.query.get('gzip', '0').lower() in ('1', 'true', 'yes')
+    after = max(0, query_int(request, 'after', 0))
+    limit = query_int(request, 'limit', 0) if 'limit' in request.query else None
+    if limit is not None and limit < 1:
+        return web.json_response({'error': 'limit must be a positive integer'}, status=400)
+
+    manager = request.app[BOT_KEY].db
+    response = web.StreamResponse(headers={
+        'Content-Type': 'application/gzip' if compress else FORMATS[fmt][0],
+        'Content-Disposition': f'attachment; filename="{export_filename(kind, fmt, compress)}"',
+        'X-Accel-Buffering': 'no'
+    })
+    if limit is not None:
+        resume = await asyncio.to_thread(next_cursor, manager.db_path, kind, after, limit,
+                                         backend=manager.backend)
+        if resume is not None:
+            response.headers['X-Export-Next-After'] = str(resume)
+
+    chunks = export_stream(manager.db_path, kind, fmt, after=after, limit=limit, compress=compress,
+                           backend=manager.backend)
+    # Each batch is read off the loop (the connection is not tied to one thread); the lock
+    # makes closing after a client disconnect wait for a read that is still running
+    lock = threading.Lock()
+
+    def step():
+        with lock:
+            return next(chunks, None)
+
+    def close():
+        with lock:
+            chunks.close()
+
+    await response.prepare(request)
+    try:
+        while (chunk := await asyncio.to_thread(step)) is not None:
+            await response.write(chunk)
+    finally:
+        await asyncio.to_thread(close)
+    await response.write_eof()
+    return response
+
+def card_response(path) -> web.StreamResponse:
+    """Serve a rendered card file, or a JSON error if rendering failed"""
+    if path is None:
+        return web.json_response({'error': 'The card could not be rendered'}, status=500)
+    return web.FileResponse(path, headers={'Content-Type': 'image/png', 'Cache-Control': 'public, max-age=60'})
+
+async def leaderboard_card(request: web.Request):
+    """Leaderboard card image, the same file the bot attaches"""
+    bot = request.app[BOT_KEY]
+    players = await asyncio.to_thread(bot.db.get_leaderboard)
+    return card_response(await asyncio.to_thread(bot.cards.leaderboard_card, players, True))
+
+async def player_card(request: web.Request):
+    """Stat card image for one player"""
+    bot = request.app[BOT_KEY]
+    player = await asyncio.to_thread(bot.db.get_player, request.match_info['discord_id'])
+    if player is None:
+        return web.json_response({'error': 'Player not found'}, status=404)
+    return card_response(await asyncio.to_thread(bot.cards.player_card, player, True))
+
+async def api_player_search(request: web.Request):
+    """Fuzzy player search by username"""
+    query = request.query.get('q', '').strip()
+    limit = max(1, min(query_int(request, 'limit', 10), 50))
+    if not query:
+        return web.json_response({'query': query, 'results': []})
+
+    # Served from the bot's in-memory index, so no thread hop is needed
+    results = request.app[BOT_KEY].db.search_players(query, limit=limit)
+    return web.json_response({'query': query, 'results': results})
+
+async def keep_alive(request: web.Request):
+    """Keep-alive endpoint for monitoring services"""
+    return web.json_response({'status': 'alive', 'message': 'Duel Lords bot is running!'})
+
+async def built_asset(request: web.Request):
+    """Serve a fingerprinted asset, precompressed when possible, cached for a year"""
+    filename = request.match_info['filename']
+    path = os.path.join(DIST_DIR, filename)
+    if os.path.dirname(os.path.abspath(path)) != os.path.abspath(DIST_DIR) or not os.path.isfile(path):
+        raise web.HTTPNotFound()
+
+    encoding = accepted_encoding(request.headers.get('Accept-Encoding', ''))
+    suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding)
+    headers = {'Cache-Control': IMMUTABLE_CACHE, 'Vary': 'Accept-Encoding',
+               'Content-Type': mimetypes.guess_type(filename)[0] or 'application/octet-stream'}
+    if suffix and os.path.isfile(path + suffix):
+        path += suffix
+        headers['Content-Encoding'] = encoding
+    return web.FileResponse(path, headers=headers)
+
+def create_app(bot) -> web.Application:
+    """aiohttp application bound to a running DuelLordsBot"""
+    app = web.Application(middlewares=[compression_middleware])
+    app[BOT_KEY] = bot
+    app[ANALYTICS_KEY] = StatsAnalytics(backend=bot.db.backend)
+    app[ANALYTICS_KEY].follow(bot.changes)
+    app[TEMPLATES_KEY] = build_templates(load_manifest())
+    app[COMPRESS_MIN_SIZE_KEY] = int(os.getenv('COMPRESS_MIN_SIZE', COMPRESS_MIN_SIZE))
+
+    app.router.add_get('/', index)
+    app.router.add_get('/leaderboard', leaderboard)
+    app.router.add_get('/stats', stats)
+    app.router.add_get('/api/stats', api_stats)
+    app.router.add_get('/api/status', api_status)
+    app.router.add_get('/api/players/search', api_player_search)
+    app.router.add_get('/api/players/{discord_id}/sparkline', api_player_sparkline)
+    app.router.add_get('/api/seasons', api_season)
+    app.router.add_get(r'/api/export/{kind:players|matches}', api_export)
+    app.router.add_get('/cards/leaderboard.png', leaderboard_card)
+    app.router.add_get('/cards/players/{discord_id}.png', player_card)
+    app.router.add_get('/keep_alive', keep_alive)
+    app.router.add_get('/assets/{filename}', built_asset)
+    app.router.add_static('/static', STATIC_DIR)
+    return app
+
+async def start_web(bot, host: str = '0.0.0.0', port: int = 5000) -> web.AppRunner:
+    """Serve the dashboard on the current (bot) event loop; returns the runner to clean up"""
+    runner = web.AppRunner(create_app(bot), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Async web dashboard listening on {host}:{port}")
+    return runner
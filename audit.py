@@ -0,0 +1,212 @@
+"""
+Append-only audit log of admin actions
+Events are queued in memory and written in batches by a background thread, into
+one table per month so old months can be dropped cheaply. The tables live in the main
+database, so on PostgreSQL every replica shares one log
+"""
+
+import re
+import json
+import queue
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "audit_events_"
+PARTITION_NAME = re.compile(rf"^{PARTITION_PREFIX}(\d{{6}})$")
+
+class AuditEvent(NamedTuple):
+    """One recorded admin action"""
+    id: int
+    occurred_at: datetime
+    action: str
+    actor_id: str
+    player_id: Optional[str]
+    opponent_id: Optional[str]
+    details: dict
+
+def partition_for(moment: datetime) -> str:
+    """Monthly table holding events from moment"""
+    return f"{PARTITION_PREFIX}{moment:%Y%m}"
+
+class AuditLog:
+    """Batched, month-partitioned writer and reader for audit events"""
+
+    def __init__(self, backend, flush_interval_ms: int = 250, batch_size: int = 200):
+        self.backend = backend
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+
+        self._queue = queue.SimpleQueue()
+        self._write_lock = threading.Lock()
+        self._partitions = set()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the background writer"""
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, action: str, actor_id, player_id=None, opponent_id=None, **details):
+        """Queue an event; never blocks on the database"""
+        self._queue.put((
+            datetime.now(timezone.utc).replace(tzinfo=None),
+            action,
+            str(actor_id),
+            str(player_id) if player_id is not None else None,
+            str(opponent_id) if opponent_id is not None else None,
+            json.dumps(details, default=str, sort_keys=True)
+        ))
+
+    def _ensure_partition(self, conn, table: str):
+        """Create a month's table and its lookup indexes on first use"""
+        if table in self._partitions:
+            return
+        conn.execute(self.backend.ddl(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                occurred_at TIMESTAMP NOT NULL,
+                action TEXT NOT NULL,
+                actor_id TEXT NOT NULL,
+                player_id TEXT,
+                opponent_id TEXT,
+                details TEXT NOT NULL DEFAULT '{{}}'
+            )
+        '''))
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_time ON {table} (occurred_at)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_actor ON {table} (actor_id, occurred_at)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_player ON {table} (player_id, occurred_at)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_opponent ON {table} (opponent_id, occurred_at)')
+        self._partitions.add(table)
+
+    def flush(self):
+        """Write every queued event, one transaction per batch"""
+        written = 0
+        with self._write_lock:
+            while True:
+                batch = []
+                try:
+                    while len(batch) < self.batch_size:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    pass
+                if not batch:
+                    return written
+
+                by_table = {}
+                for event in batch:
+                    row = (event[0].isoformat(' '),) + event[1:]
+                    by_table.setdefault(partition_for(event[0]), []).append(row)
+
+                try:
+                    conn = self.backend.connect()
+                    try:
+                        for table, events in by_table.items():
+                            self._ensure_partition(conn, table)
+                            conn.executemany(
+                                f'INSERT INTO {table} (occurred_at, action, actor_id, player_id, '
+                                f'opponent_id, details) VALUES (?, ?, ?, ?, ?, ?)',
+                                events
+                            )
+                        conn.commit()
+                    finally:
+                        conn.close()
+                except self.backend.Error as e:
+                    logger.error(f"Error writing {len(batch)} audit events: {e}")
+                    # A restore may have replaced the tables; recheck them and retry next flush
+                    self._partitions.clear()
+                    for event in batch:
+                        self._queue.put(event)
+                    return written
+                written += len(batch)
+
+    def _run(self):
+        """Flush on a short interval until stopped"""
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the writer and persist anything still queued"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def partitions(self, conn):
+        """Existing monthly tables, newest first"""
+        rows = conn.execute(self.backend.list_tables, (f"{PARTITION_PREFIX}%",)).fetchall()
+        return sorted((name for (name,) in rows if PARTITION_NAME.match(name)), reverse=True)
+
+    def query(self, player_id=None, actor_id=None, action=None, since: datetime = None,
+              until: datetime = None, limit: int = 25):
+        """Most recent events matching every given filter, newest first"""
+        # Include events queued by this process that have not been written yet
+        self.flush()
+
+        filters, params = [], []
+        if player_id is not None:
+            filters.append('(player_id = ? OR opponent_id = ?)')
+            params += [str(player_id), str(player_id)]
+        if actor_id is not None:
+            filters.append('actor_id = ?')
+            params.append(str(actor_id))
+        if action is not None:
+            filters.append('action = ?')
+            params.append(action)
+        if since is not None:
+            filters.append('occurred_at >= ?')
+            params.append(since.isoformat(' '))
+        if until is not None:
+            filters.append('occurred_at < ?')
+            params.append(until.isoformat(' '))
+        where = f"WHERE {' AND '.join(filters)}" if filters else ''
+
+        low = partition_for(since) if since else None
+        high = partition_for(until) if until else None
+        events = []
+        conn = self.backend.connect()
+        try:
+            for table in self.partitions(conn):
+                # Months outside the requested range are skipped without being read
+                if (high and table > high) or (low and table < low):
+                    continue
+                rows = conn.execute(
+                    f'SELECT id, occurred_at, action, actor_id, player_id, opponent_id, details '
+                    f'FROM {table} {where} ORDER BY occurred_at DESC, id DESC LIMIT ?',
+                    params + [limit - len(events)]
+                ).fetchall()
+                events.extend(
+                    AuditEvent(row[0], datetime.fromisoformat(row[1]), *row[2:6], json.loads(row[6]))
+                    for row in rows
+                )
+                if len(events) >= limit:
+                    break
+        finally:
+            conn.close()
+        return events
+
+    def drop_before(self, keep_months: int) -> int:
+        """Drop monthly tables older than the newest keep_months months"""
+        now = datetime.now(timezone.utc)
+        month_index = now.year * 12 + now.month - 1 - (keep_months - 1)
+        cutoff = f"{PARTITION_PREFIX}{month_index // 12:04d}{month_index % 12 + 1:02d}"
+
+        dropped = 0
+        with self._write_lock:
+            conn = self.backend.connect()
+            try:
+                for table in self.partitions(conn):
+                    if table < cutoff:
+                        conn.execute(f'DROP TABLE {table}')
+                        self._partitions.discard(table)
+                        dropped += 1
+                conn.commit()
+            finally:
+                conn.close()
+        if dropped:
+            logger.info(f"Dropped {dropped} audit partitions older than {cutoff[len(PARTITION_PREFIX):]}")
+        return dropped
@@ -0,0 +1,455 @@
+"""
+Storage backends for DatabaseManager and the components that read its tables
+SQLite is the default. Setting DATABASE_URL to a postgres:// URL switches to PostgreSQL
+with a bounded connection pool and server-side prepared statements. Both backends hand
+out connections with the sqlite3 interface (`?` placeholders, rows readable by name), so
+queries are written once; the backend supplies the few dialect differences.
+"""
+
+import os
+import re
+import select
+import sqlite3
+import logging
+import threading
+from functools import lru_cache
+from itertools import chain
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psycopg2
+    import psycopg2.pool
+    import psycopg2.extras
+    import psycopg2.extensions
+except ImportError:  # only needed for PostgreSQL
+    psycopg2 = None
+
+# Channel the PostgreSQL change triggers notify on
+CHANGE_CHANNEL = "duel_lords_changes"
+
+class SQLiteBackend:
+    """Single database file opened per operation"""
+
+    name = "sqlite"
+    Error = sqlite3.Error
+    IntegrityError = sqlite3.IntegrityError
+    # Scalar maximum of two values, and the current Unix time with fractions
+    greatest = "MAX"
+    epoch_now = "((julianday('now') - 2440587.5) * 86400.0)"
+    # Two blobs joined; || alone would yield TEXT
+    concat_blobs = "CAST({} || {} AS BLOB)"
+    # Names of the tables matching a LIKE pattern
+    list_tables = "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?"
+
+    def __init__(self, db_path="duel_lords.db"):
+        self.db_path = db_path
+
+    def __repr__(self):
+        return f"SQLiteBackend({self.db_path!r})"
+
+    def connect(self, named_rows: bool = False):
+        """New connection; rows can be read by column name when named_rows is set"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        if named_rows:
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    def schema_version(self, conn) -> int:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def set_schema_version(self, conn, version: int):
+        conn.execute(f'PRAGMA user_version = {int(version)}')
+
+    def data_version(self, conn) -> int:
+        """Counter that moves whenever another connection commits"""
+        return conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def ddl(self, sql: str) -> str:
+        """Table definitions are written in SQLite's dialect"""
+        return sql
+
+    def change_triggers(self, table: str, key: str):
+        """Statements that log every write to table into change_log"""
+        return [f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_change
+            AFTER {event} ON {table}
+            BEGIN
+                INSERT INTO change_log (table_name, row_key) VALUES ('{table}', {row}.{key});
+            END
+        ''' for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD'))]
+
+    def drop_foreign_keys(self, table: str, referenced):
+        """Statements dropping table's foreign keys into the referenced tables"""
+        # Foreign keys are declared but never enforced (PRAGMA foreign_keys is off)
+        return []
+
+    def begin_write(self, cursor):
+        """Open a write transaction, taking the file's write lock up front"""
+        cursor.execute('BEGIN IMMEDIATE')
+
+    def lock_interaction(self, cursor, interaction_id):
+        """Serialize transactions applying the same interaction"""
+        # SQLite has one writer; holding the write lock is enough
+        if not cursor.connection.in_transaction:
+            cursor.execute('BEGIN IMMEDIATE')
+
+    def close(self):
+        pass
+
+class _Statement(NamedTuple):
+    """One query in the forms psycopg2 and PREPARE need"""
+    plain: str       # no parameters, passed through untouched
+    pyformat: str    # `?` as %s and literal % doubled, for client-side binding
+    numbered: str    # `?` as $1, $2, ... for PREPARE
+    preparable: bool
+
+_QUOTED = re.compile(r"('(?:[^']|'')*')")
+
+@lru_cache(maxsize=1024)
+def _translate(sql: str) -> _Statement:
+    """Rewrite sqlite3 placeholders outside string literals"""
+    pyformat, numbered = [], []
+    count = 0
+    for i, part in enumerate(_QUOTED.split(sql)):
+        if i % 2:
+            pyformat.append(part.replace('%', '%%'))
+            numbered.append(part)
+            continue
+        pieces = part.split('?')
+        pyformat.append('%s'.join(piece.replace('%', '%%') for piece in pieces))
+        numbered.append(pieces[0])
+        for piece in pieces[1:]:
+            count += 1
+            numbered.append(f'${count}{piece}')
+    preparable = count > 0 and sql.lstrip().split(None, 1)[0].upper() in ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+    return _Statement(sql, ''.join(pyformat), ''.join(numbered), preparable)
+
+class PostgresRow(tuple):
+    """Row readable by index or column name, like sqlite3.Row"""
+    __slots__ = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._index[key]
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        return list(self._index)
+
+@lru_cache(maxsize=256)
+def _row_type(names):
+    return type('PostgresRow', (PostgresRow,), {'__slots__': (), '_index': {name: i for i, name in enumerate(names)}})
+
+if psycopg2 is not None:
+    # Timestamps come back as text and bytea as bytes, matching what sqlite3 returns
+    _TEXT_TIMESTAMP = psycopg2.extensions.new_type((1114, 1184), 'DUEL_LORDS_TIMESTAMP', lambda value, cursor: value)
+    _BYTES = psycopg2.extensions.new_type(
+        psycopg2.BINARY.values, 'DUEL_LORDS_BYTES',
+        lambda value, cursor: None if value is None else bytes(psycopg2.BINARY(value, cursor))
+    )
+
+    class _PooledConnection(psycopg2.extensions.connection):
+        """psycopg2 connection that remembers the statements prepared on its session"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            psycopg2.extensions.register_type(_TEXT_TIMESTAMP, self)
+            psycopg2.extensions.register_type(_BYTES, self)
+            # SQL text -> statement name, or False when the server could not prepare it
+            self.prepared = {}
+
+class PostgresCursor:
+    """sqlite3-style cursor over a psycopg2 cursor"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.row_factory = PostgresRow if connection.named_rows else None
+        self.rowcount = -1
+        self._cursor = connection.raw.cursor()
+
+    def execute(self, sql: str, params=()):
+        statement = _translate(sql)
+        if not params:
+            self._cursor.execute(statement.plain)
+            self.rowcount = self._cursor.rowcount
+            return self
+        # Like sqlite3, store booleans as integers
+        params = tuple(int(value) if value.__class__ is bool else value for value in params)
+        name = self.connection.prepare(statement) if statement.preparable else None
+        if name:
+            self._cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            self._cursor.execute(statement.pyformat, params)
+        self.rowcount = self._cursor.rowcount
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        """Run the prepared statement for every row, a hundred rows per round trip"""
+        statement = _translate(sql)
+        rows = (tuple(int(value) if value.__class__ is bool else value for value in params)
+                for params in seq_of_params)
+        first = next(rows, None)
+        if first is None:
+            return self
+        name = self.connection.prepare(statement) if statement.preparable else None
+        query = f"EXECUTE {name} ({', '.join(['%s'] * len(first))})" if name else statement.pyformat
+        psycopg2.extras.execute_batch(self._cursor, query, chain((first,), rows), page_size=100)
+        # Unlike sqlite3, batched statements cannot report a total
+        self.rowcount = -1
+        return self
+
+    def _wrap(self, row):
+        if row is None or self.row_factory is None:
+            return row
+        return _row_type(tuple(column.name for column in self._cursor.description))(row)
+
+    def fetchone(self):
+        return self._wrap(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._wrap(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._wrap(row)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+class PostgresConnection:
+    """sqlite3-style connection wrapping one connection checked out of the pool"""
+
+    def __init__(self, backend, raw, named_rows: bool):
+        self.backend = backend
+        self.raw = raw
+        self.named_rows = named_rows
+        self._released = False
+
+    def cursor(self):
+        return PostgresCursor(self)
+
+    def execute(self, sql: str, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def prepare(self, statement: _Statement):
+        """Name of the server-side prepared statement for this query, preparing it once per session"""
+        name = self.raw.prepared.get(statement.plain)
+        if name is None:
+            name = f"dl_{len(self.raw.prepared) + 1}"
+            with self.raw.cursor() as cursor:
+                # A query the server cannot prepare (e.g. untyped parameters) must not abort the transaction
+                cursor.execute('SAVEPOINT duel_lords_prepare')
+                try:
+                    cursor.execute(f'PREPARE {name} AS {statement.numbered}')
+                    cursor.execute('RELEASE SAVEPOINT duel_lords_prepare')
+                except psycopg2.Error as e:
+                    cursor.execute('ROLLBACK TO SAVEPOINT duel_lords_prepare')
+                    logger.warning(f"Could not prepare statement, binding it client-side: {e}")
+                    name = False
+            self.raw.prepared[statement.plain] = name
+        return name
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self.backend.release(self.raw)
+
+class PostgresBackend:
+    """PostgreSQL server shared by every bot and web replica, through a bounded pool"""
+
+    name = "postgresql"
+    greatest = "GREATEST"
+    epoch_now = "(EXTRACT(EPOCH FROM clock_timestamp()))"
+    concat_blobs = "{} || {}"
+    list_tables = "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() AND tablename LIKE ?"
+
+    def __init__(self, url: str, pool_size: int = 10, pool_min: int = 1, pool_timeout: float = 30):
+        if psycopg2 is None:
+            raise RuntimeError("DATABASE_URL points at PostgreSQL but psycopg2 is not installed")
+        self.url = url
+        self.db_path = None
+        self.Error = psycopg2.Error
+        self.IntegrityError = psycopg2.IntegrityError
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        # ThreadedConnectionPool fails instead of waiting when it is exhausted, so gate it
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            pool_min, pool_size, url,
+            connection_factory=_PooledConnection,
+            # Timestamps compare and print in UTC, as CURRENT_TIMESTAMP does in SQLite
+            options='-c timezone=UTC'
+        )
+
+    def __repr__(self):
+        return f"PostgresBackend(pool_size={self.pool_size})"
+
+    def connect(self, named_rows: bool = False) -> PostgresConnection:
+        """Check a connection out of the pool, waiting up to pool_timeout for a free one"""
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            raise psycopg2.pool.PoolError(f"No database connection free after {self.pool_timeout}s")
+        try:
+            raw = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        return PostgresConnection(self, raw, named_rows)
+
+    def release(self, raw):
+        """Return a connection to the pool, dropping any unfinished transaction"""
+        try:
+            broken = bool(raw.closed)
+            if not broken and raw.status != psycopg2.extensions.STATUS_READY:
+                raw.rollback()
+        except psycopg2.Error:
+            broken = True
+        finally:
+            self._pool.putconn(raw, close=broken)
+            self._slots.release()
+
+    def schema_version(self, conn) -> int:
+        row = conn.execute("SELECT to_regclass('bot_meta') IS NOT NULL").fetchone()
+        if not row[0]:
+            return 0
+        row = conn.execute("SELECT value FROM bot_meta WHERE key = 'schema_version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def set_schema_version(self, conn, version: int):
+        conn.execute(
+            "INSERT INTO bot_meta (key, value) VALUES ('schema_version', ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (str(int(version)),)
+        )
+
+    def data_version(self, conn) -> int:
+        """Newest change log entry; moves on every committed write to the cached tables"""
+        conn.commit()
+        return conn.execute('SELECT COALESCE(MAX(id), 0) FROM change_log').fetchone()[0]
+
+    def ddl(self, sql: str) -> str:
+        """Translate a SQLite table definition"""
+        sql = sql.replace('INTEGER PRIMARY KEY AUTOINCREMENT', 'BIGSERIAL PRIMARY KEY')
+        sql = re.sub(r'BOOLEAN DEFAULT ([01])', r'INTEGER DEFAULT \1', sql)
+        sql = sql.replace("BLOB NOT NULL DEFAULT x''", "BYTEA NOT NULL DEFAULT ''::bytea")
+        sql = sql.replace(' REAL ', ' DOUBLE PRECISION ')
+        # Whole seconds in UTC (the session time zone), as SQLite stores them
+        sql = sql.replace('DEFAULT CURRENT_TIMESTAMP', 'DEFAULT LOCALTIMESTAMP(0)')
+        return sql.replace(') WITHOUT ROWID', ')')
+
+    def change_triggers(self, table: str, key: str):
+        """One trigger per table logging writes to change_log and notifying listeners on commit"""
+        return [f'''
+            CREATE OR REPLACE FUNCTION log_change() RETURNS trigger AS $$
+            DECLARE
+                row_key TEXT;
+                entry change_log%ROWTYPE;
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    row_key := to_jsonb(OLD) ->> TG_ARGV[0];
+                ELSE
+                    row_key := to_jsonb(NEW) ->> TG_ARGV[0];
+                END IF;
+                INSERT INTO change_log (table_name, row_key) VALUES (TG_TABLE_NAME, row_key)
+                RETURNING * INTO entry;
+                PERFORM pg_notify('{CHANGE_CHANNEL}',
+                                  entry.id || ' ' || TG_TABLE_NAME || ' ' || entry.changed_at || ' ' || row_key);
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''', f'DROP TRIGGER IF EXISTS {table}_change ON {table}', f'''
+            CREATE TRIGGER {table}_change
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION log_change('{key}')
+        ''']
+
+    def drop_foreign_keys(self, table: str, referenced):
+        """Statements dropping table's foreign keys into the referenced tables"""
+        targets = ', '.join(f"'{name}'::regclass" for name in referenced)
+        return [f'''
+            DO $$
+            DECLARE
+                constraint_name TEXT;
+            BEGIN
+                FOR constraint_name IN
+                    SELECT conname FROM pg_constraint
+                    WHERE conrelid = '{table}'::regclass AND contype = 'f' AND confrelid IN ({targets})
+                LOOP
+                    EXECUTE format('ALTER TABLE {table} DROP CONSTRAINT %I', constraint_name);
+                END LOOP;
+            END
+            $$
+        ''']
+
+    def begin_write(self, cursor):
+        """Open a write transaction; psycopg2 starts one with the first statement"""
+
+    def lock_interaction(self, cursor, interaction_id):
+        """Serialize transactions applying the same interaction"""
+        # Snowflakes fit in a bigint; the lock is released at commit or rollback
+        cursor.execute('SELECT pg_advisory_xact_lock(?)', (int(interaction_id) & 0x7FFFFFFFFFFFFFFF,))
+
+    def listen(self):
+        """Autocommit connection subscribed to change notifications"""
+        raw = psycopg2.connect(self.url)
+        raw.set_session(autocommit=True)
+        raw.cursor().execute(f'LISTEN {CHANGE_CHANNEL}')
+        return raw
+
+    @staticmethod
+    def wait_notifications(raw, timeout: float):
+        """Notification payloads received within timeout"""
+        if select.select([raw], [], [], timeout)[0]:
+            raw.poll()
+        payloads = [notify.payload for notify in raw.notifies]
+        raw.notifies.clear()
+        return payloads
+
+    def close(self):
+        self._pool.closeall()
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def backend_from_env(db_path="duel_lords.db"):
+    """PostgreSQL when DATABASE_URL says so, otherwise SQLite at db_path"""
+    url = os.getenv('DATABASE_URL', '')
+    if not url.startswith(('postgres://', 'postgresql://')):
+        return SQLiteBackend(db_path)
+    # One pool per process and server, shared by every manager
+    with _backends_lock:
+        backend = _backends.get(url)
+        if backend is None:
+            backend = PostgresBackend(
+                url,
+                pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+                pool_min=int(os.getenv('DB_POOL_MIN', '1')),
+                pool_timeout=float(os.getenv('DB_POOL_TIMEOUT', '30'))
+            )
+            _backends[url] = backend
+            logger.info(f"Using PostgreSQL with a pool of {backend.pool_size} connections")
+        return backend
+
+def sqlalchemy_url(db_path="duel_lords.db") -> str:
+    """SQLAlchemy URL for the same database backend_from_env picks"""
+    url = os.getenv('DATABASE_URL', '')
+    if url.startswith(('postgres://', 'postgresql://')):
+        # Name the driver: newer SQLAlchemy defaults to psycopg 3, which is not a dependency
+        return 'postgresql+psycopg2://' + url.split('://', 1)[1]
+    # Absolute, or Flask-SQLAlchemy resolves it against the instance folder
+    return f"sqlite:///{os.path.abspath(db_path)}"
@@ -0,0 +1,72 @@
+"""
+Background task queue for interaction side effects
+DMs, reminder scheduling and similar follow-up work run here, after the
+interaction has already been answered
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class TaskQueue:
+    """Bounded asyncio queue drained by a fixed pool of worker tasks"""
+
+    def __init__(self, workers: int = 4, max_pending: int = 1000, remembered_keys: int = 10000):
+        self.workers = workers
+        self.remembered_keys = remembered_keys
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._tasks = []
+        self._seen_keys = OrderedDict()
+
+    def start(self):
+        """Start the workers on the running event loop"""
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"background-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Background task queue started with {self.workers} workers")
+
+    def submit(self, func, *args, name: str = None, key: str = None, **kwargs) -> bool:
+        """Queue func(*args, **kwargs) to run later; False if full or key was already seen"""
+        if key is not None:
+            if key in self._seen_keys:
+                logger.info(f"Skipping duplicate background task {key}")
+                return False
+            self._seen_keys[key] = True
+            if len(self._seen_keys) > self.remembered_keys:
+                self._seen_keys.popitem(last=False)
+        try:
+            self._queue.put_nowait((name or getattr(func, '__name__', 'task'), func, args, kwargs))
+            return True
+        except asyncio.QueueFull:
+            logger.error(f"Background queue full, dropping {name or func.__name__}")
+            return False
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def _worker(self):
+        """Run queued coroutines one at a time, logging failures"""
+        while True:
+            name, func, args, kwargs = await self._queue.get()
+            try:
+                await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Background task {name} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def close(self, timeout: float = 10):
+        """Let queued work finish for up to timeout seconds, then stop the workers"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping with {self.pending()} background tasks unfinished")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
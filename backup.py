@@ -0,0 +1,209 @@
+"""
+Online backups of the tournament database
+Snapshots are copied with SQLite's backup API in small page batches, so writers
+keep running, then gzipped and rotated. Restores copy a snapshot back the same way.
+"""
+
+import os
+import re
+import glob
+import gzip
+import time
+import shutil
+import sqlite3
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = ".db.gz"
+# Scheduled snapshots end in the timestamp; labelled ones carry a suffix after it
+SCHEDULED_SNAPSHOT = re.compile(r"-\d{8}-\d{6}\.db\.gz$")
+
+class _BackupRestarted(Exception):
+    """Raised from the progress callback when a concurrent write restarts the copy"""
+    def __init__(self, total):
+        super().__init__(total)
+        self.total = total
+
+class BackupResult(NamedTuple):
+    """Outcome of one backup run"""
+    path: str
+    pages: int
+    db_size: int
+    snapshot_size: int
+    duration: float
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+class BackupManager:
+    """Creates, rotates and restores compressed snapshots of the live database"""
+
+    def __init__(self, db_manager, backup_dir: str = "backups", keep: int = 7,
+                 pages_per_step: int = 256, step_pause_ms: int = 5):
+        self.db = db_manager
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.step_pause = step_pause_ms / 1000
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _scratch_target(path: str) -> sqlite3.Connection:
+        """Fresh connection to an empty scratch copy"""
+        open(path, 'wb').close()
+        target = sqlite3.connect(path)
+        # The scratch copy is verified before it is kept, so skip its journal and fsyncs
+        target.execute('PRAGMA journal_mode = OFF')
+        target.execute('PRAGMA synchronous = OFF')
+        return target
+
+    def _copy(self, source: sqlite3.Connection, path: str) -> sqlite3.Connection:
+        """Back up source into path in page batches, pausing between steps so writers get the lock"""
+        pages = self.pages_per_step
+        while True:
+            target = self._scratch_target(path)
+            last_remaining = None
+
+            def progress(status, remaining, total):
+                nonlocal last_remaining
+                # A write from another connection makes SQLite start the copy over
+                if last_remaining is not None and remaining > last_remaining:
+                    raise _BackupRestarted(total)
+                last_remaining = remaining
+                if remaining:
+                    time.sleep(self.step_pause)
+
+            try:
+                source.backup(target, pages=pages, progress=progress)
+                return target
+            except _BackupRestarted as restarted:
+                target.close()
+                # Larger steps finish between writes on a busy database
+                pages = -1 if pages >= restarted.total else pages * 2
+                logger.info(f"Backup restarted by a concurrent write, retrying with "
+                            f"{'all' if pages == -1 else pages} pages per step")
+            except Exception:
+                target.close()
+                raise
+
+    def list_snapshots(self):
+        """Snapshot file names, newest first"""
+        pattern = os.path.join(glob.escape(self.backup_dir), f"*{SNAPSHOT_SUFFIX}")
+        return sorted((os.path.basename(path) for path in glob.glob(pattern)), reverse=True)
+
+    def _require_sqlite(self):
+        if self.db.backend.name != 'sqlite':
+            raise RuntimeError("Backups only cover SQLite; back up PostgreSQL with pg_dump")
+
+    def create_backup(self, label: str = None) -> BackupResult:
+        """Copy the live database into a new compressed snapshot and rotate old ones"""
+        self._require_sqlite()
+        with self._lock:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            started = time.perf_counter()
+            stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+            base = os.path.splitext(os.path.basename(self.db.db_path))[0]
+            name = f"{base}-{stamp}-{label}" if label else f"{base}-{stamp}"
+            path = os.path.join(self.backup_dir, name + SNAPSHOT_SUFFIX)
+
+            # Commit buffered stat deltas so the snapshot has every acknowledged update
+            self.db._read_barrier()
+
+            fd, raw_path = tempfile.mkstemp(suffix=".db", dir=self.backup_dir)
+            os.close(fd)
+            try:
+                source = sqlite3.connect(self.db.db_path)
+                try:
+                    target = self._copy(source, raw_path)
+                finally:
+                    source.close()
+                try:
+                    pages = target.execute('PRAGMA page_count').fetchone()[0]
+                    check = target.execute('PRAGMA quick_check').fetchone()[0]
+                finally:
+                    target.close()
+                if check != 'ok':
+                    raise sqlite3.DatabaseError(f"Snapshot failed integrity check: {check}")
+
+                partial = path + ".tmp"
+                with open(raw_path, 'rb') as raw, gzip.open(partial, 'wb', compresslevel=6) as packed:
+                    shutil.copyfileobj(raw, packed, 1024 * 1024)
+                os.replace(partial, path)
+                db_size = os.path.getsize(raw_path)
+            finally:
+                os.remove(raw_path)
+
+            result = BackupResult(path, pages, db_size, os.path.getsize(path),
+                                  time.perf_counter() - started)
+            logger.info(f"Backup {result.name} written in {result.duration:.2f}s "
+                        f"({result.db_size / 1024:.0f} KiB -> {result.snapshot_size / 1024:.0f} KiB)")
+            self.rotate()
+            return result
+
+    def rotate(self):
+        """Delete all but the newest `keep` scheduled snapshots"""
+        # Labelled snapshots (e.g. pre-restore) are kept until removed by hand
+        scheduled = [name for name in self.list_snapshots() if SCHEDULED_SNAPSHOT.search(name)]
+        for name in scheduled[self.keep:]:
+            os.remove(os.path.join(self.backup_dir, name))
+            logger.info(f"Removed old backup {name}")
+
+    def restore(self, snapshot: str) -> BackupResult:
+        """Replace the live database contents with a snapshot in one transaction"""
+        self._require_sqlite()
+        if snapshot not in self.list_snapshots():
+            raise FileNotFoundError(f"No backup named {snapshot}")
+
+        # Keep the state being replaced, in case the restore was a mistake
+        safety = self.create_backup(label="pre-restore")
+
+        with self._lock:
+            started = time.perf_counter()
+            fd, raw_path = tempfile.mkstemp(suffix=".db", dir=self.backup_dir)
+            os.close(fd)
+            try:
+                with gzip.open(os.path.join(self.backup_dir, snapshot), 'rb') as packed, \
+                        open(raw_path, 'wb') as raw:
+                    shutil.copyfileobj(packed, raw, 1024 * 1024)
+
+                source = sqlite3.connect(raw_path)
+                target = sqlite3.connect(self.db.db_path, timeout=30)
+                try:
+                    check = source.execute('PRAGMA quick_check').fetchone()[0]
+                    if check != 'ok':
+                        raise sqlite3.DatabaseError(f"Snapshot failed integrity check: {check}")
+                    # A single step copies every page inside one write transaction,
+                    # so other connections see either the old or the restored database
+                    source.backup(target, pages=-1)
+                    pages = target.execute('PRAGMA page_count').fetchone()[0]
+                finally:
+                    target.close()
+                    source.close()
+                db_size = os.path.getsize(raw_path)
+            finally:
+                os.remove(raw_path)
+
+        # The snapshot may predate schema changes or hold a different player list
+        self.db.ensure_schema()
+        self.db.reset_player_indexes()
+
+        duration = time.perf_counter() - started
+        logger.warning(f"Database restored from {snapshot} in {duration:.2f}s "
+                       f"(previous state saved as {safety.name})")
+        return BackupResult(os.path.join(self.backup_dir, snapshot), pages, db_size,
+                            os.path.getsize(os.path.join(self.backup_dir, snapshot)), duration)
+
+def backup_manager_from_env(db_manager) -> BackupManager:
+    """BackupManager configured from the BACKUP_* environment variables"""
+    return BackupManager(
+        db_manager,
+        backup_dir=os.getenv('BACKUP_DIR', 'backups'),
+        keep=int(os.getenv('BACKUP_KEEP', '7')),
+        pages_per_step=int(os.getenv('BACKUP_PAGES_PER_STEP', '256'))
+    )
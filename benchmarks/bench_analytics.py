@@ -0,0 +1,76 @@
+"""
+Benchmark for the vectorized stats analytics module
+Times the load (once per data version), the vectorized compute and a cached summary
+separately, then the first summary after a write, which pays for both. The load is bound by
+the database driver building one tuple per row, so on 1M rows only the compute and the
+cached summary stay well under a second.
+Usage: python benchmarks/bench_analytics.py [rows]
+Runs against PostgreSQL when DATABASE_URL points at a scratch database, which is emptied first
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from analytics import StatsAnalytics
+
+def populate(db_path: str, rows: int) -> DatabaseManager:
+    """Fill a fresh database with random player counters; returns its manager"""
+    manager = DatabaseManager(db_path)
+    manager.migrate()
+    rng = random.Random(42)
+    conn = manager.backend.connect()
+    if manager.backend.name != 'sqlite':
+        conn.execute('TRUNCATE players, matches, match_results, stat_adjustments, match_pairs, '
+                     'rank_snapshots, rank_history, change_log RESTART IDENTITY')
+    conn.executemany(
+        'INSERT INTO players (discord_id, username, wins, losses, draws, kills, deaths) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((str(10 ** 17 + i), f"player{i}", rng.randint(0, 50), rng.randint(0, 50),
+          rng.randint(0, 5), rng.randint(0, 500), rng.randint(0, 500)) for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+    return manager
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        print(f"Populating {rows} players...")
+        manager = populate(db_path, rows)
+
+        analytics = StatsAnalytics(backend=manager.backend)
+
+        started = time.perf_counter()
+        columns = analytics._refresh()
+        load = time.perf_counter() - started
+
+        started = time.perf_counter()
+        analytics._compute(columns, 10)
+        compute = time.perf_counter() - started
+
+        analytics.summary()
+        started = time.perf_counter()
+        for _ in range(1000):
+            analytics.summary()
+        cached = (time.perf_counter() - started) / 1000
+
+        # A write from another connection moves the data version, so the next summary reloads
+        manager.update_player_stats(str(10 ** 17), wins=1)
+        started = time.perf_counter()
+        analytics.summary()
+        after_write = time.perf_counter() - started
+
+        print(f"load (once per data version): {load * 1000:8.1f} ms")
+        print(f"vectorized compute:           {compute * 1000:8.1f} ms")
+        print(f"cached summary:               {cached * 1000:8.3f} ms")
+        print(f"first summary after a write:  {after_write * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark for archival: a long-running tournament where most players were removed and most
+matches finished long ago, timing the hot read paths before and after one archive run
+Usage: python benchmarks/bench_archive.py [players] [matches] [inactive_fraction]
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_analytics import populate
+from archive import ArchiveManager
+
+def add_history(manager, players, matches, inactive_fraction, rng):
+    """Deactivate a share of the players and add finished and upcoming matches"""
+    now = datetime.utcnow()
+    conn = manager.backend.connect()
+    conn.execute('UPDATE players SET is_active = 0 WHERE id % 100 < ?', (int(inactive_fraction * 100),))
+    rows = []
+    for _ in range(matches):
+        first, second = rng.sample(range(1, players + 1), 2)
+        if rng.random() < 0.02:
+            rows.append((first, second, now + timedelta(hours=rng.randint(1, 240)), 'scheduled'))
+        else:
+            status = 'cancelled' if rng.random() < 0.1 else 'completed'
+            rows.append((first, second, now - timedelta(days=rng.randint(1, 720)), status))
+    conn.executemany(
+        'INSERT INTO matches (player1_id, player2_id, scheduled_time, status) VALUES (?, ?, ?, ?)', rows
+    )
+    conn.commit()
+    conn.close()
+
+def time_reads(manager, repeat=20):
+    """Mean milliseconds per call of the queries every page and command runs"""
+    timings = {}
+    for name, call in (('get_leaderboard', manager.get_leaderboard),
+                       ('get_all_players', manager.get_all_players),
+                       ('get_upcoming_matches', manager.get_upcoming_matches)):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            call()
+        timings[name] = (time.perf_counter() - started) / repeat * 1000
+    return timings
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    matches = int(sys.argv[2]) if len(sys.argv) > 2 else 500_000
+    inactive = float(sys.argv[3]) if len(sys.argv) > 3 else 0.7
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'duel_lords.db')
+        print(f"Populating {players} players and {matches} matches...")
+        manager = populate(db_path, players)
+        add_history(manager, players, matches, inactive, random.Random(11))
+
+        before = time_reads(manager)
+        result = ArchiveManager(manager).run()
+        print(f"Archived {result.players} players and {result.matches} matches in {result.duration:.2f}s; "
+              f"{result.hot_players} players and {result.hot_matches} matches left hot")
+        after = time_reads(manager)
+
+        print(f"{'query':<22} {'before ms':>10} {'after ms':>10}")
+        for name in before:
+            print(f"{name:<22} {before[name]:>10.2f} {after[name]:>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark for the cross-process change feed: a separate writer process updates player
+stats while this process follows the change log, timing commit-to-delivery latency
+Usage: python benchmarks/bench_changefeed.py [players] [writes] [writes_per_second]
+With DATABASE_URL set, the feed LISTENs on PostgreSQL instead of polling SQLite
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+import threading
+import statistics
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_analytics import populate
+from changefeed import ChangeFeed
+from database import DatabaseManager
+
+def writer(db_path, players, writes, rate, committed):
+    """Record match results from another process, noting when each write began"""
+    db = DatabaseManager(db_path)
+    rng = random.Random(7)
+    for _ in range(writes):
+        time.sleep(rng.expovariate(rate))
+        discord_id = str(10 ** 17 + rng.randrange(players))
+        outcome = rng.choice(('wins', 'losses', 'draws'))
+        # Timed from before the write, so the figure includes the commit itself
+        started = time.time()
+        db.update_player_stats(discord_id, kills=rng.randint(0, 5), deaths=rng.randint(0, 5), **{outcome: 1})
+        committed.put((discord_id, started))
+    committed.put(None)
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 50.0
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'duel_lords.db')
+        print(f"Populating {players} players...")
+        manager = populate(db_path, players)
+
+        delivered = {}
+        lock = threading.Lock()
+
+        def record(changes):
+            now = time.time()
+            with lock:
+                for discord_id in changes.players:
+                    delivered.setdefault(discord_id, []).append(now)
+
+        feed = ChangeFeed(backend=manager.backend)
+        feed.subscribe(record)
+        feed.start()
+
+        committed = multiprocessing.Queue()
+        process = multiprocessing.Process(target=writer, args=(db_path, players, writes, rate, committed))
+        process.start()
+        commits = []
+        while (item := committed.get()) is not None:
+            commits.append(item)
+        process.join()
+        # Let the last poll land
+        time.sleep(0.2)
+        feed.close()
+
+        latencies = []
+        missed = 0
+        for discord_id, committed_at in commits:
+            seen = [at for at in delivered.get(discord_id, []) if at >= committed_at]
+            if seen:
+                latencies.append((min(seen) - committed_at) * 1000)
+            else:
+                missed += 1
+
+        mode = ('LISTEN/NOTIFY' if manager.backend.name != 'sqlite'
+                else f"polling every {feed.poll_interval * 1000:.0f} ms")
+        print(f"{len(commits)} writes at ~{rate:.0f}/s from a second process, {manager.backend.name} {mode}")
+        if latencies:
+            print(f"propagation p50 {statistics.median(latencies):6.1f} ms  "
+                  f"p95 {percentile(latencies, 0.95):6.1f} ms  max {max(latencies):6.1f} ms")
+        print(f"change rows seen {feed.changes_seen}  missed writes {missed}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark for server log ingestion: writes a recorded log of random duels, ingests it,
+then checks the totals against the log and that a restart or a half-written line adds nothing
+Usage: python benchmarks/bench_ingest.py [players] [matches] [batch_lines]
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_analytics import populate
+from ingest import LogIngestor
+from stats_buffer import STAT_FIELDS
+
+def write_log(path, players, matches, rng):
+    """Random duels in the server log format; returns the expected deltas per discord_id"""
+    expected = {}
+
+    def add(index, field):
+        expected.setdefault(str(10 ** 17 + index), [0] * len(STAT_FIELDS))[field] += 1
+
+    with open(path, 'w', encoding='utf-8') as log:
+        for _ in range(matches):
+            first, second = rng.sample(range(players), 2)
+            log.write(f"2026-10-19 20:00:00 Match starting: player{first} vs player{second}\n")
+            for _ in range(rng.randint(3, 12)):
+                killer, victim = rng.choice(((first, second), (second, first)))
+                if rng.random() < 0.1:
+                    log.write(f'2026-10-19 20:00:01 DEATH "Player{victim}"\n')
+                else:
+                    log.write(f'2026-10-19 20:00:01 KILL "player{killer}" "player{victim}"\n')
+                    add(killer, 3)
+                add(victim, 4)
+            # A spectator who never registered
+            log.write('2026-10-19 20:00:02 KILL "guest" "guest2"\n')
+            if rng.random() < 0.05:
+                log.write(f'2026-10-19 20:00:03 DRAW "player{first}" "player{second}"\n')
+                add(first, 2)
+                add(second, 2)
+            else:
+                winner, loser = rng.choice(((first, second), (second, first)))
+                log.write(f'2026-10-19 20:00:03 RESULT "player{winner}" "player{loser}"\n')
+                add(winner, 0)
+                add(loser, 1)
+    return expected
+
+def counters(manager):
+    return {player.discord_id: [getattr(player, field) for field in STAT_FIELDS]
+            for player in manager.get_all_players()}
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    matches = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    batch_lines = int(sys.argv[3]) if len(sys.argv) > 3 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'duel_lords.db')
+        log_path = os.path.join(tmp, 'server.log')
+        print(f"Populating {players} players...")
+        manager = populate(db_path, players)
+        before = counters(manager)
+
+        expected = write_log(log_path, players, matches, random.Random(3))
+        size = os.path.getsize(log_path)
+        print(f"Recorded {matches} matches, {size / 1024 / 1024:.1f} MB of log")
+
+        started = time.perf_counter()
+        result = LogIngestor(manager, log_path, batch_lines=batch_lines).run_once()
+        elapsed = time.perf_counter() - started
+        print(f"Ingested {result.lines} lines / {result.events} events in {elapsed:.2f}s "
+              f"({result.lines / elapsed:,.0f} lines/s), {result.unmatched} unregistered names")
+
+        after = counters(manager)
+        wrong = sum(
+            1 for discord_id, values in after.items()
+            if [a - b for a, b in zip(values, before[discord_id])] != expected.get(discord_id, [0] * len(STAT_FIELDS))
+        )
+        print(f"Players with wrong totals: {wrong}")
+
+        # A restart resumes from the committed offset, and a line still being written waits
+        with open(log_path, 'a', encoding='utf-8') as log:
+            log.write('2026-10-19 21:00:00 KILL "player0" "pla')
+        again = LogIngestor(manager, log_path, batch_lines=batch_lines).run_once()
+        print(f"After restart with a partial line: {again.lines} lines, "
+              f"{sum(1 for key, values in counters(manager).items() if values != after[key])} players changed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""
+Load harness for the bot: drives the real slash command callbacks with synthetic
+interactions against a local fake of Discord's HTTP API, at rising concurrency
+Usage: python benchmarks/bench_load.py [players] [interactions] [concurrency,...] [http_latency_ms]
+Reports p50/p95/p99 command latency, event loop lag and database contention per level.
+Rate limits are disabled so every call reaches the database; DATABASE_URL is honoured.
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import tempfile
+import itertools
+import statistics
+from types import SimpleNamespace
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_analytics import populate
+
+# Share of each command in the generated traffic
+MIX = {'leaderboard': 0.4, 'player_stats': 0.4, 'update_stats': 0.15, 'schedule_match': 0.05}
+READS = ('get_leaderboard', 'get_player', 'get_rank_history', 'get_match_history')
+WRITES = ('update_player_stats', 'schedule_match')
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class HttpSink:
+    """Stands in for Discord's HTTP API: every call waits the configured latency and is counted"""
+
+    def __init__(self, latency_ms: float = 0):
+        self.latency = latency_ms / 1000
+        self.calls = Counter()
+        self.titles = Counter()
+
+    async def post(self, route: str, embed=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls[route] += 1
+        if embed is not None:
+            self.titles[embed.title] += 1
+
+class FakeUser:
+    """Member with just what the commands read, whose DMs land in the sink"""
+
+    def __init__(self, sink: HttpSink, user_id: int, name: str, administrator: bool = False):
+        self.sink = sink
+        self.id = user_id
+        self.display_name = name
+        self.mention = f"<@{user_id}>"
+        self.guild_permissions = SimpleNamespace(administrator=administrator)
+
+    async def send(self, content=None, embed=None):
+        await self.sink.post('dm', embed)
+
+class FakeResponse:
+    """InteractionResponse: answered at most once, by a defer or a message"""
+
+    def __init__(self, sink: HttpSink):
+        self.sink = sink
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, ephemeral: bool = False, thinking: bool = False):
+        self._done = True
+        await self.sink.post('defer')
+
+    async def send_message(self, content=None, embed=None, ephemeral: bool = False, file=None):
+        self._done = True
+        await self.sink.post('message', embed)
+
+class FakeFollowup:
+    """Interaction webhook used once the response has been deferred"""
+
+    def __init__(self, sink: HttpSink):
+        self.sink = sink
+
+    async def send(self, content=None, embed=None, ephemeral: bool = False, file=None):
+        await self.sink.post('followup', embed)
+
+class FakeInteraction:
+    """Synthetic discord.Interaction for calling a command callback directly"""
+
+    _ids = itertools.count(10 ** 18)
+
+    def __init__(self, client, sink: HttpSink, user: FakeUser, command: str, options: dict):
+        self.id = next(self._ids)
+        self.client = client
+        self.user = user
+        self.guild_id = 1
+        self.command = SimpleNamespace(name=command)
+        self.namespace = list(options.items())
+        self.extras = {}
+        self.response = FakeResponse(sink)
+        self.followup = FakeFollowup(sink)
+
+class Contention:
+    """Times DatabaseManager calls and connection checkouts, and counts lock errors"""
+
+    def __init__(self, db):
+        self.calls = defaultdict(list)
+        self.checkouts = []
+        self.lock_errors = 0
+        for name in READS + WRITES:
+            setattr(db, name, self._timed(name, getattr(db, name)))
+        connect = db.backend.connect
+
+        def timed_connect(*args, **kwargs):
+            started = time.perf_counter()
+            conn = connect(*args, **kwargs)
+            self.checkouts.append((time.perf_counter() - started) * 1000)
+            return conn
+        db.backend.connect = timed_connect
+
+    def _timed(self, name, method):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.calls[name].append((time.perf_counter() - started) * 1000)
+        return timed
+
+    def reset(self):
+        self.calls.clear()
+        self.checkouts.clear()
+        self.lock_errors = 0
+
+class LockErrorCounter(logging.Handler):
+    """DatabaseManager logs and swallows lock timeouts; count them instead of printing"""
+
+    def __init__(self, contention: Contention):
+        super().__init__(logging.ERROR)
+        self.contention = contention
+
+    def emit(self, record):
+        message = record.getMessage()
+        if 'locked' in message or 'timeout' in message.lower():
+            self.contention.lock_errors += 1
+
+async def measure_lag(samples, stopped: asyncio.Event, interval: float = 0.01):
+    """How late the event loop wakes a sleeping task, in ms"""
+    loop = asyncio.get_running_loop()
+    while not stopped.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        samples.append((loop.time() - started - interval) * 1000)
+
+def make_call(bot_module, sink: HttpSink, users, admin: FakeUser, rng: random.Random):
+    """A random (command name, interaction, kwargs) following MIX"""
+    command = rng.choices(list(MIX), weights=list(MIX.values()))[0]
+    player = lambda user: bot_module.RegisteredPlayer(str(user.id), user.display_name)
+    caller = rng.choice(users)
+    kwargs = {}
+    if command == 'player_stats' and rng.random() < 0.5:
+        kwargs['player'] = player(rng.choice(users))
+    elif command == 'update_stats':
+        caller = admin
+        kwargs = {'player': player(rng.choice(users)), rng.choice(('wins', 'losses', 'draws')): 1,
+                  'kills': rng.randint(0, 5), 'deaths': rng.randint(0, 5)}
+    elif command == 'schedule_match':
+        first, second = rng.sample(users, 2)
+        when = datetime.now() + timedelta(days=rng.randint(1, 20), minutes=rng.randint(0, 1440))
+        kwargs = {'player1': player(first), 'player2': player(second),
+                  'day': when.day, 'hour': when.hour, 'minute': when.minute}
+    options = {name: value.discord_id if hasattr(value, 'discord_id') else value
+               for name, value in kwargs.items()}
+    return command, FakeInteraction(bot_module.bot, sink, caller, command, options), kwargs
+
+async def run_level(bot_module, sink, users, admin, contention, concurrency: int, total: int, seed: int):
+    """Push total interactions through with at most concurrency in flight; returns the figures"""
+    bot = bot_module.bot
+    rng = random.Random(seed)
+    latencies = defaultdict(list)
+    errors = Counter()
+    lag = []
+    stopped = asyncio.Event()
+    slots = asyncio.Semaphore(concurrency)
+    contention.reset()
+    sink.calls.clear()
+    sink.titles.clear()
+
+    async def invoke(command, interaction, kwargs):
+        try:
+            started = time.perf_counter()
+            try:
+                await bot.tree.get_command(command).callback(interaction, **kwargs)
+            except Exception as e:
+                errors[f"{command}: {type(e).__name__}"] += 1
+            latencies[command].append((time.perf_counter() - started) * 1000)
+        finally:
+            slots.release()
+
+    monitor = asyncio.create_task(measure_lag(lag, stopped))
+    started = time.perf_counter()
+    running = []
+    for _ in range(total):
+        await slots.acquire()
+        running.append(asyncio.create_task(invoke(*make_call(bot_module, sink, users, admin, rng))))
+    await asyncio.gather(*running)
+    elapsed = time.perf_counter() - started
+    # DMs and reminders are sent after the response, from the background queue
+    await bot.tasks._queue.join()
+    stopped.set()
+    await monitor
+    return elapsed, latencies, errors, lag
+
+def report(concurrency, total, elapsed, latencies, errors, lag, contention, sink):
+    print(f"\n== concurrency {concurrency}: {total} interactions in {elapsed:.2f}s, "
+          f"{total / elapsed:.0f}/s")
+    print(f"{'command':>16} {'calls':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    everything = []
+    for command in MIX:
+        values = latencies.get(command)
+        if not values:
+            continue
+        everything.extend(values)
+        print(f"{command:>16} {len(values):>6} {statistics.median(values):8.1f} "
+              f"{percentile(values, 0.95):8.1f} {percentile(values, 0.99):8.1f}")
+    print(f"{'all':>16} {len(everything):>6} {statistics.median(everything):8.1f} "
+          f"{percentile(everything, 0.95):8.1f} {percentile(everything, 0.99):8.1f}")
+    if lag:
+        print(f"event loop lag   p50 {statistics.median(lag):6.1f} ms  p99 {percentile(lag, 0.99):6.1f} ms  "
+              f"max {max(lag):6.1f} ms")
+
+    reads = [ms for name in READS for ms in contention.calls.get(name, [])]
+    writes = [ms for name in WRITES for ms in contention.calls.get(name, [])]
+    for label, values in (('db reads', reads), ('db writes', writes)):
+        if values:
+            print(f"{label:<16} p50 {statistics.median(values):6.1f} ms  p95 {percentile(values, 0.95):6.1f} ms  "
+                  f"p99 {percentile(values, 0.99):6.1f} ms  ({len(values)} calls)")
+    if contention.checkouts:
+        print(f"connection wait  p95 {percentile(contention.checkouts, 0.95):6.2f} ms  "
+              f"max {max(contention.checkouts):6.2f} ms  lock errors {contention.lock_errors}")
+
+    failed = sum(count for title, count in sink.titles.items() if title and title.startswith('❌'))
+    print(f"http calls {dict(sink.calls)}  failed replies {failed}")
+    for error, count in errors.most_common():
+        print(f"  raised {error} x{count}")
+
+async def run(bot_module, players: int, total: int, levels, latency_ms: float):
+    bot = bot_module.bot
+    sink = HttpSink(latency_ms)
+    users = [FakeUser(sink, 10 ** 17 + i, f"player{i}") for i in range(players)]
+    admin = FakeUser(sink, 1, "admin", administrator=True)
+    by_id = {user.id: user for user in users}
+
+    async def fetch_user(user_id):
+        await sink.post('fetch_user')
+        return by_id.get(user_id) or FakeUser(sink, user_id, str(user_id))
+    bot.fetch_user = fetch_user
+
+    contention = Contention(bot.db)
+    logging.getLogger().addHandler(LockErrorCounter(contention))
+    await bot.setup_hook()
+    try:
+        for seed, concurrency in enumerate(levels):
+            figures = await run_level(bot_module, sink, users, admin, contention, concurrency, total, seed)
+            report(concurrency, total, *figures, contention, sink)
+    finally:
+        await bot.close()
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    levels = [int(level) for level in sys.argv[3].split(',')] if len(sys.argv) > 3 else [1, 8, 32, 128]
+    latency_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+    os.environ['RATE_LIMITS_DISABLED'] = '1'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Populating {players} players...")
+        populate(os.path.join(tmp, 'duel_lords.db'), players)
+        # The bot opens duel_lords.db (and its audit log) relative to the working directory
+        os.chdir(tmp)
+        # Configured before bot.py's own logging setup, so the console is left to the report;
+        # errors still reach the lock error counter
+        logging.basicConfig(level=logging.ERROR)
+        logging.getLogger().handlers[0].setLevel(logging.CRITICAL)
+        import bot as bot_module
+
+        print(f"{bot_module.bot.db.backend.name} backend, {latency_ms:.0f} ms simulated Discord latency, "
+              f"mix {', '.join(f'{name} {share:.0%}' for name, share in MIX.items())}")
+        asyncio.run(run(bot_module, players, total, levels, latency_ms))
+
+if __name__ == "__main__":
+    main()
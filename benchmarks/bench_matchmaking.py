@@ -0,0 +1,90 @@
+"""
+Simulation benchmark for the matchmaking queue: thousands of players arriving over
+time, with the periodic sweep widening search windows
+Usage: python benchmarks/bench_matchmaking.py [players] [arrivals_per_second] [base_window]
+"""
+
+import os
+import sys
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matchmaking import MatchmakingQueue
+
+SWEEP_SECONDS = 15
+
+class SimulatedClock:
+    """Clock the simulation advances by hand"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def simulate(players: int, rate: float, base_window: float, seed: int = 42):
+    """Run one simulation; returns timings and pairing quality figures"""
+    rng = random.Random(seed)
+    clock = SimulatedClock()
+    queue = MatchmakingQueue(base_window=base_window, clock=clock)
+    # Most players sit near the middle, a few are far out, like real win rates
+    ratings = [min(1000.0, max(0.0, rng.gauss(500, 150))) for _ in range(players)]
+
+    join_time = sweep_time = 0.0
+    sweeps = depth = 0
+    pairings = []
+    next_sweep = SWEEP_SECONDS
+    for i, rating in enumerate(ratings):
+        clock.now += rng.expovariate(rate)
+        while clock.now >= next_sweep:
+            saved, clock.now = clock.now, next_sweep
+            started = time.perf_counter()
+            pairings.extend((pairing, clock.now) for pairing in queue.match_waiting())
+            sweep_time += time.perf_counter() - started
+            sweeps += 1
+            clock.now = saved
+            next_sweep += SWEEP_SECONDS
+
+        started = time.perf_counter()
+        pairing = queue.join(str(i), f"player{i}", rating)
+        join_time += time.perf_counter() - started
+        if pairing is not None:
+            pairings.append((pairing, clock.now))
+        depth = max(depth, len(queue))
+
+    gaps = [pairing.rating_gap for pairing, _ in pairings]
+    waits = [matched_at - pairing.player1.joined_at for pairing, matched_at in pairings]
+    return {
+        'join_us': join_time / players * 1e6,
+        'sweep_ms': sweep_time / max(sweeps, 1) * 1000,
+        'paired': len(pairings) * 2,
+        'waiting': len(queue),
+        'depth': depth,
+        'gap_mean': statistics.mean(gaps) if gaps else 0.0,
+        'gap_p95': percentile(gaps, 0.95) if gaps else 0.0,
+        'wait_mean': statistics.mean(waits) if waits else 0.0,
+        'wait_p95': percentile(waits, 0.95) if waits else 0.0,
+    }
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rates = [float(sys.argv[2])] if len(sys.argv) > 2 else [0.1, 1.0, 10.0]
+    windows = [float(sys.argv[3])] if len(sys.argv) > 3 else [50.0, 1.0]
+    print(f"{players} players, sweep every {SWEEP_SECONDS}s of simulated time")
+    for window in windows:
+        for rate in rates:
+            result = simulate(players, rate, window)
+            print(f"window {window:>4.0f} {rate:>6} joins/s: peak queue {result['depth']:>5}  "
+                  f"join {result['join_us']:4.1f} us  sweep {result['sweep_ms']:5.2f} ms  "
+                  f"paired {result['paired']:>6}  left waiting {result['waiting']:>4}  "
+                  f"gap mean {result['gap_mean']:5.1f} p95 {result['gap_p95']:5.1f}  "
+                  f"wait mean {result['wait_mean']:5.1f}s p95 {result['wait_p95']:5.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark for pinned leaderboards: a steady stream of stat updates against guilds that each
+have a live leaderboard, counting the message edits sent against one edit per update per
+guild, first with updates that reorder the top of the board and then with updates that
+only touch players below it
+Usage: python benchmarks/bench_pinned.py [guilds] [updates_per_second] [seconds] [players]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_analytics import populate
+from changefeed import ChangeFeed
+from pinned import PinnedLeaderboards
+
+class FakeChannel:
+    """Text channel whose messages only count their edits"""
+
+    def __init__(self, channel_id: int, edits: list):
+        self.id = channel_id
+        self.edits = edits
+
+    def get_partial_message(self, message_id: int):
+        channel = self
+
+        class Message:
+            async def edit(self, embed=None):
+                channel.edits.append((channel.id, time.monotonic()))
+
+        return Message()
+
+def stream_updates(manager, rate, seconds, player_ids):
+    """Call update_player_stats at rate per second for seconds; returns the calls made"""
+    rng = random.Random(5)
+    calls = 0
+    started = time.monotonic()
+    while time.monotonic() - started < seconds:
+        manager.update_player_stats(rng.choice(player_ids), wins=1, kills=rng.randint(0, 5))
+        calls += 1
+        time.sleep(max(0.0, started + calls / rate - time.monotonic()))
+    return calls
+
+async def run_phase(name, pinned, manager, guilds, rate, seconds, player_ids, edits):
+    edits.clear()
+    pinned.edits = pinned.unchanged = 0
+    calls = await asyncio.to_thread(stream_updates, manager, rate, seconds, player_ids)
+    # Let the last debounce window and its edits finish
+    await asyncio.sleep(pinned.min_interval + pinned.debounce + guilds * pinned.edit_spacing + 1)
+    per_channel = max((sum(1 for channel, _ in edits if channel == c) for c in range(guilds)), default=0)
+    print(f"{name:<14} {calls:>8} {calls * guilds:>13} {len(edits):>6} {pinned.unchanged:>10} {per_channel:>12}")
+
+async def main():
+    guilds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+    players = int(sys.argv[4]) if len(sys.argv) > 4 else 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = populate(os.path.join(tmp, 'duel_lords.db'), players)
+        edits = []
+        channels = {c: FakeChannel(c, edits) for c in range(guilds)}
+        bot = SimpleNamespace(db=manager, get_channel=channels.get)
+        for c in range(guilds):
+            manager.set_pinned_leaderboard(str(c), str(c), str(c), None)
+
+        pinned = PinnedLeaderboards(bot, debounce_seconds=1, min_interval_seconds=5, edit_spacing_seconds=0.02)
+        feed = ChangeFeed(backend=manager.backend)
+        feed.subscribe(pinned.on_changes)
+        feed.start()
+        pinned.start()
+        await asyncio.sleep(pinned.debounce + guilds * pinned.edit_spacing + 1)
+
+        leaders = [player.discord_id for player in manager.get_leaderboard(10)]
+        # Players far enough down that a few more wins cannot bring them into the top ten
+        tail = [player.discord_id for player in manager.get_leaderboard(players)[-players // 2:]]
+        print(f"{guilds} guilds, {rate:.0f} updates/s for {seconds:.0f}s, "
+              f"debounce {pinned.debounce}s, at most one refresh per {pinned.min_interval}s")
+        print(f"{'updates':<14} {'calls':>8} {'naive edits':>13} {'edits':>6} {'unchanged':>10} "
+              f"{'max/channel':>12}")
+        await run_phase('top of board', pinned, manager, guilds, rate, seconds, leaders, edits)
+        await run_phase('below board', pinned, manager, guilds, rate, seconds, tail, edits)
+
+        await pinned.close()
+        feed.close()
+        manager.close()
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+"""
+Benchmark for result row representations: dict rows versus PlayerRow tuples
+Usage: python benchmarks/bench_rows.py [rows]
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_analytics import populate
+from rows import PlayerRow, PLAYER_COLUMNS
+
+def dict_rows(conn):
+    """Previous approach: sqlite3.Row converted to a dict per row"""
+    conn.row_factory = sqlite3.Row
+    rows = [dict(row) for row in conn.execute('SELECT * FROM players WHERE is_active = 1')]
+    conn.row_factory = None
+    return rows
+
+def tuple_rows(conn):
+    """Explicit column list mapped straight onto PlayerRow"""
+    cursor = conn.execute(f'SELECT {PLAYER_COLUMNS} FROM players WHERE is_active = 1')
+    return list(map(PlayerRow._make, cursor.fetchall()))
+
+def measure(label, fetch, conn):
+    """Wall time and retained memory of one full fetch"""
+    fetch(conn)  # warm the page cache
+    started = time.perf_counter()
+    fetch(conn)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    rows = fetch(conn)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<14} {elapsed * 1000:8.1f} ms  {retained / len(rows):7.1f} bytes/row")
+    return rows
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        print(f"Populating {rows} players...")
+        populate(db_path, rows)
+
+        conn = sqlite3.connect(db_path)
+        measure("dict rows", dict_rows, conn)
+        measure("PlayerRow", tuple_rows, conn)
+        conn.close()
+
+if __name__ == "__main__":
+    main()
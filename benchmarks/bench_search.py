@@ -0,0 +1,49 @@
+"""
+Benchmark for the in-memory player search index
+Usage: python benchmarks/bench_search.py [players]
+"""
+
+import os
+import sys
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import TrigramIndex
+
+SYLLABLES = ['ka', 'ro', 'mi', 'zu', 'te', 'shi', 'na', 'lo', 'ver', 'dra', 'gon', 'x', 'pro',
+             'ninja', 'lord', 'duel', 'boom', 'an', 'el', 'is', 'or', 'ax', 'yu', 'qi', 'vo',
+             'br', 'st', 'th', 'ck', 'mo', 'ra', 'li', 'en', 'wa']
+QUERIES = ['k', 'ka', 'lord', 'dragon', 'ninjalord', 'dargon', 'boomduel12', 'Kamiro', 'zzz']
+
+def random_name(rng: random.Random) -> str:
+    """Gamer-tag style username"""
+    name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    if rng.random() < 0.5:
+        name += str(rng.randint(0, 999))
+    return name.capitalize() if rng.random() < 0.3 else name
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(0)
+    index = TrigramIndex()
+
+    started = time.perf_counter()
+    for i in range(players):
+        index.add(str(i), random_name(rng))
+    print(f"built index of {players} players in {time.perf_counter() - started:.2f}s")
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(50):
+            started = time.perf_counter()
+            index.search(query, limit=25)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        print(f"{query!r:>14}: median {statistics.median(timings):6.2f} ms  "
+              f"p95 {timings[int(len(timings) * 0.95)]:6.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark for season rollover: a season of random match results, ended once with the
+summaries computed in-process and once per worker count with the process pool
+Usage: python benchmarks/bench_seasons.py [players] [results] [max_workers]
+"""
+
+import os
+import sys
+import time
+import shutil
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_analytics import populate
+from database import DatabaseManager
+from seasons import SeasonManager
+
+def add_results(manager, players, results, rng):
+    """Append a season's worth of match results, a few of them reverted"""
+    start = datetime.utcnow() - timedelta(days=90)
+    rows = []
+    for i in range(results):
+        first, second = rng.sample(range(1, players + 1), 2)
+        first_kills, second_kills = rng.randint(0, 10), rng.randint(0, 10)
+        winner = first if first_kills > second_kills else second if second_kills > first_kills else None
+        rows.append((first, second, first_kills, second_kills, winner, start + timedelta(seconds=i * 7)))
+    conn = manager.backend.connect()
+    conn.executemany('''
+        INSERT INTO match_results (player1_id, player2_id, player1_kills, player2_kills, winner_id, played_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.execute('''
+        INSERT INTO match_results (player1_id, player2_id, player1_kills, player2_kills, winner_id,
+                                   played_at, reverts_result_id)
+        SELECT player1_id, player2_id, player1_kills, player2_kills, winner_id, played_at, id
+        FROM match_results WHERE id % 50 = 0
+    ''')
+    conn.commit()
+    conn.close()
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    results = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000_000
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, 'base.db')
+        print(f"Populating {players} players and {results} match results...")
+        manager = populate(base, players)
+        add_results(manager, players, results, random.Random(7))
+        manager.close()
+
+        workers = sorted({1, *(w for w in (2, 4, 8) if w < max_workers), max_workers})
+        print(f"{'workers':>7} {'end season s':>13} {'freeze s':>9} {'standings ms':>13}")
+        for count in workers:
+            db_path = os.path.join(tmp, f'season-{count}.db')
+            shutil.copy(base, db_path)
+            manager = DatabaseManager(db_path)
+            seasons = SeasonManager(manager, workers=count)
+
+            started = time.perf_counter()
+            season_id = seasons._freeze("Benchmark")
+            freeze = time.perf_counter() - started
+            seasons.finalize(season_id)
+            total = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for _ in range(100):
+                manager.get_season_standings(season_id)
+                manager.get_season_awards(season_id)
+            standings = (time.perf_counter() - started) / 100 * 1000
+            print(f"{count:>7} {total:>13.2f} {freeze:>9.2f} {standings:>13.2f}")
+            manager.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Startup-time benchmark with an -X importtime breakdown per run mode
+Usage: python benchmarks/bench_startup.py [top_n]
+"""
+
+import os
+import sys
+import time
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What each run mode imports before it can start serving
+TARGETS = {
+    'main (web mode)': "import main; main.app",
+    'main (bot mode)': "import main; import bot",
+    'app': "import app",
+    'database': "import database",
+}
+
+def parse_importtime(stderr: str):
+    """(cumulative_us, self_us, module) rows from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return rows
+
+def run(code: str, importtime: bool = False):
+    """Run code in a fresh interpreter, returning (wall seconds, stderr)"""
+    env = dict(os.environ, DUEL_LORDS_MODE='web', DISCORD_TOKEN='')
+    args = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    started = time.perf_counter()
+    result = subprocess.run(args, cwd=ROOT, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return elapsed, result.stderr
+
+def main():
+    top_n = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+
+    for name, code in TARGETS.items():
+        timings = sorted(run(code)[0] for _ in range(5))
+        _, stderr = run(code, importtime=True)
+        rows = parse_importtime(stderr)
+        total = sum(self_us for _, self_us, _ in rows)
+
+        print(f"\n== {name}: median {timings[2] * 1000:.0f} ms wall, "
+              f"{total / 1000:.0f} ms in imports ({len(rows)} modules)")
+        print(f"{'cumulative':>12} {'self':>10}  module")
+        for cumulative_us, self_us, module in sorted(rows, reverse=True)[:top_n]:
+            print(f"{cumulative_us / 1000:10.1f}ms {self_us / 1000:8.1f}ms  {module}")
+
+if __name__ == "__main__":
+    main()
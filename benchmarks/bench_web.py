@@ -0,0 +1,80 @@
+"""
+Benchmark for web response compression and built static assets: bytes on the wire
+and time to first byte for the home and leaderboard pages
+Usage: python benchmarks/bench_web.py [players] [requests]
+"""
+
+import os
+import sys
+import time
+import logging
+import tempfile
+import threading
+import http.client
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from werkzeug.serving import make_server
+from bench_analytics import populate
+import assets
+
+def fetch(port, path, encoding):
+    """One request: (bytes received, seconds to first byte, seconds to last byte)"""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    started = time.perf_counter()
+    conn.request('GET', path, headers={'Accept-Encoding': encoding})
+    response = conn.getresponse()
+    # Reading one byte waits for the body to begin, not just the headers
+    first = response.read(1)
+    ttfb = time.perf_counter() - started
+    body = first + response.read()
+    total = time.perf_counter() - started
+    conn.close()
+    return len(body), ttfb, total
+
+def measure(port, path, encoding, requests):
+    """Median timings over several requests after one warm-up"""
+    fetch(port, path, encoding)
+    results = [fetch(port, path, encoding) for _ in range(requests)]
+    size = results[-1][0]
+    ttfb = statistics.median(result[1] for result in results)
+    total = statistics.median(result[2] for result in results)
+    label = encoding or 'identity'
+    print(f"{path:<34} {label:<9} {size:>8} B  ttfb {ttfb * 1000:6.2f} ms  total {total * 1000:6.2f} ms")
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app opens duel_lords.db relative to the working directory
+        os.chdir(tmp)
+        print(f"Populating {players} players...")
+        populate(os.path.join(tmp, 'duel_lords.db'), players)
+
+        dist_dir = os.path.join(tmp, 'dist')
+        manifest = assets.build_assets(dist_dir=dist_dir)
+
+        import app as web
+        web.DIST_DIR = dist_dir
+        web.ASSET_MANIFEST = manifest
+
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        server = make_server('127.0.0.1', 0, web.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_port
+
+        encodings = ['', 'gzip'] + (['br'] if assets.brotli is not None else [])
+        for path in ('/', '/leaderboard'):
+            for encoding in encodings:
+                measure(port, path, encoding, requests)
+        print()
+        for name, built in manifest.items():
+            measure(port, f"/static/{name}", '', requests)
+            for encoding in encodings:
+                measure(port, f"/assets/{built}", encoding, requests)
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Contention benchmark for database writes: many threads updating player stats at once,
+first each through its own connection as every write used to, then through the single writer
+Usage: python benchmarks/bench_writer.py [threads] [writes_per_thread] [players]
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_analytics import populate
+
+def per_call_update(manager, discord_id, **deltas):
+    """The previous write path: a connection, a transaction and a commit per call"""
+    conn = manager.backend.connect(named_rows=True)
+    try:
+        cursor = conn.cursor()
+        manager._apply_stat_adjustment(cursor, discord_id, deltas.get('wins', 0), 0, 0,
+                                       deltas.get('kills', 0), deltas.get('deaths', 0))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def hammer(threads, writes, players, update):
+    """Run update from every thread at once; returns (seconds, errors by message)"""
+    errors = {}
+    lock = threading.Lock()
+    start = threading.Barrier(threads + 1)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        start.wait()
+        for _ in range(writes):
+            discord_id = str(10 ** 17 + rng.randrange(players))
+            try:
+                update(discord_id, wins=1, kills=rng.randint(0, 5), deaths=rng.randint(0, 5))
+            except Exception as e:
+                with lock:
+                    errors[str(e)] = errors.get(str(e), 0) + 1
+
+    pool = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    for thread in pool:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - started, errors
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    players = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    total = threads * writes
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'duel_lords.db')
+        print(f"Populating {players} players...")
+        manager = populate(db_path, players)
+
+        def direct(discord_id, **deltas):
+            per_call_update(manager, discord_id, **deltas)
+
+        def through_writer(discord_id, **deltas):
+            success, message, _ = manager.update_player_stats(discord_id, **deltas)
+            if not success:
+                raise RuntimeError(message)
+
+        print(f"{threads} threads x {writes} stat updates")
+        for name, update in (('per-call connections', direct), ('single writer', through_writer)):
+            elapsed, errors = hammer(threads, writes, players, update)
+            failed = sum(errors.values())
+            print(f"{name:<22} {(total - failed) / elapsed:>9,.0f} writes/s  {failed} failed")
+            for message, count in sorted(errors.items(), key=lambda item: -item[1]):
+                print(f"    {count} x {message}")
+        stats = manager.writer.stats()
+        print(f"Single writer: {stats['writes']} writes in {stats['commits']} commits "
+              f"(largest group {stats['largest_group']})")
+        manager.close()
+
+if __name__ == '__main__':
+    main()
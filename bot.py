@@ -1,14 +1,31 @@
 import os
+import json
+import hashlib
+import tempfile
+import functools
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
 import asyncio
 import logging
 from database import DatabaseManager
+from backup import backup_manager_from_env
+from archive import archive_manager_from_env
+from seasons import AWARDS, season_manager_from_env
+from audit import AuditLog
+from background import TaskQueue
+from ratelimit import RateLimiter
+from matchmaking import matchmaking_from_env, player_rating
+from changefeed import ChangeFeed
+from cards import card_renderer_from_env
+from ingest import log_ingestor_from_env
+from pinned import pinned_leaderboards_from_env
 from scheduler import SchedulerManager
 from translations import get_text
-from utils import create_embed, parse_time, format_datetime
+from search import normalize_name
+from utils import create_embed, parse_time, format_datetime, create_sparkline, leaderboard_text
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -23,28 +40,265 @@ intents.guild_messages = True
 class DuelLordsBot(commands.Bot):
     def __init__(self):
         super().__init__(command_prefix='!', intents=intents)
-        self.db = DatabaseManager()
+        self.db = DatabaseManager(write_behind=os.getenv('STATS_WRITE_BEHIND') == '1')
+        self.backups = backup_manager_from_env(self.db)
+        self.archive = archive_manager_from_env(self.db)
+        self.seasons = season_manager_from_env(self.db)
+        self.audit = AuditLog(self.db.backend)
+        self.tasks = TaskQueue()
+        self.limiter = RateLimiter()
+        self.matchmaking = matchmaking_from_env()
+        self.changes = ChangeFeed(backend=self.db.backend)
+        self.cards = card_renderer_from_env(self.db)
+        self.ingest = log_ingestor_from_env(self.db)
+        self.pinned = pinned_leaderboards_from_env(self)
         self.scheduler = SchedulerManager(self)
+        self.commands_synced = False
+        # Set by run_bot to serve the web dashboard on this bot's event loop
+        self.web_port = None
+        self.web = None
         
     async def setup_hook(self):
         """Called when the bot is starting up"""
         logger.info("Setting up Duel Lords bot...")
+        await asyncio.to_thread(self.db.ensure_schema)
+        # Autocomplete is served from memory, so build the player indexes up front
+        await asyncio.to_thread(self.db.warm_player_indexes)
+        # Writes from the web process or the CLI evict what they made stale
+        self.changes.subscribe(self.db.apply_changes)
+        self.changes.subscribe(evict_cached_responses)
+        self.changes.subscribe(self.cards.on_changes)
+        self.changes.subscribe(self.pinned.on_changes)
+        self.changes.start()
+        # Queue the leaderboard card so the first /leaderboard can already attach it
+        self.cards.leaderboard_card(await asyncio.to_thread(self.db.get_leaderboard))
+        self.audit.start()
+        self.tasks.start()
+        self.pinned.start()
         await self.scheduler.start()
+        if self.web_port is not None:
+            from async_web import start_web
+            self.web = await start_web(self, port=self.web_port)
+        
+    async def close(self):
+        """Flush buffered stat updates and audit events when the bot shuts down"""
+        if self.web is not None:
+            await self.web.cleanup()
+        await super().close()
+        await self.pinned.close()
+        await self.tasks.close()
+        await asyncio.to_thread(self.changes.close)
+        await asyncio.to_thread(self.cards.close)
+        await asyncio.to_thread(self.audit.close)
+        await asyncio.to_thread(self.db.close)
         
     async def on_ready(self):
         """Called when bot is ready"""
         logger.info(f'{self.user} has logged in!')
         logger.info(f'Bot is in {len(self.guilds)} guilds')
         
-        # Sync slash commands
+        # Sync slash commands once per process, and only if the command tree changed
+        if self.commands_synced:
+            return
         try:
-            synced = await self.tree.sync()
-            logger.info(f"Synced {len(synced)} command(s)")
+            tree_hash = self.command_tree_hash()
+            if os.getenv('FORCE_COMMAND_SYNC') != '1' and self.db.get_meta('command_tree_hash') == tree_hash:
+                logger.info("Command tree unchanged, skipping sync")
+            else:
+                synced = await self.tree.sync()
+                self.db.set_meta('command_tree_hash', tree_hash)
+                logger.info(f"Synced {len(synced)} command(s)")
+            self.commands_synced = True
         except Exception as e:
             logger.error(f"Failed to sync commands: {e}")
+    
+    async def start_queued_match(self, pairing, interaction: discord.Interaction = None):
+        """Schedule a match for a matchmaking pairing; returns its time, or None if it failed"""
+        delay = timedelta(minutes=int(os.getenv('MATCH_QUEUE_START_MINUTES', '10')))
+        match_time = (datetime.now() + delay).replace(second=0, microsecond=0)
+        player1 = RegisteredPlayer(pairing.player1.discord_id, pairing.player1.display_name)
+        player2 = RegisteredPlayer(pairing.player2.discord_id, pairing.player2.display_name)
+        
+        success, message, _ = await asyncio.to_thread(
+            self.db.schedule_match, player1.discord_id, player2.discord_id, match_time
+        )
+        if not success:
+            logger.error(f"Could not schedule queued match {player1.display_name} vs {player2.display_name}: {message}")
+            return None
+        
+        self.audit.record(
+            'queue_match', interaction.user.id if interaction else 'matchmaking', player1.id, player2.id,
+            scheduled_time=match_time.isoformat(), rating_gap=pairing.rating_gap, result=message
+        )
+        self.tasks.submit(announce_scheduled_match, interaction, player1, player2, match_time)
+        return match_time
+    
+    def command_tree_hash(self) -> str:
+        """Stable hash of the global command payload Discord would receive"""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands()),
+            key=lambda command: command['name']
+        )
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+class RegisteredPlayer(NamedTuple):
+    """A registered tournament player resolved from a command option"""
+    discord_id: str
+    display_name: str
+    
+    @property
+    def id(self) -> int:
+        return int(self.discord_id)
+    
+    @property
+    def mention(self) -> str:
+        return f"<@{self.discord_id}>"
+
+class RegisteredPlayerTransformer(app_commands.Transformer):
+    """Player option with autocomplete served from the in-memory player trie"""
+    
+    async def transform(self, interaction: discord.Interaction, value: str) -> RegisteredPlayer:
+        db = interaction.client.db
+        value = str(value).strip()
+        
+        # Autocomplete submits the Discord ID of the chosen player
+        name = db.lookup_player_name(value)
+        if name is not None:
+            return RegisteredPlayer(value, name)
+        
+        # Typed text that was not picked from the list: accept an exact or unique match
+        matches = db.complete_players(value, limit=2)
+        exact = [match for match in matches if normalize_name(match['username']) == normalize_name(value)]
+        if len(exact) == 1 or len(matches) == 1:
+            match = (exact or matches)[0]
+            return RegisteredPlayer(match['discord_id'], match['username'])
+        
+        raise app_commands.TransformerError(value, self.type, self)
+    
+    async def autocomplete(self, interaction: discord.Interaction, value: str):
+        return [
+            app_commands.Choice(name=match['username'][:100], value=match['discord_id'])
+            for match in interaction.client.db.complete_players(str(value), limit=25)
+        ]
+
+TournamentPlayer = app_commands.Transform[RegisteredPlayer, RegisteredPlayerTransformer]
 
 bot = DuelLordsBot()
 
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    """Reply to option errors instead of leaving the interaction unanswered"""
+    if isinstance(error, app_commands.TransformerError):
+        embed = create_embed(
+            title="❌ Player Not Found",
+            description=f"**{error.value}** is not a registered player. Pick one from the suggestions.",
+            color=discord.Color.red()
+        )
+        await send_response(interaction, embed, ephemeral=True)
+        return
+    
+    logger.error(f"Error in command {interaction.command.name if interaction.command else '?'}: {error}")
+    # Deferred commands would otherwise show "thinking..." forever
+    embed = create_embed(
+        title="❌ Something Went Wrong",
+        description="The command failed. Please try again in a moment.",
+        color=discord.Color.red()
+    )
+    try:
+        await send_response(interaction, embed, ephemeral=True)
+    except discord.HTTPException:
+        pass
+
+async def send_response(interaction: discord.Interaction, embed: discord.Embed, ephemeral: bool = False,
+                        file: discord.File = None):
+    """Reply directly, or through a followup once the interaction has been deferred"""
+    cache_key = interaction.extras.get('response_cache_key')
+    if cache_key is not None and not ephemeral:
+        data = embed.to_dict()
+        if file is not None:
+            # Cached replies open the card again, since an attachment is only sent once
+            data.pop('image', None)
+            data['card'] = (file.fp.name, file.filename)
+        bot.limiter.cache.put(cache_key, data)
+    
+    extra = {'file': file} if file is not None else {}
+    if interaction.response.is_done():
+        await interaction.followup.send(embed=embed, ephemeral=ephemeral, **extra)
+    else:
+        await interaction.response.send_message(embed=embed, ephemeral=ephemeral, **extra)
+
+def attach_card(embed: discord.Embed, path: str, filename: str):
+    """Show an already rendered card as the embed image; None if there is no card to attach"""
+    if path is None:
+        return None
+    try:
+        file = discord.File(path, filename=filename)
+    except OSError:
+        # Evicted between the lookup and now; the text version is used instead
+        return None
+    embed.set_image(url=f"attachment://{filename}")
+    return file
+
+def response_cache_key(interaction: discord.Interaction, vary_on_user: bool):
+    """Key for a command's response: its name, its options and, if asked, the caller"""
+    options = tuple(sorted((name, str(getattr(value, 'id', value))) for name, value in interaction.namespace))
+    # Commands that default to the caller answer differently per user when no option is given
+    user_id = interaction.user.id if vary_on_user and not options else None
+    return (interaction.command.name, options, user_id)
+
+# Responses that depend on every player, not just the ones named in their options
+PLAYER_LIST_COMMANDS = ('leaderboard', 'all_players', 'find_player')
+
+def evict_cached_responses(changes):
+    """Change feed subscriber: drop cached responses that mention a changed player"""
+    def stale(key):
+        command, options, user_id = key
+        if changes.full or command in PLAYER_LIST_COMMANDS:
+            return changes.leaderboard
+        return (any(value in changes.players for _, value in options)
+                or (user_id is not None and str(user_id) in changes.players))
+    bot.limiter.cache.evict(stale)
+
+def rate_limited(name: str, user: str = None, guild: str = None, global_: str = None,
+                 cache_ttl: float = 60, vary_on_user: bool = False):
+    """Apply token bucket limits to a command, answering throttled calls from its response cache"""
+    bot.limiter.configure(name, user=user, guild=guild, global_=global_)
+    
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(interaction: discord.Interaction, *args, **kwargs):
+            key = response_cache_key(interaction, vary_on_user)
+            retry_after = bot.limiter.hit(name, interaction.user.id, interaction.guild_id)
+            if not retry_after:
+                interaction.extras['response_cache_key'] = key
+                return await func(interaction, *args, **kwargs)
+            
+            wait = int(retry_after) + 1
+            extra = {}
+            cached = bot.limiter.cache.get(key, cache_ttl)
+            if cached is not None:
+                data, age = cached
+                embed = discord.Embed.from_dict(data)
+                if 'card' in data:
+                    card = attach_card(embed, *data['card'])
+                    if card is not None:
+                        extra['file'] = card
+                embed.set_footer(text=f"Cached {age:.0f}s ago - try again in {wait}s for live data")
+            else:
+                embed = create_embed(
+                    title="⏳ Slow Down",
+                    description=f"`/{name}` is on cooldown. Try again in **{wait}s**.",
+                    color=discord.Color.orange()
+                )
+            await interaction.response.send_message(embed=embed, ephemeral=True, **extra)
+        return wrapper
+    return decorator
+
+def cached_avatar_url(user_id: int):
+    """Avatar URL for a user the client already knows, without an API call"""
+    user = bot.get_user(user_id)
+    return user.display_avatar.url if user else None
+
 @bot.tree.command(name="server_info", description="Show BombSquad server information")
 async def server_info(interaction: discord.Interaction):
     """Display server IP and port information"""
@@ -88,9 +342,14 @@ async def register_player(interaction: discord.Interaction, player: discord.Memb
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    success, message = bot.db.register_player(str(player.id), player.display_name)
+    await interaction.response.defer()
+    success, message, replayed = await asyncio.to_thread(
+        bot.db.register_player, str(player.id), player.display_name, interaction_id=interaction.id
+    )
     
     if success:
+        if not replayed:
+            bot.audit.record('register_player', interaction.user.id, player.id, username=player.display_name)
         embed = create_embed(
             title="✅ Player Registered",
             description=f"{player.mention} has been successfully registered for the tournament!",
@@ -106,11 +365,11 @@ async def register_player(interaction: discord.Interaction, player: discord.Memb
             color=discord.Color.red()
         )
     
-    await interaction.response.send_message(embed=embed)
+    await interaction.followup.send(embed=embed)
 
 @bot.tree.command(name="remove_player", description="Remove a player from tournament (Admin only)")
 @app_commands.describe(player="The player to remove")
-async def remove_player(interaction: discord.Interaction, player: discord.Member):
+async def remove_player(interaction: discord.Interaction, player: TournamentPlayer):
     """Remove a player from the tournament"""
     if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.administrator:
         embed = create_embed(
@@ -121,9 +380,15 @@ async def remove_player(interaction: discord.Interaction, player: discord.Member
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    success, message = bot.db.remove_player(str(player.id))
+    await interaction.response.defer()
+    success, message, replayed = await asyncio.to_thread(
+        bot.db.remove_player, str(player.id), interaction_id=interaction.id
+    )
     
     if success:
+        if not replayed:
+            bot.audit.record('remove_player', interaction.user.id, player.id, username=player.display_name)
+            bot.matchmaking.leave(player.discord_id)
         embed = create_embed(
             title="✅ Player Removed",
             description=f"{player.mention} has been removed from the tournament.",
@@ -136,7 +401,7 @@ async def remove_player(interaction: discord.Interaction, player: discord.Member
             color=discord.Color.red()
         )
     
-    await interaction.response.send_message(embed=embed)
+    await interaction.followup.send(embed=embed)
 
 @bot.tree.command(name="schedule_match", description="Schedule a match between two players")
 @app_commands.describe(
@@ -148,8 +413,8 @@ async def remove_player(interaction: discord.Interaction, player: discord.Member
 )
 async def schedule_match(
     interaction: discord.Interaction, 
-    player1: discord.Member, 
-    player2: discord.Member,
+    player1: TournamentPlayer, 
+    player2: TournamentPlayer,
     day: int,
     hour: int,
     minute: int
@@ -166,86 +431,209 @@ async def schedule_match(
                 match_time = match_time.replace(year=now.year + 1, month=1)
             else:
                 match_time = match_time.replace(month=now.month + 1)
+    except ValueError:
+        embed = create_embed(
+            title="❌ Invalid Date/Time",
+            description="Please provide valid day, hour, and minute values.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer()
+    success, message, replayed = await asyncio.to_thread(
+        bot.db.schedule_match,
+        str(player1.id), 
+        str(player2.id), 
+        match_time,
+        interaction_id=interaction.id
+    )
+    
+    if success:
+        if not replayed:
+            bot.audit.record(
+                'schedule_match', interaction.user.id, player1.id, player2.id,
+                scheduled_time=match_time.isoformat(), result=message
+            )
+        
+        # Create beautiful match embed
+        embed = create_embed(
+            title="⚔️ Match Scheduled",
+            description="A new duel has been arranged!",
+            color=discord.Color.gold()
+        )
         
-        success, message = bot.db.schedule_match(
-            str(player1.id), 
-            str(player2.id), 
-            match_time
+        embed.add_field(
+            name="🥊 Fighters", 
+            value=f"{player1.mention} **VS** {player2.mention}", 
+            inline=False
+        )
+        
+        discord_timestamp = f"<t:{int(match_time.timestamp())}:F>"
+        embed.add_field(
+            name="📅 Match Time", 
+            value=discord_timestamp, 
+            inline=False
         )
         
-        if success:
-            # Create beautiful match embed
+        embed.add_field(
+            name="⏰ Countdown", 
+            value=f"<t:{int(match_time.timestamp())}:R>", 
+            inline=True
+        )
+        
+        embed.set_footer(text="Players will receive a reminder 5 minutes before the match")
+        
+        # Reminder and DMs happen after the response, keyed so a retried interaction sends them once
+        bot.tasks.submit(
+            announce_scheduled_match, interaction, player1, player2, match_time,
+            key=f"schedule_match:{interaction.id}"
+        )
+    else:
+        embed = create_embed(
+            title="❌ Scheduling Failed",
+            description=message,
+            color=discord.Color.red()
+        )
+    
+    await interaction.followup.send(embed=embed)
+
+async def announce_scheduled_match(interaction, player1, player2, match_time: datetime):
+    """Schedule the reminder and DM both players about a new match"""
+    await bot.scheduler.schedule_reminder(
+        player1.id, player2.id, match_time, interaction.guild_id if interaction else None
+    )
+    
+    discord_timestamp = f"<t:{int(match_time.timestamp())}:F>"
+    failed = []
+    for recipient, opponent in ((player1, player2), (player2, player1)):
+        dm_embed = create_embed(
+            title="🔥 You Have a Scheduled Match!",
+            description=f"Your duel against **{opponent.display_name}** has been scheduled!",
+            color=discord.Color.blue()
+        )
+        dm_embed.add_field(name="📅 Date & Time", value=discord_timestamp, inline=False)
+        dm_embed.add_field(name="🎯 Server", value="IP: `18.228.228.44:3827`", inline=False)
+        
+        try:
+            user = bot.get_user(recipient.id) or await bot.fetch_user(recipient.id)
+            await user.send(embed=dm_embed)
+        except (discord.Forbidden, discord.NotFound):
+            failed.append(recipient.mention)
+    
+    if failed and interaction is not None:
+        embed = create_embed(
+            title="⚠️ Note",
+            description=f"Could not send a DM to {' and '.join(failed)}",
+            color=discord.Color.orange()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="queue", description="Join or leave the matchmaking queue")
+@app_commands.describe(action="Join the queue, leave it, or check your place")
+@app_commands.choices(action=[
+        app_commands.Choice(name="join", value="join"),
+        app_commands.Choice(name="leave", value="leave"),
+        app_commands.Choice(name="status", value="status")
+])
+async def queue(interaction: discord.Interaction, action: app_commands.Choice[str]):
+    """Find an opponent of similar skill automatically"""
+    discord_id = str(interaction.user.id)
+    
+    if action.value == 'leave':
+        if bot.matchmaking.leave(discord_id):
             embed = create_embed(
-                title="⚔️ Match Scheduled",
-                description="A new duel has been arranged!",
-                color=discord.Color.gold()
-            )
-            
-            embed.add_field(
-                name="🥊 Fighters", 
-                value=f"{player1.mention} **VS** {player2.mention}", 
-                inline=False
-            )
-            
-            discord_timestamp = f"<t:{int(match_time.timestamp())}:F>"
-            embed.add_field(
-                name="📅 Match Time", 
-                value=discord_timestamp, 
-                inline=False
+                title="👋 Left Queue",
+                description="You are no longer looking for a match.",
+                color=discord.Color.orange()
             )
-            
-            embed.add_field(
-                name="⏰ Countdown", 
-                value=f"<t:{int(match_time.timestamp())}:R>", 
-                inline=True
-            )
-            
-            embed.set_footer(text="Players will receive a reminder 5 minutes before the match")
-            
-            # Schedule reminder
-            await bot.scheduler.schedule_reminder(
-                player1.id, player2.id, match_time, interaction.guild_id
-            )
-            
-            # Send DMs to both players
-            try:
-                dm_embed = create_embed(
-                    title="🔥 You Have a Scheduled Match!",
-                    description=f"Your duel against **{player2.display_name if player1.id == player1.id else player1.display_name}** has been scheduled!",
-                    color=discord.Color.blue()
-                )
-                dm_embed.add_field(name="📅 Date & Time", value=discord_timestamp, inline=False)
-                dm_embed.add_field(name="🎯 Server", value="IP: `18.228.228.44:3827`", inline=False)
-                
-                await player1.send(embed=dm_embed)
-                await player2.send(embed=dm_embed)
-            except discord.Forbidden:
-                embed.add_field(name="⚠️ Note", value="Could not send DM to one or both players", inline=False)
-                
         else:
             embed = create_embed(
-                title="❌ Scheduling Failed",
-                description=message,
+                title="❌ Not Queued",
+                description="You are not in the matchmaking queue.",
                 color=discord.Color.red()
             )
-        
-        await interaction.response.send_message(embed=embed)
-        
-    except ValueError as e:
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    if action.value == 'status':
+        place = bot.matchmaking.position(discord_id)
         embed = create_embed(
-            title="❌ Invalid Date/Time",
-            description="Please provide valid day, hour, and minute values.",
-            color=discord.Color.red()
+            title="⏳ Matchmaking Queue",
+            description=(f"You are **#{place}** of **{len(bot.matchmaking)}** waiting players."
+                         if place else f"**{len(bot.matchmaking)}** players are waiting. Use `/queue join` to enter."),
+            color=discord.Color.blue()
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    if discord_id in bot.matchmaking:
+        embed = create_embed(
+            title="⏳ Already Queued",
+            description="You are already waiting for a match.",
+            color=discord.Color.orange()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer()
+    player_data = await asyncio.to_thread(bot.db.get_player, discord_id)
+    if not player_data:
+        embed = create_embed(
+            title="❌ Player Not Found",
+            description=f"{interaction.user.mention} is not registered for the tournament.",
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed)
+        return
+    
+    rating = player_rating(player_data)
+    pairing = bot.matchmaking.join(discord_id, player_data.username, rating, interaction.guild_id)
+    if pairing is None:
+        embed = create_embed(
+            title="🔍 Searching for an Opponent",
+            description=f"**{player_data.username}** joined the queue with a rating of **{rating:.0f}**.",
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text=f"{len(bot.matchmaking)} waiting - the search widens the longer you wait")
+        await interaction.followup.send(embed=embed)
+        return
+    
+    match_time = await bot.start_queued_match(pairing, interaction)
+    if match_time is None:
+        embed = create_embed(
+            title="❌ Scheduling Failed",
+            description="An opponent was found but the match could not be scheduled. Please queue again.",
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed)
+        return
+    
+    embed = create_embed(
+        title="⚔️ Match Found",
+        description="The matchmaking queue has arranged a duel!",
+        color=discord.Color.gold()
+    )
+    embed.add_field(
+        name="🥊 Fighters",
+        value=f"<@{pairing.player1.discord_id}> ({pairing.player1.rating:.0f}) **VS** "
+              f"<@{pairing.player2.discord_id}> ({pairing.player2.rating:.0f})",
+        inline=False
+    )
+    embed.add_field(name="📅 Match Time", value=f"<t:{int(match_time.timestamp())}:F>", inline=False)
+    embed.add_field(name="⏰ Countdown", value=f"<t:{int(match_time.timestamp())}:R>", inline=True)
+    embed.set_footer(text="Players will receive a reminder 5 minutes before the match")
+    await interaction.followup.send(embed=embed)
 
 @bot.tree.command(name="player_stats", description="Show detailed player statistics")
 @app_commands.describe(player="The player to show stats for (optional)")
-async def player_stats(interaction: discord.Interaction, player: discord.Member = None):
+@rate_limited("player_stats", user="3/15", guild="20/60", global_="120/60", vary_on_user=True)
+async def player_stats(interaction: discord.Interaction, player: TournamentPlayer = None):
     """Display detailed player statistics"""
     target_player = player or interaction.user
     
-    player_data = bot.db.get_player(str(target_player.id))
+    await interaction.response.defer()
+    player_data = await asyncio.to_thread(bot.db.get_player, str(target_player.id))
     
     if not player_data:
         embed = create_embed(
@@ -253,7 +641,7 @@ async def player_stats(interaction: discord.Interaction, player: discord.Member
             description=f"{target_player.mention} is not registered for the tournament.",
             color=discord.Color.red()
         )
-        await interaction.response.send_message(embed=embed)
+        await interaction.followup.send(embed=embed)
         return
     
     # Create beautiful stats embed
@@ -263,58 +651,158 @@ async def player_stats(interaction: discord.Interaction, player: discord.Member
         color=discord.Color.purple()
     )
     
-    embed.set_thumbnail(url=target_player.display_avatar.url)
+    avatar_url = cached_avatar_url(target_player.id)
+    if avatar_url:
+        embed.set_thumbnail(url=avatar_url)
     
-    # Match Statistics
-    embed.add_field(
-        name="🏆 Match Record", 
-        value=f"**{player_data['wins']}**W - **{player_data['losses']}**L - **{player_data['draws']}**D", 
-        inline=True
-    )
+    card = attach_card(embed, bot.cards.player_card(player_data), 'player.png')
+    if card is None:
+        # Match Statistics
+        embed.add_field(
+            name="🏆 Match Record", 
+            value=f"**{player_data.wins}**W - **{player_data.losses}**L - **{player_data.draws}**D", 
+            inline=True
+        )
+        
+        # Win Rate
+        embed.add_field(
+            name="📈 Win Rate", 
+            value=f"**{player_data.win_rate:.1f}%**", 
+            inline=True
+        )
+        
+        # Kill/Death Stats
+        embed.add_field(
+            name="⚔️ K/D Ratio", 
+            value=f"**{player_data.kd_ratio:.2f}**", 
+            inline=True
+        )
+        
+        embed.add_field(
+            name="🎯 Total Kills", 
+            value=f"**{player_data.kills}**", 
+            inline=True
+        )
+        
+        embed.add_field(
+            name="💀 Total Deaths", 
+            value=f"**{player_data.deaths}**", 
+            inline=True
+        )
+        
+        embed.add_field(
+            name="🎮 Total Matches", 
+            value=f"**{player_data.total_matches}**", 
+            inline=True
+        )
+        
+    history = await asyncio.to_thread(bot.db.get_rank_history, str(target_player.id), limit=30)
+    if history:
+        week_ago = datetime.utcnow() - timedelta(days=7)
+        past = next((point for point in reversed(history) if point['taken_at'] <= week_ago), history[0])
+        current_rank = history[-1]['rank']
+        # Lower rank is better, so invert the series to make climbing point up
+        sparkline = create_sparkline([-point['rank'] for point in history])
+        embed.add_field(
+            name="📉 Rank History",
+            value=f"#{past['rank']} ({past['taken_at']:%b %d}) → **#{current_rank}**\n`{sparkline}`",
+            inline=False
+        )
     
-    # Win Rate
-    total_matches = player_data['wins'] + player_data['losses'] + player_data['draws']
-    win_rate = (player_data['wins'] / total_matches * 100) if total_matches > 0 else 0
-    embed.add_field(
-        name="📈 Win Rate", 
-        value=f"**{win_rate:.1f}%**", 
-        inline=True
-    )
+    recent = await asyncio.to_thread(bot.db.get_match_history, str(target_player.id), limit=5)
+    if recent:
+        lines = []
+        for match in recent:
+            is_player1 = match.player1_id == player_data.id
+            own_kills = match.player1_kills if is_player1 else match.player2_kills
+            opp_kills = match.player2_kills if is_player1 else match.player1_kills
+            opponent = match.player2_name if is_player1 else match.player1_name
+            if match.winner_id is None:
+                outcome = "🤝"
+            elif match.winner_id == player_data.id:
+                outcome = "✅"
+            else:
+                outcome = "❌"
+            lines.append(f"{outcome} {own_kills}-{opp_kills} vs **{opponent}**")
+        embed.add_field(name="🕒 Recent Matches", value="\n".join(lines), inline=False)
     
-    # Kill/Death Stats
-    kd_ratio = player_data['kills'] / max(player_data['deaths'], 1)
-    embed.add_field(
-        name="⚔️ K/D Ratio", 
-        value=f"**{kd_ratio:.2f}**", 
-        inline=True
-    )
+    seasons = await asyncio.to_thread(bot.db.get_player_seasons, str(target_player.id), 3)
+    if seasons:
+        lines = [f"Season {standing.season_id}: **#{standing.rank}**, "
+                 f"{standing.wins}W-{standing.losses}L-{standing.draws}D, best streak {standing.best_streak}"
+                 for standing in seasons]
+        embed.add_field(name="🏁 Past Seasons", value="\n".join(lines), inline=False)
     
-    embed.add_field(
-        name="🎯 Total Kills", 
-        value=f"**{player_data['kills']}**", 
-        inline=True
-    )
+    embed.set_footer(text=f"Registered: {player_data.registered_at}")
     
-    embed.add_field(
-        name="💀 Total Deaths", 
-        value=f"**{player_data['deaths']}**", 
-        inline=True
-    )
+    await send_response(interaction, embed, file=card)
+
+@bot.tree.command(name="find_player", description="Search registered players by name")
+@app_commands.describe(query="Part of the player's name")
+@rate_limited("find_player", user="5/15", guild="30/60", global_="180/60")
+async def find_player(interaction: discord.Interaction, query: str):
+    """Search registered players by username"""
+    # Autocomplete submits the Discord ID of the chosen player
+    player_data = None
+    if query.isdigit():
+        await interaction.response.defer()
+        player_data = await asyncio.to_thread(bot.db.get_player, query)
     
-    embed.add_field(
-        name="🎮 Total Matches", 
-        value=f"**{total_matches}**", 
-        inline=True
-    )
+    if player_data:
+        embed = create_embed(
+            title="🔎 Player Found",
+            description=f"**{player_data.username}** (<@{player_data.discord_id}>)",
+            color=discord.Color.purple()
+        )
+        embed.add_field(
+            name="🏆 Match Record",
+            value=f"**{player_data.wins}**W - **{player_data.losses}**L - **{player_data.draws}**D",
+            inline=True
+        )
+        embed.add_field(name="📈 Win Rate", value=f"**{player_data.win_rate:.1f}%**", inline=True)
+        embed.add_field(
+            name="⚔️ K/D Ratio",
+            value=f"**{player_data.kd_ratio:.2f}**",
+            inline=True
+        )
+        await send_response(interaction, embed)
+        return
     
-    embed.set_footer(text=f"Registered: {player_data['registered_at']}")
+    results = bot.db.search_players(query, limit=10)
+    if not results:
+        embed = create_embed(
+            title="🔎 No Players Found",
+            description=f"No registered player matches **{query}**.",
+            color=discord.Color.red()
+        )
+        await send_response(interaction, embed, ephemeral=True)
+        return
     
-    await interaction.response.send_message(embed=embed)
+    embed = create_embed(
+        title="🔎 Player Search",
+        description="\n".join(
+            f"**{i}.** {result['username']} (<@{result['discord_id']}>)"
+            for i, result in enumerate(results, 1)
+        ),
+        color=discord.Color.blue()
+    )
+    embed.set_footer(text=f"Results for \"{query}\"")
+    await send_response(interaction, embed)
+
+@find_player.autocomplete('query')
+async def find_player_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggest registered players matching what has been typed so far"""
+    return [
+        app_commands.Choice(name=result['username'][:100], value=result['discord_id'])
+        for result in bot.db.search_players(current, limit=25)
+    ]
 
 @bot.tree.command(name="leaderboard", description="Show tournament leaderboard")
+@rate_limited("leaderboard", user="2/30", guild="10/60", global_="60/60")
 async def leaderboard(interaction: discord.Interaction):
     """Display tournament leaderboard"""
-    players = bot.db.get_leaderboard()
+    await interaction.response.defer()
+    players = await asyncio.to_thread(bot.db.get_leaderboard)
     
     if not players:
         embed = create_embed(
@@ -322,7 +810,7 @@ async def leaderboard(interaction: discord.Interaction):
             description="No players registered yet!",
             color=discord.Color.blue()
         )
-        await interaction.response.send_message(embed=embed)
+        await interaction.followup.send(embed=embed)
         return
     
     embed = create_embed(
@@ -331,22 +819,72 @@ async def leaderboard(interaction: discord.Interaction):
         color=discord.Color.gold()
     )
     
-    leaderboard_text = ""
-    medals = ["🥇", "🥈", "🥉"]
+    # The rendered card replaces the text list once the render pool has drawn it
+    card = attach_card(embed, bot.cards.leaderboard_card(players), 'leaderboard.png')
+    if card is None:
+        embed.description = leaderboard_text(players)
+    embed.set_footer(text="Fight your way to the top!")
     
-    for i, player in enumerate(players[:10]):  # Top 10 players
-        medal = medals[i] if i < 3 else f"#{i+1}"
-        total_matches = player['wins'] + player['losses'] + player['draws']
-        win_rate = (player['wins'] / total_matches * 100) if total_matches > 0 else 0
-        
-        leaderboard_text += f"{medal} **{player['username']}**\n"
-        leaderboard_text += f"   🏆 {player['wins']}W-{player['losses']}L-{player['draws']}D ({win_rate:.1f}%)\n"
-        leaderboard_text += f"   ⚔️ {player['kills']} kills | 💀 {player['deaths']} deaths\n\n"
+    await send_response(interaction, embed, file=card)
+
+@bot.tree.command(name="pin_leaderboard", description="Post a leaderboard that updates itself (Admin only)")
+@app_commands.describe(channel="Channel to post it in; this channel if omitted")
+async def pin_leaderboard(interaction: discord.Interaction, channel: discord.TextChannel = None):
+    """Post and pin this server's live leaderboard, replacing any earlier one"""
+    if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.administrator:
+        embed = create_embed(
+            title="❌ Access Denied",
+            description="Only administrators can pin the leaderboard.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
     
-    embed.description = leaderboard_text
-    embed.set_footer(text="Fight your way to the top!")
+    target = channel or interaction.channel
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        pinned = await bot.pinned.pin(interaction.guild_id, target)
+    except discord.HTTPException as e:
+        logger.error(f"Error posting pinned leaderboard: {e}")
+        embed = create_embed(
+            title="❌ Leaderboard Not Posted",
+            description=f"I could not post in {target.mention}. Check my permissions there.",
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return
     
-    await interaction.response.send_message(embed=embed)
+    description = f"The leaderboard in {target.mention} now updates itself as stats change."
+    if not pinned:
+        description += "\nGive me the Manage Messages permission there to have it pinned too."
+    embed = create_embed(
+        title="📌 Live Leaderboard Posted",
+        description=description,
+        color=discord.Color.green()
+    )
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="unpin_leaderboard", description="Remove this server's live leaderboard (Admin only)")
+async def unpin_leaderboard(interaction: discord.Interaction):
+    """Delete the live leaderboard message and stop updating it"""
+    if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.administrator:
+        embed = create_embed(
+            title="❌ Access Denied",
+            description="Only administrators can remove the leaderboard.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    removed = await bot.pinned.unpin(interaction.guild_id)
+    embed = create_embed(
+        title="📌 Live Leaderboard Removed" if removed else "📌 No Live Leaderboard",
+        description="The leaderboard message was deleted." if removed
+                    else "This server has no live leaderboard. Use `/pin_leaderboard` to post one.",
+        color=discord.Color.green() if removed else discord.Color.blue()
+    )
+    await interaction.followup.send(embed=embed, ephemeral=True)
 
 @bot.tree.command(name="update_stats", description="Update player match statistics (Admin only)")
 @app_commands.describe(
@@ -359,7 +897,7 @@ async def leaderboard(interaction: discord.Interaction):
 )
 async def update_stats(
     interaction: discord.Interaction,
-    player: discord.Member,
+    player: TournamentPlayer,
     wins: int = 0,
     losses: int = 0,
     draws: int = 0,
@@ -376,11 +914,19 @@ async def update_stats(
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    success, message = bot.db.update_player_stats(
-        str(player.id), wins, losses, draws, kills, deaths
+    await interaction.response.defer()
+    success, message, replayed = await asyncio.to_thread(
+        bot.db.update_player_stats,
+        str(player.id), wins, losses, draws, kills, deaths,
+        interaction_id=interaction.id
     )
     
     if success:
+        if not replayed:
+            bot.audit.record(
+                'update_stats', interaction.user.id, player.id,
+                wins=wins, losses=losses, draws=draws, kills=kills, deaths=deaths
+            )
         embed = create_embed(
             title="✅ Statistics Updated",
             description=f"Updated statistics for {player.mention}",
@@ -405,12 +951,547 @@ async def update_stats(
             color=discord.Color.red()
         )
     
-    await interaction.response.send_message(embed=embed)
+    await interaction.followup.send(embed=embed)
+
+@bot.tree.command(name="record_result", description="Record a match result (Admin only)")
+@app_commands.describe(
+    player1="First player",
+    player2="Second player",
+    player1_kills="Kills scored by the first player",
+    player2_kills="Kills scored by the second player",
+    match_id="Scheduled match ID this result completes (optional)"
+)
+async def record_result(
+    interaction: discord.Interaction,
+    player1: TournamentPlayer,
+    player2: TournamentPlayer,
+    player1_kills: int,
+    player2_kills: int,
+    match_id: int = None
+):
+    """Record a match result and update both players' statistics"""
+    if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.administrator:
+        embed = create_embed(
+            title="❌ Access Denied",
+            description="Only administrators can record match results.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer()
+    success, message, replayed = await asyncio.to_thread(
+        bot.db.record_match_result,
+        str(player1.id), str(player2.id), player1_kills, player2_kills, match_id,
+        interaction_id=interaction.id
+    )
+    
+    if success:
+        if not replayed:
+            bot.audit.record(
+                'record_result', interaction.user.id, player1.id, player2.id,
+                player1_kills=player1_kills, player2_kills=player2_kills, match_id=match_id, result=message
+            )
+        if player1_kills > player2_kills:
+            outcome = f"🏆 {player1.mention} wins!"
+        elif player2_kills > player1_kills:
+            outcome = f"🏆 {player2.mention} wins!"
+        else:
+            outcome = "🤝 It's a draw!"
+        
+        embed = create_embed(
+            title="✅ Match Result Recorded",
+            description=outcome,
+            color=discord.Color.green()
+        )
+        embed.add_field(
+            name="🥊 Score",
+            value=f"{player1.mention} **{player1_kills}** - **{player2_kills}** {player2.mention}",
+            inline=False
+        )
+        embed.set_footer(text=message)
+    else:
+        embed = create_embed(
+            title="❌ Recording Failed",
+            description=message,
+            color=discord.Color.red()
+        )
+    
+    await interaction.followup.send(embed=embed)
+
+@bot.tree.command(name="revert_result", description="Undo a recorded match result (Admin only)")
+@app_commands.describe(result_id="ID of the match result to undo")
+async def revert_result(interaction: discord.Interaction, result_id: int):
+    """Undo a match result by appending a compensating entry to the log"""
+    if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.administrator:
+        embed = create_embed(
+            title="❌ Access Denied",
+            description="Only administrators can undo match results.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer()
+    success, message, replayed = await asyncio.to_thread(
+        bot.db.revert_match_result, result_id, interaction_id=interaction.id
+    )
+    if success and not replayed:
+        bot.audit.record('revert_result', interaction.user.id, result_id=result_id)
+    
+    embed = create_embed(
+        title="↩️ Match Result Reverted" if success else "❌ Revert Failed",
+        description=message,
+        color=discord.Color.orange() if success else discord.Color.red()
+    )
+    await interaction.followup.send(embed=embed)
+
+@bot.tree.command(name="rebuild_stats", description="Recompute all statistics from the match log (Admin only)")
+async def rebuild_stats(interaction: discord.Interaction):
+    """Rebuild player aggregates from the match results log"""
+    if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.administrator:
+        embed = create_embed(
+            title="❌ Access Denied",
+            description="Only administrators can rebuild statistics.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    success, message = await asyncio.to_thread(bot.db.rebuild_player_stats)
+    if success:
+        bot.audit.record('rebuild_stats', interaction.user.id, result=message)
+    
+    embed = create_embed(
+        title="🔄 Statistics Rebuilt" if success else "❌ Rebuild Failed",
+        description=message,
+        color=discord.Color.green() if success else discord.Color.red()
+    )
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+def parse_audit_date(value: str):
+    """Parse a YYYY-MM-DD filter as the start of that day in UTC"""
+    return datetime.strptime(value.strip(), "%Y-%m-%d") if value else None
+
+def format_audit_event(event) -> str:
+    """One line of the audit command output"""
+    timestamp = int(event.occurred_at.replace(tzinfo=timezone.utc).timestamp())
+    line = f"<t:{timestamp}:f> **{event.action}** by <@{event.actor_id}>"
+    if event.player_id:
+        line += f" → <@{event.player_id}>"
+    if event.opponent_id:
+        line += f" vs <@{event.opponent_id}>"
+    details = ", ".join(f"{key}={value}" for key, value in event.details.items() if value not in (None, 0))
+    if details:
+        line += f"\n    `{details[:150]}`"
+    return line
+
+@bot.tree.command(name="audit", description="Search the admin audit log (Admin only)")
+@app_commands.describe(
+    player="Only actions affecting this player",
+    actor="Only actions taken by this member",
+    action="Only this kind of action",
+    since="From this date (YYYY-MM-DD, UTC)",
+    until="Before this date (YYYY-MM-DD, UTC)",
+    limit="Number of events to show (max 25)"
+)
+@app_commands.choices(action=[
+        app_commands.Choice(name="register_player", value="register_player"),
+        app_commands.Choice(name="remove_player", value="remove_player"),
+        app_commands.Choice(name="schedule_match", value="schedule_match"),
+        app_commands.Choice(name="queue_match", value="queue_match"),
+        app_commands.Choice(name="update_stats", value="update_stats"),
+        app_commands.Choice(name="record_result", value="record_result"),
+        app_commands.Choice(name="revert_result", value="revert_result"),
+        app_commands.Choice(name="rebuild_stats", value="rebuild_stats"),
+        app_commands.Choice(name="end_season", value="end_season"),
+        app_commands.Choice(name="restore", value="restore")
+])
+async def audit(
+    interaction: discord.Interaction,
+    player: TournamentPlayer = None,
+    actor: discord.Member = None,
+    action: app_commands.Choice[str] = None,
+    since: str = None,
+    until: str = None,
+    limit: app_commands.Range[int, 1, 25] = 10
+):
+    """Show who changed what, newest first"""
+    if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.administrator:
+        embed = create_embed(
+            title="❌ Access Denied",
+            description="Only administrators can view the audit log.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    try:
+        since_date = parse_audit_date(since)
+        until_date = parse_audit_date(until)
+    except ValueError:
+        embed = create_embed(
+            title="❌ Invalid Date",
+            description="Dates must use the YYYY-MM-DD format, e.g. `2025-01-31`.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True)
+    events = await asyncio.to_thread(
+        bot.audit.query,
+        player_id=player.id if player else None,
+        actor_id=actor.id if actor else None,
+        action=action.value if action else None,
+        since=since_date,
+        until=until_date,
+        limit=limit
+    )
+    
+    embed = create_embed(
+        title="📜 Audit Log",
+        description="\n".join(format_audit_event(event) for event in events)[:4000] or "No matching events.",
+        color=discord.Color.dark_grey()
+    )
+    embed.set_footer(text=f"{len(events)} event(s), newest first")
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+def write_export(kind: str, fmt: str, compress: bool) -> str:
+    """Stream an export into a temporary file and return its path"""
+    from export import export_stream
+    
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{fmt}") as handle:
+        try:
+            for chunk in export_stream(bot.db.db_path, kind, fmt, compress=compress, backend=bot.db.backend):
+                handle.write(chunk)
+        except BaseException:
+            # Nobody gets the path, so nobody else would clean it up
+            handle.close()
+            os.unlink(handle.name)
+            raise
+        return handle.name
+
+@bot.tree.command(name="export", description="Export players or match results as a file (Admin only)")
+@app_commands.describe(
+    table="What to export",
+    file_format="CSV for spreadsheets, NDJSON for scripts",
+    compress="Gzip the file (recommended for large tournaments)"
+)
+@app_commands.choices(
+    table=[
+        app_commands.Choice(name="Players", value="players"),
+        app_commands.Choice(name="Matches", value="matches")
+    ],
+    file_format=[
+        app_commands.Choice(name="CSV", value="csv"),
+        app_commands.Choice(name="NDJSON", value="ndjson")
+    ]
+)
+async def export_data(interaction: discord.Interaction, table: app_commands.Choice[str],
+                 file_format: app_commands.Choice[str] = None, compress: bool = True):
+    """Send a streamed export of players or matches as an attachment"""
+    if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.administrator:
+        embed = create_embed(
+            title="❌ Access Denied",
+            description="Only administrators can export tournament data.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    from export import export_filename
+    
+    fmt = file_format.value if file_format else "csv"
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    
+    path = None
+    try:
+        path = await asyncio.to_thread(write_export, table.value, fmt, compress)
+        size = os.path.getsize(path)
+        limit = interaction.guild.filesize_limit if interaction.guild else 10 * 1024 * 1024
+        
+        if size > limit:
+            embed = create_embed(
+                title="📦 Export Too Large",
+                description=f"The export is {size / 1024 / 1024:.1f} MB, above this server's upload limit.\n"
+                            f"Download it from the web dashboard at `/api/export/{table.value}?format={fmt}&gzip=1` "
+                            f"instead with the `EXPORT_TOKEN`, using `after` and `limit` to fetch it in parts.",
+                color=discord.Color.orange()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        
+        embed = create_embed(
+            title="📦 Export Ready",
+            description=f"**{table.name}** exported as {fmt.upper()}{' (gzip)' if compress else ''}.",
+            color=discord.Color.green()
+        )
+        file = discord.File(path, filename=export_filename(table.value, fmt, compress))
+        await interaction.followup.send(embed=embed, file=file, ephemeral=True)
+    except Exception as e:
+        logger.error(f"Error exporting {table.value}: {e}")
+        embed = create_embed(
+            title="❌ Export Failed",
+            description="The export could not be created. Check the bot logs for details.",
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+    finally:
+        if path:
+            os.remove(path)
+
+@bot.tree.command(name="backup", description="Take an online backup of the database now (Admin only)")
+async def backup(interaction: discord.Interaction):
+    """Write a compressed database snapshot while the bot keeps running"""
+    if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.administrator:
+        embed = create_embed(
+            title="❌ Access Denied",
+            description="Only administrators can back up the database.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        result = await asyncio.to_thread(bot.backups.create_backup)
+    except Exception as e:
+        logger.error(f"Error creating backup: {e}")
+        embed = create_embed(
+            title="❌ Backup Failed",
+            description="The backup could not be created. Check the bot logs for details.",
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return
+    
+    embed = create_embed(
+        title="💾 Backup Complete",
+        description=f"`{result.name}`",
+        color=discord.Color.green()
+    )
+    embed.add_field(name="⏱️ Duration", value=f"**{result.duration:.2f}s**", inline=True)
+    embed.add_field(name="🗄️ Database", value=f"**{result.db_size / 1024:.0f} KiB**", inline=True)
+    embed.add_field(name="📦 Snapshot", value=f"**{result.snapshot_size / 1024:.0f} KiB**", inline=True)
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="archive", description="Move removed players and old matches to the archive now (Admin only)")
+async def archive(interaction: discord.Interaction):
+    """Run the archiver outside its schedule and report what it moved"""
+    if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.administrator:
+        embed = create_embed(
+            title="❌ Access Denied",
+            description="Only administrators can run the archiver.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        result = await asyncio.to_thread(bot.archive.run)
+    except Exception as e:
+        logger.error(f"Error archiving: {e}")
+        embed = create_embed(
+            title="❌ Archive Failed",
+            description="The archive run failed. Check the bot logs for details.",
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return
+    
+    embed = create_embed(
+        title="🗃️ Archive Complete",
+        description=f"Archived **{result.players}** players and **{result.matches}** matches.",
+        color=discord.Color.green()
+    )
+    embed.add_field(name="⏱️ Duration", value=f"**{result.duration:.2f}s**", inline=True)
+    embed.add_field(name="👥 Active Table", value=f"**{result.hot_players}** players", inline=True)
+    embed.add_field(name="⚔️ Match Table", value=f"**{result.hot_matches}** matches", inline=True)
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="end_season", description="End the season and reset all player stats (Admin only)")
+@app_commands.describe(name="Name for the season being ended, e.g. Season 3")
+async def end_season(interaction: discord.Interaction, name: str):
+    """Freeze the final standings, compute awards and start the next season from zero"""
+    if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.administrator:
+        embed = create_embed(
+            title="❌ Access Denied",
+            description="Only administrators can end the season.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        result = await asyncio.to_thread(bot.seasons.end_season, name[:100])
+        bot.audit.record('end_season', interaction.user.id, season=result.season_id, name=result.name)
+    except Exception as e:
+        logger.error(f"Error ending season: {e}")
+        embed = create_embed(
+            title="❌ Season Rollover Failed",
+            description="The season could not be ended. Check the bot logs for details.",
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return
+    
+    embed = create_embed(
+        title="🏁 Season Ended",
+        description=f"**{result.name}** is over; every player starts the next season from zero.",
+        color=discord.Color.green()
+    )
+    embed.add_field(name="👥 Ranked", value=f"**{result.players}** players", inline=True)
+    embed.add_field(name="⚔️ Matches", value=f"**{result.matches}**", inline=True)
+    embed.add_field(name="⏱️ Duration", value=f"**{result.duration:.2f}s**", inline=True)
+    embed.set_footer(text="Use /season to see the final standings and awards")
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="season", description="Show the final standings and awards of a past season")
+@app_commands.describe(season="Season number; the latest finished season if omitted")
+@rate_limited("season", user="2/30", guild="10/60", global_="60/60")
+async def season_standings(interaction: discord.Interaction, season: int = None):
+    """Display a finished season from its precomputed standings"""
+    await interaction.response.defer()
+    record = await asyncio.to_thread(bot.db.get_season, season)
+    
+    if record is None or record.status != 'final':
+        embed = create_embed(
+            title="📅 Seasons",
+            description="No finished season yet!" if season is None else f"Season {season} has not finished.",
+            color=discord.Color.blue()
+        )
+        await interaction.followup.send(embed=embed)
+        return
+    
+    standings, awards = await asyncio.gather(
+        asyncio.to_thread(bot.db.get_season_standings, record.id, 10),
+        asyncio.to_thread(bot.db.get_season_awards, record.id)
+    )
+    
+    embed = create_embed(
+        title=f"🏁 {record.name}",
+        description=f"Season {record.id}: {record.player_count} players, {record.match_count} matches",
+        color=discord.Color.gold()
+    )
+    medals = ["🥇", "🥈", "🥉"]
+    standings_text = ""
+    for standing in standings:
+        medal = medals[standing.rank - 1] if standing.rank <= 3 else f"#{standing.rank}"
+        standings_text += (f"{medal} **{standing.username}** "
+                           f"{standing.wins}W-{standing.losses}L-{standing.draws}D, {standing.kills} kills\n")
+    embed.add_field(name="🏆 Final Standings", value=standings_text or "No matches were played.", inline=False)
+    
+    if awards:
+        awards_text = ""
+        for award, standing, value in awards:
+            label = AWARDS[award][1]
+            shown = f"{value:.2f}" if award == 'best_kd' else f"{value:.0f}"
+            awards_text += f"**{label}**: {standing.username} ({shown})\n"
+        embed.add_field(name="🎖️ Awards", value=awards_text, inline=False)
+    embed.set_footer(text=f"Ended: {str(record.ended_at)[:16]}")
+    
+    await send_response(interaction, embed)
+
+@bot.tree.command(name="restore", description="Restore the database from a backup (Admin only)")
+@app_commands.describe(snapshot="Backup to restore; the current state is backed up first")
+async def restore(interaction: discord.Interaction, snapshot: str):
+    """Swap the live database for a snapshot without restarting the bot"""
+    if not hasattr(interaction.user, 'guild_permissions') or not interaction.user.guild_permissions.administrator:
+        embed = create_embed(
+            title="❌ Access Denied",
+            description="Only administrators can restore the database.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        result = await asyncio.to_thread(bot.backups.restore, snapshot)
+        bot.audit.record('restore', interaction.user.id, snapshot=snapshot)
+    except FileNotFoundError:
+        embed = create_embed(
+            title="❌ Backup Not Found",
+            description=f"There is no backup named `{snapshot}`.",
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return
+    except Exception as e:
+        logger.error(f"Error restoring backup {snapshot}: {e}")
+        embed = create_embed(
+            title="❌ Restore Failed",
+            description="The live database was left unchanged. Check the bot logs for details.",
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        return
+    
+    embed = create_embed(
+        title="♻️ Database Restored",
+        description=f"Restored from `{result.name}` in **{result.duration:.2f}s**.\n"
+                    f"The previous state was saved as a `pre-restore` backup.",
+        color=discord.Color.green()
+    )
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+@restore.autocomplete('snapshot')
+async def restore_snapshot_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggest available backups, newest first"""
+    snapshots = await asyncio.to_thread(bot.backups.list_snapshots)
+    return [
+        app_commands.Choice(name=name, value=name)
+        for name in snapshots if current.lower() in name.lower()
+    ][:25]
+
+@bot.tree.command(name="head_to_head", description="Show the head-to-head record between two players")
+@app_commands.describe(player1="First player", player2="Second player")
+@rate_limited("head_to_head", user="3/15", guild="20/60", global_="120/60")
+async def head_to_head(interaction: discord.Interaction, player1: TournamentPlayer, player2: TournamentPlayer):
+    """Display the head-to-head record between two players"""
+    await interaction.response.defer()
+    record = await asyncio.to_thread(bot.db.get_head_to_head, str(player1.id), str(player2.id))
+    
+    if record is None:
+        embed = create_embed(
+            title="❌ Player Not Found",
+            description="Both players must be registered for the tournament.",
+            color=discord.Color.red()
+        )
+        await interaction.followup.send(embed=embed)
+        return
+    
+    embed = create_embed(
+        title="⚔️ Head to Head",
+        description=f"**{player1.display_name}** vs **{player2.display_name}**",
+        color=discord.Color.purple()
+    )
+    embed.add_field(name="🎮 Matches", value=f"**{record['matches']}**", inline=True)
+    embed.add_field(
+        name="🏆 Record",
+        value=f"**{record['player1_wins']}** - **{record['draws']}** - **{record['player2_wins']}**",
+        inline=True
+    )
+    embed.add_field(
+        name="⚔️ Kills",
+        value=f"**{record['player1_kills']}** - **{record['player2_kills']}**",
+        inline=True
+    )
+    if record['last_played_at']:
+        embed.set_footer(text=f"Last played: {record['last_played_at'][:16]}")
+    
+    await send_response(interaction, embed)
 
 @bot.tree.command(name="all_players", description="Show all registered tournament players")
+@rate_limited("all_players", user="2/60", guild="6/60", global_="30/60")
 async def all_players(interaction: discord.Interaction):
     """Display all registered players"""
-    players = bot.db.get_all_players()
+    await interaction.response.defer()
+    players = await asyncio.to_thread(bot.db.get_all_players)
     
     if not players:
         embed = create_embed(
@@ -418,7 +1499,7 @@ async def all_players(interaction: discord.Interaction):
             description="No players registered yet!",
             color=discord.Color.blue()
         )
-        await interaction.response.send_message(embed=embed)
+        await interaction.followup.send(embed=embed)
         return
     
     embed = create_embed(
@@ -429,9 +1510,9 @@ async def all_players(interaction: discord.Interaction):
     
     players_text = ""
     for i, player in enumerate(players, 1):
-        total_matches = player['wins'] + player['losses'] + player['draws']
-        players_text += f"**{i}.** {player['username']} "
-        players_text += f"({player['wins']}W-{player['losses']}L-{player['draws']}D)\n"
+        total_matches = player.wins + player.losses + player.draws
+        players_text += f"**{i}.** {player.username} "
+        players_text += f"({player.wins}W-{player.losses}L-{player.draws}D)\n"
     
     # Split into multiple fields if too long
     if len(players_text) > 1024:
@@ -451,7 +1532,7 @@ async def all_players(interaction: discord.Interaction):
     
     embed.set_footer(text="Ready for battle!")
     
-    await interaction.response.send_message(embed=embed)
+    await send_response(interaction, embed)
 
 @bot.tree.command(name="help", description="Show all available commands")
 async def help_command(interaction: discord.Interaction):
@@ -469,6 +1550,10 @@ async def help_command(interaction: discord.Interaction):
               "`/help` - Show this help message\n"
               "`/player_stats` - View player statistics\n"
               "`/leaderboard` - Tournament rankings\n"
+              "`/season` - Final standings and awards of a past season\n"
+              "`/head_to_head` - Head-to-head record of two players\n"
+              "`/queue` - Join or leave the matchmaking queue\n"
+              "`/find_player` - Search players by name\n"
               "`/all_players` - List all registered players",
         inline=False
     )
@@ -479,7 +1564,18 @@ async def help_command(interaction: discord.Interaction):
         value="`/register_player` - Register new player\n"
               "`/remove_player` - Remove player from tournament\n"
               "`/schedule_match` - Schedule player vs player match\n"
-              "`/update_stats` - Update player win/loss/kill stats",
+              "`/update_stats` - Update player win/loss/kill stats\n"
+              "`/record_result` - Record a match result\n"
+              "`/revert_result` - Undo a recorded match result\n"
+              "`/rebuild_stats` - Recompute stats from the match log\n"
+              "`/export` - Download players or matches as CSV/NDJSON\n"
+              "`/audit` - Search the admin audit log\n"
+              "`/backup` - Take an online database backup\n"
+              "`/archive` - Archive removed players and old matches\n"
+              "`/end_season` - End the season and reset player stats\n"
+              "`/pin_leaderboard` - Post a leaderboard that updates itself\n"
+              "`/unpin_leaderboard` - Remove the live leaderboard\n"
+              "`/restore` - Restore the database from a backup",
         inline=False
     )
     
@@ -497,8 +1593,8 @@ async def help_command(interaction: discord.Interaction):
     
     await interaction.response.send_message(embed=embed)
 
-def run_bot():
-    """Start the Discord bot"""
+def run_bot(web_port: int = None):
+    """Start the Discord bot, optionally with the web dashboard on the same event loop"""
     token = os.getenv('DISCORD_TOKEN')
     if not token:
         logger.error("DISCORD_TOKEN not found in environment variables!")
@@ -508,6 +1604,7 @@ def run_bot():
     logger.info("Starting Duel Lords Discord Bot...")
     print("Starting Duel Lords Discord Bot...")
     
+    bot.web_port = web_port
     try:
         bot.run(token, log_handler=None, log_level=logging.INFO)
     except discord.LoginFailure:
@@ -0,0 +1,407 @@
+"""
+Leaderboard and player stat cards rendered as PNG images
+Cards are drawn in pure Python, with a built-in bitmap font and a zlib/struct PNG encoder,
+on a small worker pool and kept in a size-bounded on-disk LRU, named after the player and a
+digest of the values drawn.
+Commands only attach cards that are already on disk; the change feed re-renders cards
+that have been asked for once the data behind them changes.
+"""
+
+import os
+import math
+import zlib
+import struct
+import hashlib
+import logging
+import threading
+import functools
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes so cards drawn by an older version are replaced
+CARD_STYLE = 2
+LEADERBOARD_SIZE = 10
+WIDTH = 800
+
+BACKGROUND = (24, 26, 33)
+PANEL = (37, 40, 51)
+TEXT = (236, 238, 244)
+MUTED = (150, 156, 172)
+ACCENT = (88, 101, 242)
+WIN = (46, 204, 113)
+LOSS = (231, 76, 60)
+MEDALS = ((241, 196, 15), (189, 195, 199), (205, 127, 50))
+
+def _digest(values) -> str:
+    return hashlib.sha1(repr((CARD_STYLE, values)).encode()).hexdigest()[:16]
+
+def player_version(player) -> str:
+    """Digest of everything a player card shows; a new digest means a new card"""
+    return _digest((player.username, player.wins, player.losses, player.draws, player.kills, player.deaths))
+
+def leaderboard_version(players) -> str:
+    """Digest of the rows the leaderboard card shows"""
+    return _digest([
+        (player.discord_id, player.username, player.wins, player.losses, player.draws, player.kills, player.deaths)
+        for player in players[:LEADERBOARD_SIZE]
+    ])
+
+# 5x8 bitmap glyphs for ASCII 32-126: ten hex digits each, eight rows of five bits, top
+# row first. Rows 0-6 are the cap height and row 7 is the descender.
+GLYPHS = (
+    '00000000002108420080529400000052beafa94023e8e2f880c644444c6064a88ac9a021080000001110841040'
+    '4104211100012aea90000109f2100000000030880001f000000000003180004444400074675cc5c023084211c0'
+    '74422223e0f88820c5c011952f8840fc3c10c5c03221e8c5c0f8444421007462e8c5c07462f089800318063000'
+    '03180611001111041040003e0f8000410411110074422200807442dad5c07463f8c620f463e8c7c074610845c0'
+    'e4a318cb80fc21e843e0fc21e84200746178c5e08c63f8c62071084211c038842149808ca98a4a2084210843e0'
+    '8eeb58c6208c7359c620746318c5c0f463e8420074631ac9a0f463ea4a207c20e087c0f9084210808c6318c5c0'
+    '8c6318a8808c635ad5408c544546208c62a21080f8444443e072108421c0041041040070842109c022a2000000'
+    '00000003e04104000000001c17c5e0842d98c7c0001d0845c0085b38c5e0001d1fc1c03251c42100001f18bc2e'
+    '842d98c62020184211c0100c210a4c84254c524061084211c000355ac620002d98c620001d18c5c0003d18fa10'
+    '001f18bc21002d984200001f0707c042388424c0002318cda0002318a88000231ad5400022a22a20002318bc2e'
+    '003e2223e01108821040210842108041082211000011510000'
+)
+ELLIPSIS = '…'
+GLYPH_WIDTH, GLYPH_HEIGHT = 5, 8
+
+@functools.lru_cache(maxsize=None)
+def _glyph(char: str):
+    """Horizontal runs (row, column, length) of a character's set pixels"""
+    if char == ELLIPSIS:
+        bits = 0b10101 << 5
+    else:
+        code = ord(char) if 32 <= ord(char) < 127 else ord('?')
+        bits = int(GLYPHS[(code - 32) * 10:(code - 31) * 10], 16)
+    runs = []
+    for row in range(GLYPH_HEIGHT):
+        line = bits >> (5 * (GLYPH_HEIGHT - 1 - row)) & 0b11111
+        column = 0
+        while column < GLYPH_WIDTH:
+            if line & (0b10000 >> column):
+                start = column
+                while column < GLYPH_WIDTH and line & (0b10000 >> column):
+                    column += 1
+                runs.append((row, start, column - start))
+            else:
+                column += 1
+    return runs
+
+def _printable(text: str) -> str:
+    """Text the font can draw: accents stripped, anything else outside ASCII shown as ?"""
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if c == ELLIPSIS or not unicodedata.combining(c))
+
+def _scale(size: int) -> int:
+    """Pixels per font dot for a nominal font size"""
+    return max(1, round(size / 10))
+
+def _text_length(text: str, size: int) -> int:
+    return max(0, len(text) * (GLYPH_WIDTH + 1) - 1) * _scale(size)
+
+class Canvas:
+    """RGB image in a bytearray with the few drawing operations the cards need"""
+
+    def __init__(self, width: int, height: int, color):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(bytes(color) * (width * height))
+
+    def _span(self, y: int, left: int, right: int, color):
+        """Fill pixels left..right inclusive on row y, clipped to the image"""
+        left, right = max(0, left), min(self.width - 1, right)
+        if 0 <= y < self.height and left <= right:
+            start = (y * self.width + left) * 3
+            self.pixels[start:start + (right - left + 1) * 3] = bytes(color) * (right - left + 1)
+
+    def rectangle(self, box, fill):
+        left, top, right, bottom = (round(v) for v in box)
+        for y in range(top, bottom + 1):
+            self._span(y, left, right, fill)
+
+    def rounded_rectangle(self, box, radius: int, fill):
+        left, top, right, bottom = (round(v) for v in box)
+        radius = min(radius, (right - left) // 2, (bottom - top) // 2)
+        for y in range(top, bottom + 1):
+            # Distance into the corner arc from the nearest horizontal edge
+            dy = radius - min(y - top, bottom - y) - 0.5
+            inset = round(radius - math.sqrt(max(0.0, radius * radius - dy * dy))) if dy > 0 else 0
+            self._span(y, left + inset, right - inset, fill)
+
+    def text(self, position, text: str, size: int, fill):
+        """Draw text with its top-left corner at position"""
+        x, y = (round(v) for v in position)
+        scale = _scale(size)
+        for char in _printable(text):
+            for row, column, length in _glyph(char):
+                left = x + column * scale
+                for dy in range(scale):
+                    self._span(y + row * scale + dy, left, left + length * scale - 1, fill)
+            x += (GLYPH_WIDTH + 1) * scale
+
+    def png(self) -> bytes:
+        """The image encoded as an 8-bit RGB PNG"""
+        stride = self.width * 3
+        # Filter type 0 (none) in front of every row
+        raw = b''.join(b'\x00' + self.pixels[y * stride:(y + 1) * stride] for y in range(self.height))
+
+        def chunk(kind: bytes, data: bytes) -> bytes:
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+        header = struct.pack('>IIBBBBB', self.width, self.height, 8, 2, 0, 0, 0)
+        return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw, 6))
+                + chunk(b'IEND', b''))
+
+def _fit(text: str, size: int, width: int) -> str:
+    """Text shortened with an ellipsis until it fits in width pixels"""
+    text = _printable(text)
+    if _text_length(text, size) <= width:
+        return text
+    while text and _text_length(text + ELLIPSIS, size) > width:
+        text = text[:-1]
+    return text + ELLIPSIS
+
+def render_player_card(player) -> bytes:
+    """PNG stat card for one PlayerRow"""
+    image = Canvas(WIDTH, 280, BACKGROUND)
+    image.rectangle((0, 0, 8, 280), fill=ACCENT)
+
+    image.text((36, 28), _fit(player.username, 40, WIDTH - 72), 40, TEXT)
+    image.text((36, 84), f"{player.wins}W  {player.losses}L  {player.draws}D", 24, MUTED)
+
+    # Win rate bar
+    bar_left, bar_right = 36, WIDTH - 36
+    image.rounded_rectangle((bar_left, 124, bar_right, 140), radius=8, fill=PANEL)
+    filled = bar_left + (bar_right - bar_left) * player.win_rate / 100
+    if filled > bar_left + 16:
+        image.rounded_rectangle((bar_left, 124, filled, 140), radius=8, fill=WIN)
+
+    tiles = (
+        ("WIN RATE", f"{player.win_rate:.1f}%"),
+        ("K/D", f"{player.kd_ratio:.2f}"),
+        ("KILLS", str(player.kills)),
+        ("DEATHS", str(player.deaths)),
+        ("MATCHES", str(player.total_matches)),
+    )
+    tile_width = (WIDTH - 72 - 4 * 12) // len(tiles)
+    for i, (label, value) in enumerate(tiles):
+        left = 36 + i * (tile_width + 12)
+        image.rounded_rectangle((left, 164, left + tile_width, 252), radius=10, fill=PANEL)
+        image.text((left + 14, 178), label, 15, MUTED)
+        image.text((left + 14, 208), _fit(value, 30, tile_width - 28), 30, TEXT)
+    return image.png()
+
+def render_leaderboard_card(players) -> bytes:
+    """PNG card of the top LEADERBOARD_SIZE PlayerRows"""
+    rows = players[:LEADERBOARD_SIZE]
+    row_height = 56
+    image = Canvas(WIDTH, 96 + row_height * max(len(rows), 1), BACKGROUND)
+    image.text((36, 28), "Duel Lords Leaderboard", 36, TEXT)
+
+    if not rows:
+        image.text((36, 100), "No players registered yet", 24, MUTED)
+    for i, player in enumerate(rows):
+        top = 88 + i * row_height
+        image.rounded_rectangle((24, top, WIDTH - 24, top + row_height - 8), radius=10, fill=PANEL)
+        badge = MEDALS[i] if i < len(MEDALS) else MUTED
+        image.text((44, top + 12), f"#{i + 1}", 26, badge)
+        image.text((116, top + 12), _fit(player.username, 26, 288), 26, TEXT)
+        image.text((440, top + 16), f"{player.wins}W-{player.losses}L-{player.draws}D", 20, MUTED)
+        image.text((580, top + 16), f"{player.win_rate:.1f}%", 20, WIN if player.win_rate >= 50 else LOSS)
+        image.text((676, top + 16), f"{player.kills} K", 20, MUTED)
+    return image.png()
+
+class CardCache:
+    """Directory of rendered cards, evicting the least recently used past max_bytes"""
+
+    def __init__(self, directory: str = 'cards', max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        # file name -> size, least recently used first
+        self._files = OrderedDict()
+        # card name -> file name of its newest version
+        self._current = {}
+
+        os.makedirs(directory, exist_ok=True)
+        # Recency is tracked in memory; after a restart files are ordered by when they were written
+        existing = []
+        for name in os.listdir(directory):
+            if name.endswith('.png'):
+                stat = os.stat(os.path.join(directory, name))
+                existing.append((stat.st_mtime, name, stat.st_size))
+        with self._lock:
+            for _, name, size in sorted(existing):
+                self._add(name, size)
+            self._evict()
+
+    def __len__(self):
+        return len(self._files)
+
+    @staticmethod
+    def file_name(card: str, version: str) -> str:
+        return f"{card}-{version}.png"
+
+    def _add(self, name: str, size: int):
+        card = name.rsplit('-', 1)[0]
+        previous = self._current.get(card)
+        if previous is not None and previous != name:
+            self._discard(previous)
+        self._current[card] = name
+        self.total_bytes += size - self._files.pop(name, 0)
+        self._files[name] = size
+
+    def _discard(self, name: str):
+        self.total_bytes -= self._files.pop(name, 0)
+        card = name.rsplit('-', 1)[0]
+        if self._current.get(card) == name:
+            del self._current[card]
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._files) > 1:
+            self._discard(next(iter(self._files)))
+
+    def get(self, card: str, version: str) -> Optional[str]:
+        """Path of this version of a card if it is on disk, marking it recently used"""
+        name = self.file_name(card, version)
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            if name in self._files:
+                self._files.move_to_end(name)
+                if os.path.exists(path):
+                    return path
+                # Evicted by another process sharing the directory
+                self._discard(name)
+                return None
+        # Rendered by another process sharing the directory
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        with self._lock:
+            self._add(name, size)
+            self._evict()
+        return path
+
+    def put(self, card: str, version: str, data: bytes) -> str:
+        """Store a rendered card, replacing older versions of it; returns its path"""
+        name = self.file_name(card, version)
+        path = os.path.join(self.directory, name)
+        partial = os.path.join(self.directory, f".{name}.{threading.get_ident()}.tmp")
+        with open(partial, 'wb') as f:
+            f.write(data)
+        # Readers in other processes never see a half-written file
+        os.replace(partial, path)
+        with self._lock:
+            self._add(name, len(data))
+            self._evict()
+        return path
+
+class CardRenderer:
+    """Renders cards on a worker pool and hands out the ones already in the CardCache"""
+
+    def __init__(self, db, cache: CardCache, workers: int = 2):
+        self.db = db
+        self.cache = cache
+        self.rendered = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='card-render')
+        self._lock = threading.Lock()
+        self._pending = set()
+        # Cards someone has asked for, kept fresh as the change feed reports changes
+        self._followed = set()
+
+    def player_card(self, player, wait: bool = False) -> Optional[str]:
+        """Path of a PlayerRow's current card; None if it is still being rendered, unless wait"""
+        return self._card(f"player-{player.discord_id}", player_version(player), render_player_card, player, wait)
+
+    def leaderboard_card(self, players, wait: bool = False) -> Optional[str]:
+        """Path of the current leaderboard card for these rows, best first"""
+        return self._card('leaderboard', leaderboard_version(players), render_leaderboard_card, players, wait)
+
+    def _card(self, card: str, version: str, draw, data, wait: bool) -> Optional[str]:
+        with self._lock:
+            self._followed.add(card)
+        path = self.cache.get(card, version)
+        if path is not None:
+            return path
+        if wait:
+            return self._render(card, version, draw, data)
+        self._submit(card, version, draw, data)
+        return None
+
+    def _submit(self, card: str, version: str, draw, data):
+        with self._lock:
+            if (card, version) in self._pending:
+                return
+            self._pending.add((card, version))
+        self._pool.submit(self._render, card, version, draw, data)
+
+    def _render(self, card: str, version: str, draw, data) -> Optional[str]:
+        try:
+            path = self.cache.put(card, version, draw(data))
+            self.rendered += 1
+            return path
+        except Exception as e:
+            logger.error(f"Error rendering card {card}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._pending.discard((card, version))
+
+    def on_changes(self, changes):
+        """Change feed subscriber: re-render followed cards whose data changed"""
+        if changes.leaderboard:
+            self._pool.submit(self._refresh, changes)
+
+    def _refresh(self, changes):
+        with self._lock:
+            followed = set(self._followed)
+        try:
+            if 'leaderboard' in followed:
+                players = self.db.get_leaderboard(LEADERBOARD_SIZE)
+                if self.cache.get('leaderboard', leaderboard_version(players)) is None:
+                    self._submit('leaderboard', leaderboard_version(players), render_leaderboard_card, players)
+
+            changed = {card[len('player-'):] for card in followed if card.startswith('player-')}
+            if not changes.full:
+                changed &= changes.players
+            for discord_id in changed:
+                player = self.db.get_player(discord_id)
+                if player is None:
+                    continue
+                card = f"player-{discord_id}"
+                if self.cache.get(card, player_version(player)) is None:
+                    self._submit(card, player_version(player), render_player_card, player)
+        except Exception as e:
+            logger.error(f"Error refreshing cards: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'files': len(self.cache),
+            'bytes': self.cache.total_bytes,
+            'rendered': self.rendered,
+            'pending': len(self._pending),
+        }
+
+    def close(self):
+        """Stop the workers, dropping renders that have not started"""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+def card_renderer_from_env(db) -> CardRenderer:
+    """CardRenderer configured from the CARD_* environment variables"""
+    return CardRenderer(
+        db,
+        CardCache(
+            directory=os.getenv('CARD_CACHE_DIR', 'cards'),
+            max_bytes=int(float(os.getenv('CARD_CACHE_MB', '64')) * 1024 * 1024)
+        ),
+        workers=int(os.getenv('CARD_RENDER_WORKERS', '2'))
+    )
@@ -0,0 +1,152 @@
+"""
+Change feed for invalidating in-process caches across the bot and web processes
+Triggers append every write to the change_log table. On SQLite each process polls PRAGMA
+data_version on its own connection, which only moves when another connection has
+committed, and reads the new change_log rows only then. On PostgreSQL the triggers also
+NOTIFY, and the feed LISTENs instead of polling.
+"""
+
+import time
+import logging
+import threading
+from typing import NamedTuple, FrozenSet
+
+from backends import SQLiteBackend
+
+logger = logging.getLogger(__name__)
+
+class ChangeSet(NamedTuple):
+    """What changed between two polls"""
+    players: FrozenSet[str]
+    matches: FrozenSet[int]
+    results: FrozenSet[int]
+    # True when the log cannot say what changed (e.g. after a restore); drop everything
+    full: bool = False
+
+    @property
+    def leaderboard(self) -> bool:
+        return self.full or bool(self.players)
+
+class ChangeFeed:
+    """Background poller delivering ChangeSets to subscribed callbacks"""
+
+    def __init__(self, db_path="duel_lords.db", poll_interval_ms: int = 20, backend=None):
+        self.backend = backend or SQLiteBackend(db_path)
+        self.poll_interval = poll_interval_ms / 1000
+        self._subscribers = []
+        self._stopped = threading.Event()
+        self._thread = None
+        self._conn = None
+        self._version = None
+        self._last_id = 0
+
+        self.latency_ms_last = None
+        self.latency_ms_max = 0.0
+        self.changes_seen = 0
+
+    def subscribe(self, callback):
+        """Call callback(change_set) from the feed thread for every batch of changes"""
+        self._subscribers.append(callback)
+        return callback
+
+    def start(self):
+        """Start following the log from its current end"""
+        listen = getattr(self.backend, 'listen', None)
+        if listen is not None:
+            # Subscribe before reading the position so no commit falls in between
+            self._conn = listen()
+            cursor = self._conn.cursor()
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM change_log')
+            self._last_id = cursor.fetchone()[0]
+            target = self._listen
+        else:
+            self._conn = self.backend.connect()
+            self._version = self.backend.data_version(self._conn)
+            self._last_id = self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM change_log').fetchone()[0]
+            target = self._run
+        self._thread = threading.Thread(target=target, name="change-feed", daemon=True)
+        self._thread.start()
+        logger.info(f"Change feed started at change {self._last_id}")
+
+    def _run(self):
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                self.poll()
+            except self.backend.Error as e:
+                logger.error(f"Change feed poll failed: {e}")
+
+    def _listen(self):
+        while not self._stopped.is_set():
+            try:
+                payloads = self.backend.wait_notifications(self._conn, self.poll_interval)
+            except self.backend.Error as e:
+                logger.error(f"Change feed listen failed: {e}")
+                self._stopped.wait(1)
+                continue
+            if payloads:
+                # Payloads are "id table changed_at row_key", sent in commit order
+                entries = []
+                for payload in payloads:
+                    entry_id, table, changed_at, key = payload.split(' ', 3)
+                    entries.append((int(entry_id), table, key, float(changed_at)))
+                self._collect(entries)
+
+    def poll(self):
+        """Deliver changes committed since the last poll; returns the ChangeSet or None"""
+        version = self.backend.data_version(self._conn)
+        if version == self._version:
+            return None
+        self._version = version
+
+        rows = self._conn.execute(
+            'SELECT id, table_name, row_key, changed_at FROM change_log WHERE id > ? ORDER BY id',
+            (self._last_id,)
+        ).fetchall()
+        if not rows:
+            # The log shrank below our position, e.g. a restore replaced the database
+            newest = self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM change_log').fetchone()[0]
+            if newest >= self._last_id:
+                return None
+            self._last_id = newest
+            return self._deliver(ChangeSet(frozenset(), frozenset(), frozenset(), full=True))
+        return self._collect(rows)
+
+    def _collect(self, rows) -> ChangeSet:
+        """Group (id, table, row_key, changed_at) log entries into one ChangeSet and deliver it"""
+        keys = {'players': set(), 'matches': set(), 'match_results': set()}
+        for _, table, key, _ in rows:
+            keys[table].add(key if table == 'players' else int(key))
+        self._last_id = max(self._last_id, rows[-1][0])
+
+        latency = (time.time() - rows[-1][3]) * 1000
+        self.latency_ms_last = round(latency, 1)
+        self.latency_ms_max = max(self.latency_ms_max, self.latency_ms_last)
+        self.changes_seen += len(rows)
+        return self._deliver(ChangeSet(
+            frozenset(keys['players']), frozenset(keys['matches']), frozenset(keys['match_results'])
+        ))
+
+    def _deliver(self, changes: ChangeSet) -> ChangeSet:
+        for callback in self._subscribers:
+            try:
+                callback(changes)
+            except Exception as e:
+                logger.error(f"Change feed subscriber {getattr(callback, '__qualname__', callback)} failed: {e}")
+        return changes
+
+    def stats(self) -> dict:
+        """Propagation figures for status endpoints"""
+        return {
+            'position': self._last_id,
+            'changes_seen': self.changes_seen,
+            'latency_ms_last': self.latency_ms_last,
+            'latency_ms_max': self.latency_ms_max,
+        }
+
+    def close(self):
+        """Stop polling"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._conn is not None:
+            self._conn.close()
@@ -1,22 +1,75 @@
-import sqlite3
+import os
 import logging
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta
 from contextlib import contextmanager
+from typing import NamedTuple
+from backends import backend_from_env
+from rank_history import encode_point, decode_series
+from search import TrigramIndex, PrefixTrie
+from stats_buffer import StatsBuffer
+from writer import writer_for
+from rows import PlayerRow, UpcomingMatchRow, MatchResultRow, SeasonRow, SeasonStandingRow, PinnedLeaderboardRow, PLAYER_COLUMNS, columns
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever init_database changes so existing databases are migrated
+SCHEMA_VERSION = 8
+
+# Columns copied between each hot table and its archive
+ARCHIVE_COLUMNS = {
+    'players': PLAYER_COLUMNS,
+    'matches': ('id, player1_id, player2_id, scheduled_time, created_at, status, winner_id, '
+                'player1_kills, player2_kills, notes, reminder_sent'),
+}
+
+class Outcome(NamedTuple):
+    """Result of a command's mutation; replayed marks the stored result of a retried interaction"""
+    success: bool
+    message: str
+    replayed: bool = False
+
 class DatabaseManager:
     """Database manager for Duel Lords tournament data"""
     
-    def __init__(self, db_path="duel_lords.db"):
+    def __init__(self, db_path="duel_lords.db", write_behind=False, backend=None):
         self.db_path = db_path
-        self.init_database()
+        # SQLite at db_path unless DATABASE_URL selects PostgreSQL
+        self.backend = backend or backend_from_env(db_path)
+        # Every mutation goes through the process's single writer for this database
+        self.writer = writer_for(self.backend)
+        self._search_index = None
+        self._player_trie = None
+        self._index_lock = threading.Lock()
+        
+        # Optional write-behind mode for stat updates
+        self.stats_buffer = None
+        if write_behind:
+            self.ensure_schema()
+            self.stats_buffer = StatsBuffer(
+                self,
+                f"{db_path}.stats-journal",
+                flush_interval_ms=int(os.getenv('STATS_FLUSH_INTERVAL_MS', '500')),
+                max_entries=int(os.getenv('STATS_FLUSH_MAX_ENTRIES', '100'))
+            )
+            self.stats_buffer.start()
+    
+    def close(self):
+        """Flush buffered writes before shutdown"""
+        if self.stats_buffer is not None:
+            self.stats_buffer.close()
+        self.writer.close()
+    
+    def _read_barrier(self):
+        """Commit buffered stat deltas so reads see every acknowledged update"""
+        if self.stats_buffer is not None and self.stats_buffer.has_pending():
+            self.stats_buffer.flush()
     
     @contextmanager
     def get_db_connection(self):
         """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self.backend.connect(named_rows=True)
         try:
             yield conn
         except Exception as e:
@@ -26,13 +79,41 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    def write(self, fn):
+        """Run fn(cursor) as one write in the writer's next group commit and return its result"""
+        return self.writer.run(fn)
+    
+    @staticmethod
+    def _tuple_cursor(conn):
+        """Cursor returning plain tuples, for building typed rows"""
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        return cursor
+    
+    def ensure_schema(self):
+        """Migrate only when the database is behind SCHEMA_VERSION"""
+        with self.get_db_connection() as conn:
+            version = self.backend.schema_version(conn)
+        if version < SCHEMA_VERSION:
+            logger.warning(f"Database schema is at version {version}, migrating to {SCHEMA_VERSION}")
+            self.migrate()
+    
+    def migrate(self):
+        """Create or upgrade all tables and record the schema version"""
+        self.init_database()
+        with self.get_db_connection() as conn:
+            self.backend.set_schema_version(conn, SCHEMA_VERSION)
+            conn.commit()
+        logger.info(f"Database migrated to schema version {SCHEMA_VERSION}")
+    
     def init_database(self):
         """Initialize database tables"""
+        ddl = self.backend.ddl
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
             
             # Players table
-            cursor.execute('''
+            cursor.execute(ddl('''
                 CREATE TABLE IF NOT EXISTS players (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     discord_id TEXT UNIQUE NOT NULL,
@@ -45,10 +126,10 @@ class DatabaseManager:
                     registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     is_active BOOLEAN DEFAULT 1
                 )
-            ''')
+            '''))
             
             # Matches table
-            cursor.execute('''
+            cursor.execute(ddl('''
                 CREATE TABLE IF NOT EXISTS matches (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     player1_id INTEGER NOT NULL,
@@ -65,10 +146,272 @@ class DatabaseManager:
                     FOREIGN KEY (player2_id) REFERENCES players (id),
                     FOREIGN KEY (winner_id) REFERENCES players (id)
                 )
+            '''))
+            
+            # Match results log (append-only source of truth for match stats)
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS match_results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    match_id INTEGER,
+                    player1_id INTEGER NOT NULL,
+                    player2_id INTEGER NOT NULL,
+                    player1_kills INTEGER NOT NULL DEFAULT 0,
+                    player2_kills INTEGER NOT NULL DEFAULT 0,
+                    winner_id INTEGER,
+                    played_at TIMESTAMP NOT NULL,
+                    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    reverts_result_id INTEGER,
+                    FOREIGN KEY (match_id) REFERENCES matches (id),
+                    FOREIGN KEY (player1_id) REFERENCES players (id),
+                    FOREIGN KEY (player2_id) REFERENCES players (id),
+                    FOREIGN KEY (winner_id) REFERENCES players (id),
+                    FOREIGN KEY (reverts_result_id) REFERENCES match_results (id)
+                )
+            '''))
+            cursor.execute(
+                'CREATE UNIQUE INDEX IF NOT EXISTS idx_match_results_reverts '
+                'ON match_results (reverts_result_id) WHERE reverts_result_id IS NOT NULL'
+            )
+            # Finds a pair's remaining results when one of them is reverted
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_match_results_pair ON match_results (player1_id, player2_id)'
+            )
+            
+            # Manual stat adjustments log (from /update_stats)
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS stat_adjustments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    player_id INTEGER NOT NULL,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    losses INTEGER NOT NULL DEFAULT 0,
+                    draws INTEGER NOT NULL DEFAULT 0,
+                    kills INTEGER NOT NULL DEFAULT 0,
+                    deaths INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (player_id) REFERENCES players (id)
+                )
+            '''))
+            
+            # Head-to-head pair index, keyed by (lower player id, higher player id)
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS match_pairs (
+                    low_id INTEGER NOT NULL,
+                    high_id INTEGER NOT NULL,
+                    matches INTEGER NOT NULL DEFAULT 0,
+                    low_wins INTEGER NOT NULL DEFAULT 0,
+                    high_wins INTEGER NOT NULL DEFAULT 0,
+                    draws INTEGER NOT NULL DEFAULT 0,
+                    low_kills INTEGER NOT NULL DEFAULT 0,
+                    high_kills INTEGER NOT NULL DEFAULT 0,
+                    last_played_at TIMESTAMP,
+                    PRIMARY KEY (low_id, high_id)
+                ) WITHOUT ROWID
+            '''))
+            
+            # Leaderboard snapshots; per-player history lives packed in rank_history
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS rank_snapshots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    taken_at TIMESTAMP NOT NULL,
+                    player_count INTEGER NOT NULL DEFAULT 0
+                )
+            '''))
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS rank_history (
+                    player_id INTEGER PRIMARY KEY,
+                    points INTEGER NOT NULL DEFAULT 0,
+                    last_snapshot_id INTEGER NOT NULL DEFAULT 0,
+                    last_taken_at INTEGER NOT NULL DEFAULT 0,
+                    last_rank INTEGER NOT NULL DEFAULT 0,
+                    last_wins INTEGER NOT NULL DEFAULT 0,
+                    last_losses INTEGER NOT NULL DEFAULT 0,
+                    last_draws INTEGER NOT NULL DEFAULT 0,
+                    last_kills INTEGER NOT NULL DEFAULT 0,
+                    last_deaths INTEGER NOT NULL DEFAULT 0,
+                    series BLOB NOT NULL DEFAULT x'',
+                    FOREIGN KEY (player_id) REFERENCES players (id)
+                )
+            '''))
+            
+            # Last journal sequence number committed by the write-behind stats buffer
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS stats_buffer_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    last_seq INTEGER NOT NULL DEFAULT 0
+                )
+            '''))
+            
+            # How far each server log has been ingested, committed with the stats read from it
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS log_ingest_state (
+                    source TEXT PRIMARY KEY,
+                    file_id TEXT NOT NULL,
+                    byte_offset INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            '''))
+            
+            # Inactive players and old finished matches moved out of the hot tables, ids kept
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS players_archive (
+                    id INTEGER PRIMARY KEY,
+                    discord_id TEXT UNIQUE NOT NULL,
+                    username TEXT NOT NULL,
+                    wins INTEGER DEFAULT 0,
+                    losses INTEGER DEFAULT 0,
+                    draws INTEGER DEFAULT 0,
+                    kills INTEGER DEFAULT 0,
+                    deaths INTEGER DEFAULT 0,
+                    registered_at TIMESTAMP,
+                    is_active BOOLEAN DEFAULT 0,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            '''))
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS matches_archive (
+                    id INTEGER PRIMARY KEY,
+                    player1_id INTEGER NOT NULL,
+                    player2_id INTEGER NOT NULL,
+                    scheduled_time TIMESTAMP NOT NULL,
+                    created_at TIMESTAMP,
+                    status TEXT,
+                    winner_id INTEGER,
+                    player1_kills INTEGER DEFAULT 0,
+                    player2_kills INTEGER DEFAULT 0,
+                    notes TEXT,
+                    reminder_sent BOOLEAN DEFAULT 0,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            '''))
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS archive_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ran_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    players INTEGER NOT NULL DEFAULT 0,
+                    matches INTEGER NOT NULL DEFAULT 0,
+                    hot_players INTEGER NOT NULL DEFAULT 0,
+                    hot_matches INTEGER NOT NULL DEFAULT 0,
+                    duration REAL NOT NULL DEFAULT 0
+                )
+            '''))
+            # Archived rows keep their ids, so the logs must not pin them to the hot tables
+            for table in ('matches', 'match_results', 'stat_adjustments', 'rank_history'):
+                for statement in self.backend.drop_foreign_keys(table, ('players', 'matches')):
+                    cursor.execute(statement)
+            # Hot and archived rows together, for reads that must still find archived ones
+            for table, archived in ARCHIVE_COLUMNS.items():
+                cursor.execute(f'DROP VIEW IF EXISTS {table}_all')
+                cursor.execute(f'''
+                    CREATE VIEW {table}_all AS
+                    SELECT {archived}, NULL AS archived_at FROM {table}
+                    UNION ALL
+                    SELECT {archived}, archived_at FROM {table}_archive
+                ''')
+            
+            # Finished seasons; live counters only count log entries after the latest one's ids
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS seasons (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    started_at TIMESTAMP,
+                    ended_at TIMESTAMP NOT NULL,
+                    after_result_id INTEGER NOT NULL DEFAULT 0,
+                    last_result_id INTEGER NOT NULL DEFAULT 0,
+                    last_adjustment_id INTEGER NOT NULL DEFAULT 0,
+                    player_count INTEGER NOT NULL DEFAULT 0,
+                    match_count INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'frozen',
+                    finalized_at TIMESTAMP
+                )
+            '''))
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS season_standings (
+                    season_id INTEGER NOT NULL,
+                    player_id INTEGER NOT NULL,
+                    discord_id TEXT NOT NULL,
+                    username TEXT NOT NULL,
+                    rank INTEGER NOT NULL,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    losses INTEGER NOT NULL DEFAULT 0,
+                    draws INTEGER NOT NULL DEFAULT 0,
+                    kills INTEGER NOT NULL DEFAULT 0,
+                    deaths INTEGER NOT NULL DEFAULT 0,
+                    matches INTEGER NOT NULL DEFAULT 0,
+                    best_streak INTEGER NOT NULL DEFAULT 0,
+                    best_match_kills INTEGER NOT NULL DEFAULT 0,
+                    opponents INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (season_id, player_id)
+                ) WITHOUT ROWID
+            '''))
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_season_standings_rank ON season_standings (season_id, rank)'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_season_standings_player ON season_standings (discord_id, season_id)'
+            )
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS season_awards (
+                    season_id INTEGER NOT NULL,
+                    award TEXT NOT NULL,
+                    player_id INTEGER NOT NULL,
+                    value REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (season_id, award)
+                ) WITHOUT ROWID
+            '''))
+            
+            # One leaderboard message per guild that the bot keeps edited in place
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS pinned_leaderboards (
+                    guild_id TEXT PRIMARY KEY,
+                    channel_id TEXT NOT NULL,
+                    message_id TEXT NOT NULL,
+                    content_hash TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            '''))
+            
+            # Small key/value store for bot runtime state
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS bot_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            '''))
+            
+            # Interactions whose effects were applied, so Discord retries are not applied twice
+            cursor.execute(ddl('''
+                CREATE TABLE IF NOT EXISTS processed_interactions (
+                    interaction_id TEXT PRIMARY KEY,
+                    command TEXT NOT NULL,
+                    message TEXT,
+                    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            '''))
+            
+            # Every write to the tables other processes cache, for the change feed
+            cursor.execute(ddl(f'''
+                CREATE TABLE IF NOT EXISTS change_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    table_name TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    changed_at REAL NOT NULL DEFAULT {self.backend.epoch_now}
+                )
+            '''))
+            for table, key in (('players', 'discord_id'), ('matches', 'id'), ('match_results', 'id')):
+                for statement in self.backend.change_triggers(table, key):
+                    cursor.execute(statement)
+            
+            # Seed the adjustments log with counters recorded before the logs existed
+            cursor.execute('''
+                INSERT INTO stat_adjustments (player_id, wins, losses, draws, kills, deaths)
+                SELECT id, wins, losses, draws, kills, deaths FROM players
+                WHERE (wins != 0 OR losses != 0 OR draws != 0 OR kills != 0 OR deaths != 0)
+                  AND NOT EXISTS (SELECT 1 FROM stat_adjustments)
+                  AND NOT EXISTS (SELECT 1 FROM match_results)
             ''')
             
             # Tournaments table
-            cursor.execute('''
+            cursor.execute(ddl('''
                 CREATE TABLE IF NOT EXISTS tournaments (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     name TEXT NOT NULL,
@@ -79,61 +422,148 @@ class DatabaseManager:
                     max_players INTEGER DEFAULT 16,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
-            ''')
+            '''))
             
             conn.commit()
             logger.info("Database initialized successfully")
     
-    def register_player(self, discord_id: str, username: str):
+    def _replayed_outcome(self, cursor, interaction_id):
+        """Outcome stored for an interaction that was already applied, or None"""
+        if interaction_id is None:
+            return None
+        # Lock first so a concurrent retry waits for this one to finish
+        self.backend.lock_interaction(cursor, interaction_id)
+        cursor.execute(
+            'SELECT message FROM processed_interactions WHERE interaction_id = ?',
+            (str(interaction_id),)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        logger.info(f"Interaction {interaction_id} was already processed, returning its result")
+        return Outcome(True, row[0], replayed=True)
+    
+    @staticmethod
+    def _remember_outcome(cursor, interaction_id, command: str, message: str):
+        """Record an applied interaction in the same transaction as its effects"""
+        if interaction_id is not None:
+            cursor.execute(
+                'INSERT INTO processed_interactions (interaction_id, command, message) VALUES (?, ?, ?)',
+                (str(interaction_id), command, message)
+            )
+    
+    def prune_processed_interactions(self, max_age_hours: int = 24):
+        """Forget interaction IDs old enough that Discord can no longer retry them"""
+        cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+        
+        def prune(cursor):
+            cursor.execute(
+                'DELETE FROM processed_interactions WHERE processed_at < ?',
+                (cutoff.strftime('%Y-%m-%d %H:%M:%S'),)
+            )
+            return cursor.rowcount
+        
+        try:
+            return self.write(prune)
+        except Exception as e:
+            logger.error(f"Error pruning processed interactions: {e}")
+            return 0
+    
+    def prune_change_log(self, max_age_seconds: int = 3600):
+        """Drop change feed entries every process has long since read"""
+        def prune(cursor):
+            # The newest entry always stays so feed positions never point past the log
+            cursor.execute('''
+                DELETE FROM change_log
+                WHERE changed_at < ? AND id < (SELECT MAX(id) FROM change_log)
+            ''', (time.time() - max_age_seconds,))
+            return cursor.rowcount
+        
+        try:
+            return self.write(prune)
+        except Exception as e:
+            logger.error(f"Error pruning change log: {e}")
+            return 0
+    
+    def register_player(self, discord_id: str, username: str, interaction_id=None):
         """Register a new player"""
+        def register(cursor):
+            replayed = self._replayed_outcome(cursor, interaction_id)
+            if replayed:
+                return replayed
+            
+            # Archived players keep their Discord ID, as removed ones always have
+            cursor.execute('SELECT 1 FROM players_archive WHERE discord_id = ?', (discord_id,))
+            if cursor.fetchone():
+                return False, "Player is already registered!"
+            
+            cursor.execute(
+                'INSERT INTO players (discord_id, username) VALUES (?, ?)',
+                (discord_id, username)
+            )
+            message = f"Player {username} registered successfully!"
+            self._remember_outcome(cursor, interaction_id, 'register_player', message)
+            logger.info(f"Player {username} registered successfully")
+            return True, message
+        
         try:
-            with self.get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    'INSERT INTO players (discord_id, username) VALUES (?, ?)',
-                    (discord_id, username)
-                )
-                conn.commit()
-                logger.info(f"Player {username} registered successfully")
-                return True, f"Player {username} registered successfully!"
-        except sqlite3.IntegrityError:
-            return False, "Player is already registered!"
+            outcome = Outcome(*self.write(register))
+            if outcome.success and not outcome.replayed:
+                with self._index_lock:
+                    if self._search_index is not None:
+                        self._search_index.add(discord_id, username)
+                        self._player_trie.add(discord_id, username)
+            return outcome
+        except self.backend.IntegrityError:
+            return Outcome(False, "Player is already registered!")
         except Exception as e:
             logger.error(f"Error registering player: {e}")
-            return False, f"Registration failed: {str(e)}"
+            return Outcome(False, f"Registration failed: {str(e)}")
     
-    def remove_player(self, discord_id: str):
+    def remove_player(self, discord_id: str, interaction_id=None):
         """Remove a player from the tournament"""
+        def remove(cursor):
+            replayed = self._replayed_outcome(cursor, interaction_id)
+            if replayed:
+                return replayed
+            
+            cursor.execute(
+                'UPDATE players SET is_active = 0 WHERE discord_id = ?',
+                (discord_id,)
+            )
+            
+            if cursor.rowcount == 0:
+                return False, "Player not found!"
+            
+            self._remember_outcome(cursor, interaction_id, 'remove_player', "Player removed successfully!")
+            return True, "Player removed successfully!"
+        
         try:
-            with self.get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    'UPDATE players SET is_active = 0 WHERE discord_id = ?',
-                    (discord_id,)
-                )
-                
-                if cursor.rowcount == 0:
-                    return False, "Player not found!"
-                
-                conn.commit()
-                return True, "Player removed successfully!"
+            outcome = Outcome(*self.write(remove))
+            if outcome.success and not outcome.replayed:
+                with self._index_lock:
+                    if self._search_index is not None:
+                        self._search_index.remove(discord_id)
+                        self._player_trie.remove(discord_id)
+            return outcome
         except Exception as e:
             logger.error(f"Error removing player: {e}")
-            return False, f"Removal failed: {str(e)}"
+            return Outcome(False, f"Removal failed: {str(e)}")
     
     def get_player(self, discord_id: str):
         """Get player information"""
+        self._read_barrier()
         try:
             with self.get_db_connection() as conn:
-                cursor = conn.cursor()
+                cursor = self._tuple_cursor(conn)
                 cursor.execute(
-                    'SELECT * FROM players WHERE discord_id = ? AND is_active = 1',
+                    f'SELECT {PLAYER_COLUMNS} FROM players WHERE discord_id = ? AND is_active = 1',
                     (discord_id,)
                 )
                 row = cursor.fetchone()
                 
                 if row:
-                    return dict(row)
+                    return PlayerRow._make(row)
                 return None
         except Exception as e:
             logger.error(f"Error getting player: {e}")
@@ -141,99 +571,367 @@ class DatabaseManager:
     
     def get_all_players(self):
         """Get all active players"""
+        self._read_barrier()
         try:
             with self.get_db_connection() as conn:
-                cursor = conn.cursor()
+                cursor = self._tuple_cursor(conn)
                 cursor.execute(
-                    'SELECT * FROM players WHERE is_active = 1 ORDER BY username'
+                    f'SELECT {PLAYER_COLUMNS} FROM players WHERE is_active = 1 ORDER BY username'
                 )
-                return [dict(row) for row in cursor.fetchall()]
+                return list(map(PlayerRow._make, cursor.fetchall()))
         except Exception as e:
             logger.error(f"Error getting all players: {e}")
             return []
     
+    def warm_player_indexes(self):
+        """Build the in-memory name indexes over active players"""
+        with self._index_lock:
+            if self._search_index is None:
+                index = TrigramIndex()
+                trie = PrefixTrie()
+                with self.get_db_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('SELECT discord_id, username FROM players WHERE is_active = 1')
+                    for discord_id, username in cursor:
+                        index.add(discord_id, username)
+                        trie.add(discord_id, username)
+                self._player_trie = trie
+                self._search_index = index
+                logger.info(f"Player indexes built with {len(index)} players")
+    
+    def reset_player_indexes(self):
+        """Rebuild the name indexes from scratch, e.g. after a restore"""
+        with self._index_lock:
+            built = self._search_index is not None
+            self._search_index = None
+            self._player_trie = None
+        if built:
+            self.warm_player_indexes()
+    
+    def apply_changes(self, changes):
+        """Change feed subscriber: refresh the name index entries of changed players only"""
+        if not changes.full and (not changes.players or self._search_index is None):
+            return
+        # Bulk changes such as a stats rebuild are cheaper to reindex from scratch
+        if changes.full or len(changes.players) > 500:
+            self.reset_player_indexes()
+            return
+        
+        keys = list(changes.players)
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT discord_id, username, is_active FROM players "
+                f"WHERE discord_id IN ({', '.join('?' * len(keys))})",
+                keys
+            )
+            current = {discord_id: (username, is_active) for discord_id, username, is_active in cursor}
+        with self._index_lock:
+            if self._search_index is None:
+                return
+            for discord_id in keys:
+                username, is_active = current.get(discord_id, (None, 0))
+                if is_active:
+                    # Most changes are stat updates that leave the name alone
+                    if self._player_trie.get(discord_id) == username:
+                        continue
+                    self._search_index.add(discord_id, username)
+                    self._player_trie.add(discord_id, username)
+                else:
+                    self._search_index.remove(discord_id)
+                    self._player_trie.remove(discord_id)
+    
+    def get_meta(self, key: str):
+        """Read a bot_meta value"""
+        try:
+            with self.get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT value FROM bot_meta WHERE key = ?', (key,))
+                row = cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            logger.error(f"Error reading bot meta {key}: {e}")
+            return None
+    
+    def set_meta(self, key: str, value: str):
+        """Write a bot_meta value"""
+        def store(cursor):
+            cursor.execute(
+                'INSERT INTO bot_meta (key, value) VALUES (?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value',
+                (key, value)
+            )
+            return True
+        
+        try:
+            return self.write(store)
+        except Exception as e:
+            logger.error(f"Error writing bot meta {key}: {e}")
+            return False
+    
+    def get_pinned_leaderboards(self):
+        """Every guild's pinned leaderboard message"""
+        with self.get_db_connection() as conn:
+            cursor = self._tuple_cursor(conn)
+            cursor.execute(f'SELECT {columns(PinnedLeaderboardRow)} FROM pinned_leaderboards')
+            return list(map(PinnedLeaderboardRow._make, cursor.fetchall()))
+    
+    def set_pinned_leaderboard(self, guild_id: str, channel_id: str, message_id: str, content_hash: str):
+        """Make message_id the guild's pinned leaderboard; returns the one it replaces, if any"""
+        def store(cursor):
+            cursor.execute(f'SELECT {columns(PinnedLeaderboardRow)} FROM pinned_leaderboards WHERE guild_id = ?',
+                           (guild_id,))
+            previous = cursor.fetchone()
+            cursor.execute('''
+                INSERT INTO pinned_leaderboards (guild_id, channel_id, message_id, content_hash, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (guild_id) DO UPDATE SET
+                    channel_id = excluded.channel_id, message_id = excluded.message_id,
+                    content_hash = excluded.content_hash, updated_at = excluded.updated_at
+            ''', (guild_id, channel_id, message_id, content_hash))
+            return PinnedLeaderboardRow._make(tuple(previous)) if previous else None
+        
+        return self.write(store)
+    
+    def mark_pinned_leaderboard(self, guild_id: str, message_id: str, content_hash: str):
+        """Record what a pinned leaderboard message now shows"""
+        def mark(cursor):
+            cursor.execute('''
+                UPDATE pinned_leaderboards SET content_hash = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE guild_id = ? AND message_id = ?
+            ''', (content_hash, guild_id, message_id))
+        
+        self.write(mark)
+    
+    def remove_pinned_leaderboard(self, guild_id: str, message_id: str = None):
+        """Forget a guild's pinned leaderboard (only if it is still message_id, when given)"""
+        def remove(cursor):
+            if message_id is None:
+                cursor.execute(f'''
+                    DELETE FROM pinned_leaderboards WHERE guild_id = ?
+                    RETURNING {columns(PinnedLeaderboardRow)}
+                ''', (guild_id,))
+            else:
+                cursor.execute(f'''
+                    DELETE FROM pinned_leaderboards WHERE guild_id = ? AND message_id = ?
+                    RETURNING {columns(PinnedLeaderboardRow)}
+                ''', (guild_id, message_id))
+            row = cursor.fetchone()
+            return PinnedLeaderboardRow._make(tuple(row)) if row else None
+        
+        return self.write(remove)
+    
+    def _player_index(self):
+        """Trigram index over active player names, built on first use"""
+        if self._search_index is None:
+            self.warm_player_indexes()
+        return self._search_index
+    
+    def complete_players(self, prefix: str, limit=25):
+        """Autocomplete active players by name prefix without touching the database"""
+        trie = self._player_trie
+        if trie is None:
+            return []
+        return [
+            {'discord_id': discord_id, 'username': username}
+            for discord_id, username in trie.complete(prefix, limit)
+        ]
+    
+    def lookup_player_name(self, discord_id: str):
+        """Username of an active player from the in-memory index, or None"""
+        trie = self._player_trie
+        return trie.get(discord_id) if trie is not None else None
+    
+    def search_players(self, query: str, limit=10):
+        """Fuzzy search of active players by username"""
+        try:
+            return [
+                {'discord_id': discord_id, 'username': username, 'score': score}
+                for discord_id, username, score in self._player_index().search(query, limit)
+            ]
+        except Exception as e:
+            logger.error(f"Error searching players: {e}")
+            return []
+    
     def get_leaderboard(self, limit=20):
         """Get leaderboard sorted by wins and kills"""
+        self._read_barrier()
         try:
             with self.get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT * FROM players 
+                cursor = self._tuple_cursor(conn)
+                cursor.execute(f'''
+                    SELECT {PLAYER_COLUMNS} FROM players 
                     WHERE is_active = 1 
-                    ORDER BY wins DESC, kills DESC, (wins + losses + draws) DESC
+                    ORDER BY wins DESC, kills DESC, (wins + losses + draws) DESC, id
                     LIMIT ?
                 ''', (limit,))
-                return [dict(row) for row in cursor.fetchall()]
+                return list(map(PlayerRow._make, cursor.fetchall()))
         except Exception as e:
             logger.error(f"Error getting leaderboard: {e}")
             return []
     
-    def schedule_match(self, player1_discord_id: str, player2_discord_id: str, scheduled_time: datetime):
+    def schedule_match(self, player1_discord_id: str, player2_discord_id: str, scheduled_time: datetime,
+                       interaction_id=None):
         """Schedule a match between two players"""
+        def schedule(cursor):
+            replayed = self._replayed_outcome(cursor, interaction_id)
+            if replayed:
+                return replayed
+            
+            # Get player IDs
+            cursor.execute('SELECT id FROM players WHERE discord_id = ? AND is_active = 1', (player1_discord_id,))
+            player1_row = cursor.fetchone()
+            if not player1_row:
+                return False, "Player 1 not found or inactive!"
+            
+            cursor.execute('SELECT id FROM players WHERE discord_id = ? AND is_active = 1', (player2_discord_id,))
+            player2_row = cursor.fetchone()
+            if not player2_row:
+                return False, "Player 2 not found or inactive!"
+            
+            player1_id = player1_row[0]
+            player2_id = player2_row[0]
+            
+            # Insert match
+            cursor.execute('''
+                INSERT INTO matches (player1_id, player2_id, scheduled_time)
+                VALUES (?, ?, ?)
+                RETURNING id
+            ''', (player1_id, player2_id, scheduled_time))
+            
+            match_id = cursor.fetchone()[0]
+            message = f"Match scheduled successfully! ID: {match_id}"
+            self._remember_outcome(cursor, interaction_id, 'schedule_match', message)
+            logger.info(f"Match {match_id} scheduled successfully")
+            return True, message
+        
         try:
-            with self.get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Get player IDs
-                cursor.execute('SELECT id FROM players WHERE discord_id = ? AND is_active = 1', (player1_discord_id,))
-                player1_row = cursor.fetchone()
-                if not player1_row:
-                    return False, "Player 1 not found or inactive!"
-                
-                cursor.execute('SELECT id FROM players WHERE discord_id = ? AND is_active = 1', (player2_discord_id,))
-                player2_row = cursor.fetchone()
-                if not player2_row:
-                    return False, "Player 2 not found or inactive!"
-                
-                player1_id = player1_row[0]
-                player2_id = player2_row[0]
-                
-                # Insert match
-                cursor.execute('''
-                    INSERT INTO matches (player1_id, player2_id, scheduled_time)
-                    VALUES (?, ?, ?)
-                ''', (player1_id, player2_id, scheduled_time))
-                
-                match_id = cursor.lastrowid
-                conn.commit()
-                
-                logger.info(f"Match {match_id} scheduled successfully")
-                return True, f"Match scheduled successfully! ID: {match_id}"
-                
+            return Outcome(*self.write(schedule))
         except Exception as e:
             logger.error(f"Error scheduling match: {e}")
-            return False, f"Scheduling failed: {str(e)}"
+            return Outcome(False, f"Scheduling failed: {str(e)}")
     
     def update_player_stats(self, discord_id: str, wins: int = 0, losses: int = 0, 
-                           draws: int = 0, kills: int = 0, deaths: int = 0):
+                           draws: int = 0, kills: int = 0, deaths: int = 0, interaction_id=None):
         """Update player statistics"""
+        message = "Statistics updated successfully!"
         try:
-            with self.get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE players 
-                    SET wins = wins + ?, losses = losses + ?, draws = draws + ?,
-                        kills = kills + ?, deaths = deaths + ?
-                    WHERE discord_id = ? AND is_active = 1
-                ''', (wins, losses, draws, kills, deaths, discord_id))
-                
-                if cursor.rowcount == 0:
+            if self.stats_buffer is not None:
+                if not self._is_active_player(discord_id):
+                    return Outcome(False, "Player not found!")
+                if interaction_id is not None:
+                    # The buffered delta cannot share a transaction, so claim the interaction first
+                    def claim(cursor):
+                        replayed = self._replayed_outcome(cursor, interaction_id)
+                        if not replayed:
+                            self._remember_outcome(cursor, interaction_id, 'update_stats', message)
+                        return replayed
+                    
+                    replayed = self.write(claim)
+                    if replayed:
+                        return replayed
+                self.stats_buffer.add(discord_id, wins, losses, draws, kills, deaths)
+                return Outcome(True, message)
+            
+            def update(cursor):
+                replayed = self._replayed_outcome(cursor, interaction_id)
+                if replayed:
+                    return replayed
+                if not self._apply_stat_adjustment(cursor, discord_id, wins, losses, draws, kills, deaths):
                     return False, "Player not found!"
                 
-                conn.commit()
-                return True, "Statistics updated successfully!"
+                self._remember_outcome(cursor, interaction_id, 'update_stats', message)
+                return True, message
+            
+            return Outcome(*self.write(update))
                 
         except Exception as e:
             logger.error(f"Error updating stats: {e}")
-            return False, f"Update failed: {str(e)}"
+            return Outcome(False, f"Update failed: {str(e)}")
+    
+    @staticmethod
+    def _apply_stat_adjustment(cursor, discord_id: str, wins: int, losses: int, draws: int,
+                               kills: int, deaths: int) -> bool:
+        """Add stat deltas to a player and append them to the adjustments log"""
+        cursor.execute('''
+            UPDATE players 
+            SET wins = wins + ?, losses = losses + ?, draws = draws + ?,
+                kills = kills + ?, deaths = deaths + ?
+            WHERE discord_id = ? AND is_active = 1
+        ''', (wins, losses, draws, kills, deaths, discord_id))
+        
+        if cursor.rowcount == 0:
+            return False
+        
+        cursor.execute('''
+            INSERT INTO stat_adjustments (player_id, wins, losses, draws, kills, deaths)
+            SELECT id, ?, ?, ?, ?, ? FROM players WHERE discord_id = ?
+        ''', (wins, losses, draws, kills, deaths, discord_id))
+        return True
+    
+    def _is_active_player(self, discord_id: str) -> bool:
+        """Check registration from the in-memory index when available"""
+        if self._player_trie is not None:
+            return discord_id in self._player_trie
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1 FROM players WHERE discord_id = ? AND is_active = 1', (discord_id,))
+            return cursor.fetchone() is not None
+    
+    def apply_stat_deltas(self, deltas: dict, seq: int):
+        """Commit coalesced stat deltas and the journal position in one transaction"""
+        def apply(cursor):
+            for discord_id, (wins, losses, draws, kills, deaths) in deltas.items():
+                if not self._apply_stat_adjustment(cursor, discord_id, wins, losses, draws, kills, deaths):
+                    logger.warning(f"Dropping buffered stats for unknown player {discord_id}")
+            cursor.execute(f'''
+                INSERT INTO stats_buffer_state (id, last_seq) VALUES (1, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    last_seq = {self.backend.greatest}(stats_buffer_state.last_seq, excluded.last_seq)
+            ''', (seq,))
+        
+        self.write(apply)
+    
+    def get_stats_buffer_seq(self) -> int:
+        """Last journal sequence number committed by the stats buffer"""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT last_seq FROM stats_buffer_state WHERE id = 1')
+            row = cursor.fetchone()
+            return row[0] if row else 0
+    
+    def apply_ingested_deltas(self, deltas: dict, source: str, file_id: str, offset: int):
+        """Commit stat deltas read from a server log and the offset they end at in one transaction"""
+        def apply(cursor):
+            for discord_id, (wins, losses, draws, kills, deaths) in deltas.items():
+                if not self._apply_stat_adjustment(cursor, discord_id, wins, losses, draws, kills, deaths):
+                    logger.warning(f"Dropping server log stats for removed player {discord_id}")
+            cursor.execute('''
+                INSERT INTO log_ingest_state (source, file_id, byte_offset, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (source) DO UPDATE SET
+                    file_id = excluded.file_id, byte_offset = excluded.byte_offset,
+                    updated_at = excluded.updated_at
+            ''', (source, file_id, offset))
+        
+        self.write(apply)
+    
+    def get_ingest_checkpoint(self, source: str):
+        """(file_id, byte offset) committed for a server log, or (None, 0)"""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT file_id, byte_offset FROM log_ingest_state WHERE source = ?', (source,))
+            row = cursor.fetchone()
+            return (row[0], row[1]) if row else (None, 0)
     
     def get_upcoming_matches(self, limit=10):
         """Get upcoming scheduled matches"""
         try:
             with self.get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT m.*, p1.username as player1_name, p1.discord_id as player1_discord_id,
+                cursor = self._tuple_cursor(conn)
+                cursor.execute(f'''
+                    SELECT {columns(UpcomingMatchRow, 'm', 11)},
+                           p1.username as player1_name, p1.discord_id as player1_discord_id,
                            p2.username as player2_name, p2.discord_id as player2_discord_id
                     FROM matches m
                     JOIN players p1 ON m.player1_id = p1.id
@@ -242,22 +940,520 @@ class DatabaseManager:
                     ORDER BY m.scheduled_time ASC
                     LIMIT ?
                 ''', (limit,))
-                return [dict(row) for row in cursor.fetchall()]
+                return list(map(UpcomingMatchRow._make, cursor.fetchall()))
         except Exception as e:
             logger.error(f"Error getting upcoming matches: {e}")
             return []
     
     def mark_reminder_sent(self, match_id: int):
         """Mark reminder as sent for a match"""
+        def mark(cursor):
+            cursor.execute(
+                'UPDATE matches SET reminder_sent = 1 WHERE id = ?',
+                (match_id,)
+            )
+            return True
+        
+        try:
+            return self.write(mark)
+        except Exception as e:
+            logger.error(f"Error marking reminder sent: {e}")
+            return False
+    
+    def _apply_result(self, cursor, player1_id: int, player2_id: int, player1_kills: int,
+                      player2_kills: int, winner_id, played_at, sign: int = 1):
+        """Apply one match result to player aggregates and the pair index"""
+        for player_id, kills, deaths in ((player1_id, player1_kills, player2_kills),
+                                         (player2_id, player2_kills, player1_kills)):
+            won = winner_id == player_id
+            lost = winner_id is not None and not won
+            cursor.execute('''
+                UPDATE players
+                SET wins = wins + ?, losses = losses + ?, draws = draws + ?,
+                    kills = kills + ?, deaths = deaths + ?
+                WHERE id = ?
+            ''', (sign * won, sign * lost, sign * (winner_id is None),
+                  sign * kills, sign * deaths, player_id))
+        
+        low_id, high_id = sorted((player1_id, player2_id))
+        low_kills, high_kills = ((player1_kills, player2_kills) if low_id == player1_id
+                                 else (player2_kills, player1_kills))
+        cursor.execute(f'''
+            INSERT INTO match_pairs (low_id, high_id, matches, low_wins, high_wins, draws,
+                                     low_kills, high_kills, last_played_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (low_id, high_id) DO UPDATE SET
+                matches = match_pairs.matches + excluded.matches,
+                low_wins = match_pairs.low_wins + excluded.low_wins,
+                high_wins = match_pairs.high_wins + excluded.high_wins,
+                draws = match_pairs.draws + excluded.draws,
+                low_kills = match_pairs.low_kills + excluded.low_kills,
+                high_kills = match_pairs.high_kills + excluded.high_kills,
+                last_played_at = {self.backend.greatest}(
+                    COALESCE(match_pairs.last_played_at, excluded.last_played_at), excluded.last_played_at
+                )
+        ''', (low_id, high_id, sign, sign * (winner_id == low_id), sign * (winner_id == high_id),
+              sign * (winner_id is None), sign * low_kills, sign * high_kills, played_at))
+    
+    def record_match_result(self, player1_discord_id: str, player2_discord_id: str,
+                            player1_kills: int, player2_kills: int, match_id: int = None,
+                            played_at: datetime = None, interaction_id=None):
+        """Append a match result to the log and update player aggregates"""
+        played_at = played_at or datetime.utcnow()
+        
+        def record(cursor):
+            replayed = self._replayed_outcome(cursor, interaction_id)
+            if replayed:
+                return replayed
+            
+            cursor.execute('SELECT id FROM players WHERE discord_id = ? AND is_active = 1', (player1_discord_id,))
+            player1_row = cursor.fetchone()
+            if not player1_row:
+                return False, "Player 1 not found or inactive!"
+            
+            cursor.execute('SELECT id FROM players WHERE discord_id = ? AND is_active = 1', (player2_discord_id,))
+            player2_row = cursor.fetchone()
+            if not player2_row:
+                return False, "Player 2 not found or inactive!"
+            
+            player1_id = player1_row[0]
+            player2_id = player2_row[0]
+            if player1_id == player2_id:
+                return False, "A player cannot play against themselves!"
+            
+            if player1_kills > player2_kills:
+                winner_id = player1_id
+            elif player2_kills > player1_kills:
+                winner_id = player2_id
+            else:
+                winner_id = None
+            
+            if match_id is not None:
+                cursor.execute('''
+                    UPDATE matches
+                    SET status = 'completed', winner_id = ?, player1_kills = ?, player2_kills = ?
+                    WHERE id = ? AND status = 'scheduled'
+                      AND ((player1_id = ? AND player2_id = ?) OR (player1_id = ? AND player2_id = ?))
+                ''', (winner_id, player1_kills, player2_kills, match_id,
+                      player1_id, player2_id, player2_id, player1_id))
+                if cursor.rowcount == 0:
+                    return False, "Scheduled match not found for these players!"
+            
+            cursor.execute('''
+                INSERT INTO match_results (match_id, player1_id, player2_id, player1_kills,
+                                           player2_kills, winner_id, played_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                RETURNING id
+            ''', (match_id, player1_id, player2_id, player1_kills, player2_kills, winner_id, played_at))
+            result_id = cursor.fetchone()[0]
+            
+            self._apply_result(cursor, player1_id, player2_id, player1_kills,
+                               player2_kills, winner_id, played_at)
+            message = f"Match result recorded! ID: {result_id}"
+            self._remember_outcome(cursor, interaction_id, 'record_result', message)
+            
+            logger.info(f"Match result {result_id} recorded")
+            return True, message
+        
+        try:
+            return Outcome(*self.write(record))
+        except Exception as e:
+            logger.error(f"Error recording match result: {e}")
+            return Outcome(False, f"Recording failed: {str(e)}")
+    
+    def revert_match_result(self, result_id: int, interaction_id=None):
+        """Undo a match result by appending a compensating log entry"""
+        def revert(cursor):
+            replayed = self._replayed_outcome(cursor, interaction_id)
+            if replayed:
+                return replayed
+            
+            cursor.execute(
+                'SELECT * FROM match_results WHERE id = ? AND reverts_result_id IS NULL',
+                (result_id,)
+            )
+            result = cursor.fetchone()
+            if not result:
+                return False, "Match result not found!"
+            
+            cursor.execute(
+                'SELECT 1 FROM match_results WHERE reverts_result_id = ?',
+                (result_id,)
+            )
+            if cursor.fetchone():
+                return False, "Match result was already reverted!"
+            
+            # Finished seasons' standings are final
+            if result_id <= self._season_boundary(cursor)[0]:
+                return False, "Match result belongs to a finished season!"
+            
+            cursor.execute('''
+                INSERT INTO match_results (match_id, player1_id, player2_id, player1_kills,
+                                           player2_kills, winner_id, played_at, reverts_result_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (result['match_id'], result['player1_id'], result['player2_id'],
+                  result['player1_kills'], result['player2_kills'], result['winner_id'],
+                  result['played_at'], result_id))
+            
+            if result['match_id'] is not None:
+                cursor.execute('''
+                    UPDATE matches
+                    SET status = 'scheduled', winner_id = NULL, player1_kills = 0, player2_kills = 0
+                    WHERE id = ?
+                ''', (result['match_id'],))
+            
+            self._apply_result(cursor, result['player1_id'], result['player2_id'],
+                               result['player1_kills'], result['player2_kills'],
+                               result['winner_id'], result['played_at'], sign=-1)
+            # The reverted match may have been the pair's latest one
+            low_id, high_id = sorted((result['player1_id'], result['player2_id']))
+            cursor.execute('''
+                UPDATE match_pairs SET last_played_at = (
+                    SELECT MAX(r.played_at) FROM match_results r
+                    WHERE ((r.player1_id = ? AND r.player2_id = ?) OR (r.player1_id = ? AND r.player2_id = ?))
+                      AND r.reverts_result_id IS NULL
+                      AND NOT EXISTS (SELECT 1 FROM match_results u WHERE u.reverts_result_id = r.id)
+                )
+                WHERE low_id = ? AND high_id = ?
+            ''', (low_id, high_id, high_id, low_id, low_id, high_id))
+            message = f"Match result {result_id} reverted!"
+            self._remember_outcome(cursor, interaction_id, 'revert_result', message)
+            
+            logger.info(f"Match result {result_id} reverted")
+            return True, message
+        
+        try:
+            return Outcome(*self.write(revert))
+        except Exception as e:
+            logger.error(f"Error reverting match result: {e}")
+            return Outcome(False, f"Revert failed: {str(e)}")
+    
+    def get_match_history(self, discord_id: str, limit=10):
+        """Get the most recent match results for a player"""
+        try:
+            with self.get_db_connection() as conn:
+                cursor = self._tuple_cursor(conn)
+                cursor.execute(f'''
+                    SELECT {columns(MatchResultRow, 'r', 10)},
+                           p1.username as player1_name, p2.username as player2_name
+                    FROM match_results r
+                    JOIN players_all p1 ON r.player1_id = p1.id
+                    JOIN players_all p2 ON r.player2_id = p2.id
+                    WHERE (p1.discord_id = ? OR p2.discord_id = ?)
+                      AND r.reverts_result_id IS NULL
+                      AND NOT EXISTS (SELECT 1 FROM match_results u WHERE u.reverts_result_id = r.id)
+                    ORDER BY r.played_at DESC, r.id DESC
+                    LIMIT ?
+                ''', (discord_id, discord_id, limit))
+                return list(map(MatchResultRow._make, cursor.fetchall()))
+        except Exception as e:
+            logger.error(f"Error getting match history: {e}")
+            return []
+    
+    def get_head_to_head(self, player1_discord_id: str, player2_discord_id: str):
+        """Get head-to-head record between two players from the pair index"""
         try:
             with self.get_db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                    'UPDATE matches SET reminder_sent = 1 WHERE id = ?',
-                    (match_id,)
+                    'SELECT id, discord_id FROM players_all WHERE discord_id IN (?, ?)',
+                    (player1_discord_id, player2_discord_id)
+                )
+                ids = {row['discord_id']: row['id'] for row in cursor.fetchall()}
+                if player1_discord_id not in ids or player2_discord_id not in ids:
+                    return None
+                
+                player1_id = ids[player1_discord_id]
+                player2_id = ids[player2_discord_id]
+                low_id, high_id = sorted((player1_id, player2_id))
+                cursor.execute(
+                    'SELECT * FROM match_pairs WHERE low_id = ? AND high_id = ?',
+                    (low_id, high_id)
                 )
-                conn.commit()
-                return True
+                row = cursor.fetchone()
+                
+                record = {'matches': 0, 'player1_wins': 0, 'player2_wins': 0, 'draws': 0,
+                          'player1_kills': 0, 'player2_kills': 0, 'last_played_at': None}
+                if row:
+                    flipped = player1_id != low_id
+                    record.update({
+                        'matches': row['matches'],
+                        'player1_wins': row['high_wins'] if flipped else row['low_wins'],
+                        'player2_wins': row['low_wins'] if flipped else row['high_wins'],
+                        'draws': row['draws'],
+                        'player1_kills': row['high_kills'] if flipped else row['low_kills'],
+                        'player2_kills': row['low_kills'] if flipped else row['high_kills'],
+                        'last_played_at': row['last_played_at'],
+                    })
+                return record
         except Exception as e:
-            logger.error(f"Error marking reminder sent: {e}")
-            return False
+            logger.error(f"Error getting head-to-head: {e}")
+            return None
+    
+    @staticmethod
+    def _season_boundary(cursor):
+        """Last match result and stat adjustment ids counted by the latest finished season"""
+        cursor.execute('SELECT last_result_id, last_adjustment_id FROM seasons ORDER BY id DESC LIMIT 1')
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else (0, 0)
+    
+    def rebuild_player_stats(self):
+        """Recompute player aggregates and the pair index from the logs in one pass"""
+        self._read_barrier()
+        
+        def rebuild(cursor):
+            totals = {}
+            pairs = {}
+            # Counters only cover the current season; the pair index stays all-time
+            last_result_id, last_adjustment_id = self._season_boundary(cursor)
+            
+            # Stream both logs through a single cursor; undo entries count negatively
+            cursor.execute('''
+                SELECT 0, id, player1_id, player2_id, player1_kills, player2_kills, winner_id,
+                       played_at, CASE WHEN reverts_result_id IS NULL THEN 1 ELSE -1 END, 0, 0
+                FROM match_results
+                UNION ALL
+                SELECT 1, id, player_id, NULL, kills, deaths, wins, NULL, 1, losses, draws
+                FROM stat_adjustments WHERE id > ?
+            ''', (last_adjustment_id,))
+            for kind, log_id, a, b, a_kills, b_kills, winner, played_at, sign, losses, draws in cursor:
+                if kind == 1:
+                    stats = totals.setdefault(a, [0, 0, 0, 0, 0])
+                    stats[0] += winner
+                    stats[1] += losses
+                    stats[2] += draws
+                    stats[3] += a_kills
+                    stats[4] += b_kills
+                    continue
+            
+                for player_id, kills, deaths in ((a, a_kills, b_kills), (b, b_kills, a_kills)):
+                    if log_id <= last_result_id:
+                        break
+                    stats = totals.setdefault(player_id, [0, 0, 0, 0, 0])
+                    if winner is None:
+                        stats[2] += sign
+                    elif winner == player_id:
+                        stats[0] += sign
+                    else:
+                        stats[1] += sign
+                    stats[3] += sign * kills
+                    stats[4] += sign * deaths
+            
+                low, high = (a, b) if a < b else (b, a)
+                low_kills, high_kills = (a_kills, b_kills) if low == a else (b_kills, a_kills)
+                pair = pairs.setdefault((low, high), [0, 0, 0, 0, 0, 0, None])
+                pair[0] += sign
+                pair[1] += sign * (winner == low)
+                pair[2] += sign * (winner == high)
+                pair[3] += sign * (winner is None)
+                pair[4] += sign * low_kills
+                pair[5] += sign * high_kills
+                if sign > 0 and (pair[6] is None or played_at > pair[6]):
+                    pair[6] = played_at
+            
+            # Players without any logged activity go back to zero
+            cursor.execute('SELECT id, wins, losses, draws, kills, deaths FROM players')
+            current = {row[0]: list(row[1:]) for row in cursor.fetchall()}
+            for player_id in current:
+                totals.setdefault(player_id, [0, 0, 0, 0, 0])
+            # Only rows whose counters differ are written, so the change feed sees real changes
+            updates = [(*stats, player_id) for player_id, stats in totals.items()
+                       if player_id in current and current[player_id] != stats]
+            cursor.executemany('''
+                UPDATE players SET wins = ?, losses = ?, draws = ?, kills = ?, deaths = ?
+                WHERE id = ?
+            ''', updates)
+            changed = len(updates)
+            
+            cursor.execute('DELETE FROM match_pairs')
+            cursor.executemany('''
+                INSERT INTO match_pairs (low_id, high_id, matches, low_wins, high_wins, draws,
+                                         low_kills, high_kills, last_played_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', ((*key, *pair) for key, pair in pairs.items() if pair[0] > 0))
+            return len(totals), changed
+        
+        try:
+            started = time.perf_counter()
+            players, changed = self.write(rebuild)
+            elapsed = time.perf_counter() - started
+            logger.info(f"Rebuilt stats for {players} players ({changed} changed) in {elapsed:.3f}s")
+            return True, f"Rebuilt statistics for {players} players ({changed} changed) in {elapsed:.2f}s"
+            
+        except Exception as e:
+            logger.error(f"Error rebuilding stats: {e}")
+            return False, f"Rebuild failed: {str(e)}"
+    
+    def take_rank_snapshot(self):
+        """Append the current leaderboard to every ranked player's packed history"""
+        self._read_barrier()
+        taken_at = datetime.utcnow().replace(microsecond=0)
+        epoch = int((taken_at - datetime(1970, 1, 1)).total_seconds())
+        
+        append_series = self.backend.concat_blobs.format('rank_history.series', 'excluded.series')
+        
+        def snapshot(cursor):
+            cursor.execute('''
+                SELECT id, wins, losses, draws, kills, deaths FROM players
+                WHERE is_active = 1
+                ORDER BY wins DESC, kills DESC, (wins + losses + draws) DESC, id
+            ''')
+            ranked = cursor.fetchall()
+            
+            cursor.execute(
+                'INSERT INTO rank_snapshots (taken_at, player_count) VALUES (?, ?) RETURNING id',
+                (taken_at, len(ranked))
+            )
+            snapshot_id = cursor.fetchone()[0]
+            
+            # Only the last point is needed to delta-encode the next one; the series is appended in SQL
+            cursor.execute('''
+                SELECT player_id, last_snapshot_id, last_taken_at, last_rank, last_wins,
+                       last_losses, last_draws, last_kills, last_deaths
+                FROM rank_history
+            ''')
+            history = {row[0]: tuple(row[1:]) for row in cursor}
+            
+            updates = []
+            for rank, (player_id, wins, losses, draws, kills, deaths) in enumerate(ranked, 1):
+                point = (snapshot_id, epoch, rank, wins, losses, draws, kills, deaths)
+                updates.append((player_id, *point, encode_point(point, history.get(player_id))))
+            
+            cursor.executemany(f'''
+                INSERT INTO rank_history (player_id, points, last_snapshot_id, last_taken_at,
+                                          last_rank, last_wins, last_losses, last_draws,
+                                          last_kills, last_deaths, series)
+                VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (player_id) DO UPDATE SET
+                    points = rank_history.points + 1,
+                    last_snapshot_id = excluded.last_snapshot_id,
+                    last_taken_at = excluded.last_taken_at,
+                    last_rank = excluded.last_rank,
+                    last_wins = excluded.last_wins,
+                    last_losses = excluded.last_losses,
+                    last_draws = excluded.last_draws,
+                    last_kills = excluded.last_kills,
+                    last_deaths = excluded.last_deaths,
+                    series = {append_series}
+            ''', updates)
+            return snapshot_id, len(ranked)
+        
+        try:
+            started = time.perf_counter()
+            snapshot_id, ranked = self.write(snapshot)
+            elapsed = time.perf_counter() - started
+            logger.info(f"Rank snapshot {snapshot_id} taken for {ranked} players in {elapsed:.3f}s")
+            return True, f"Snapshot {snapshot_id} taken for {ranked} players"
+            
+        except Exception as e:
+            logger.error(f"Error taking rank snapshot: {e}")
+            return False, f"Snapshot failed: {str(e)}"
+    
+    def get_seasons(self, limit=10):
+        """Get finished seasons, newest first"""
+        try:
+            with self.get_db_connection() as conn:
+                cursor = self._tuple_cursor(conn)
+                cursor.execute(f'''
+                    SELECT {columns(SeasonRow)} FROM seasons
+                    ORDER BY id DESC
+                    LIMIT ?
+                ''', (limit,))
+                return list(map(SeasonRow._make, cursor.fetchall()))
+        except Exception as e:
+            logger.error(f"Error getting seasons: {e}")
+            return []
+    
+    def get_season(self, season_id: int = None):
+        """Get a season by id, or the latest finalized one"""
+        try:
+            with self.get_db_connection() as conn:
+                cursor = self._tuple_cursor(conn)
+                if season_id is None:
+                    cursor.execute(f'''
+                        SELECT {columns(SeasonRow)} FROM seasons
+                        WHERE status = 'final' ORDER BY id DESC LIMIT 1
+                    ''')
+                else:
+                    cursor.execute(f'SELECT {columns(SeasonRow)} FROM seasons WHERE id = ?', (season_id,))
+                row = cursor.fetchone()
+                return SeasonRow._make(row) if row else None
+        except Exception as e:
+            logger.error(f"Error getting season: {e}")
+            return None
+    
+    def get_season_standings(self, season_id: int, limit=20):
+        """Get a season's final standings, best first"""
+        try:
+            with self.get_db_connection() as conn:
+                cursor = self._tuple_cursor(conn)
+                cursor.execute(f'''
+                    SELECT {columns(SeasonStandingRow)} FROM season_standings
+                    WHERE season_id = ?
+                    ORDER BY rank
+                    LIMIT ?
+                ''', (season_id, limit))
+                return list(map(SeasonStandingRow._make, cursor.fetchall()))
+        except Exception as e:
+            logger.error(f"Error getting season standings: {e}")
+            return []
+    
+    def get_season_awards(self, season_id: int):
+        """Get a season's awards as (award, standing, value) tuples"""
+        try:
+            with self.get_db_connection() as conn:
+                cursor = self._tuple_cursor(conn)
+                cursor.execute(f'''
+                    SELECT a.award, a.value, {columns(SeasonStandingRow, 's')}
+                    FROM season_awards a
+                    JOIN season_standings s ON s.season_id = a.season_id AND s.player_id = a.player_id
+                    WHERE a.season_id = ?
+                    ORDER BY a.award
+                ''', (season_id,))
+                return [(row[0], SeasonStandingRow._make(row[2:]), row[1]) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error getting season awards: {e}")
+            return []
+    
+    def get_player_seasons(self, discord_id: str, limit=10):
+        """Get a player's standing in each finished season, newest first"""
+        try:
+            with self.get_db_connection() as conn:
+                cursor = self._tuple_cursor(conn)
+                cursor.execute(f'''
+                    SELECT {columns(SeasonStandingRow)} FROM season_standings
+                    WHERE discord_id = ?
+                    ORDER BY season_id DESC
+                    LIMIT ?
+                ''', (discord_id, limit))
+                return list(map(SeasonStandingRow._make, cursor.fetchall()))
+        except Exception as e:
+            logger.error(f"Error getting player seasons: {e}")
+            return []
+    
+    def get_rank_history(self, discord_id: str, since: datetime = None, limit: int = None):
+        """Get a player's rank history points, oldest first"""
+        try:
+            with self.get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT h.series FROM rank_history h
+                    JOIN players_all p ON h.player_id = p.id
+                    WHERE p.discord_id = ?
+                ''', (discord_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return []
+            
+            points = decode_series(row[0])
+            if since is not None:
+                cutoff = int((since - datetime(1970, 1, 1)).total_seconds())
+                points = [point for point in points if point['taken_at'] >= cutoff]
+            if limit:
+                points = points[-limit:]
+            for point in points:
+                point['taken_at'] = datetime.utcfromtimestamp(point['taken_at'])
+            return points
+        except Exception as e:
+            logger.error(f"Error getting rank history: {e}")
+            return []
@@ -0,0 +1,148 @@
+"""
+Streaming exports of players and match results as CSV or NDJSON
+Rows are read in keyset-paginated batches so memory stays flat and exports can resume
+"""
+
+import io
+import csv
+import json
+import zlib
+from datetime import datetime
+
+from backends import SQLiteBackend
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 16 * 1024
+
+EXPORTS = {
+    'players': {
+        'columns': ('id', 'discord_id', 'username', 'wins', 'losses', 'draws',
+                    'kills', 'deaths', 'registered_at', 'is_active'),
+        'query': '''
+            SELECT id, discord_id, username, wins, losses, draws,
+                   kills, deaths, registered_at, is_active
+            FROM players_all
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        ''',
+        'next': 'SELECT id FROM players_all WHERE id > ? ORDER BY id LIMIT 2 OFFSET ?',
+    },
+    'matches': {
+        'columns': ('id', 'match_id', 'player1_discord_id', 'player1_name',
+                    'player2_discord_id', 'player2_name', 'player1_kills', 'player2_kills',
+                    'winner_discord_id', 'played_at', 'recorded_at', 'reverts_result_id'),
+        'query': '''
+            SELECT r.id, r.match_id, p1.discord_id, p1.username,
+                   p2.discord_id, p2.username, r.player1_kills, r.player2_kills,
+                   CASE r.winner_id WHEN r.player1_id THEN p1.discord_id
+                                    WHEN r.player2_id THEN p2.discord_id END,
+                   r.played_at, r.recorded_at, r.reverts_result_id
+            FROM match_results r
+            JOIN players_all p1 ON r.player1_id = p1.id
+            JOIN players_all p2 ON r.player2_id = p2.id
+            WHERE r.id > ?
+            ORDER BY r.id
+            LIMIT ?
+        ''',
+        'next': 'SELECT id FROM match_results WHERE id > ? ORDER BY id LIMIT 2 OFFSET ?',
+    },
+}
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+def iter_rows(db_path: str, kind: str, after: int = 0, limit: int = None,
+              batch_size: int = BATCH_SIZE, backend=None):
+    """Yield export rows with id > after, one short read transaction per batch"""
+    query = EXPORTS[kind]['query']
+    remaining = limit
+    conn = (backend or SQLiteBackend(db_path)).connect()
+    try:
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            batch = conn.execute(query, (after, size)).fetchall()
+            # PostgreSQL keeps a transaction open after a read; end it between batches
+            conn.commit()
+            if not batch:
+                break
+            yield from batch
+            after = batch[-1][0]
+            if remaining is not None:
+                remaining -= len(batch)
+            if len(batch) < size:
+                break
+    finally:
+        conn.close()
+
+def next_cursor(db_path: str, kind: str, after: int, limit: int, backend=None):
+    """Cursor to resume from after exporting limit rows, or None if they are the last"""
+    conn = (backend or SQLiteBackend(db_path)).connect()
+    try:
+        # The last row of this page, plus one more if the export continues past it
+        ids = conn.execute(EXPORTS[kind]['next'], (after, limit - 1)).fetchall()
+    finally:
+        conn.close()
+    return ids[0][0] if len(ids) == 2 else None
+
+def stream_csv(rows, columns, chunk_size: int = CHUNK_SIZE):
+    """Encode rows as CSV in chunks of roughly chunk_size characters"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def stream_ndjson(rows, columns, chunk_size: int = CHUNK_SIZE):
+    """Encode rows as newline-delimited JSON objects in chunks"""
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield ''.join(lines).encode('utf-8')
+            lines.clear()
+            size = 0
+    if lines:
+        yield ''.join(lines).encode('utf-8')
+
+def gzip_stream(chunks, level: int = 6, flush_bytes: int = 64 * 1024):
+    """Gzip a byte stream on the fly, emitting compressed output as it accumulates"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    pending = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if data:
+            yield data
+        if pending >= flush_bytes:
+            # Keep slow exports moving instead of buffering inside zlib
+            data = compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+            if data:
+                yield data
+    yield compressor.flush()
+
+def export_stream(db_path: str, kind: str, fmt: str = 'csv', after: int = 0,
+                  limit: int = None, compress: bool = False, backend=None):
+    """Byte chunks of a full export in the requested format"""
+    columns = EXPORTS[kind]['columns']
+    rows = iter_rows(db_path, kind, after=after, limit=limit, backend=backend)
+    encode = stream_csv if fmt == 'csv' else stream_ndjson
+    chunks = encode(rows, columns)
+    return gzip_stream(chunks) if compress else chunks
+
+def export_filename(kind: str, fmt: str, compress: bool = False) -> str:
+    """Download filename for an export"""
+    stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    name = f"duel-lords-{kind}-{stamp}.{FORMATS[fmt][1]}"
+    return f"{name}.gz" if compress else name
@@ -0,0 +1,192 @@
+"""
+Automatic player stats from the BombSquad server's event log
+The log is read incrementally through a generator pipeline (lines -> events -> per-player
+deltas); each batch of deltas is committed together with the byte offset it ends at, so a
+restart resumes after the last committed line without counting anything twice.
+
+The server's stats mod writes one event per line, optionally after a timestamp:
+    2026-10-19 20:14:03 KILL "Alice" "Bob"      Alice killed Bob
+    2026-10-19 20:14:09 DEATH "Bob"             Bob died without a killer
+    2026-10-19 20:16:40 RESULT "Alice" "Bob"    Alice beat Bob
+    2026-10-19 20:16:40 DRAW "Alice" "Bob"
+Any other line is ignored. Kills and deaths count for whichever side is registered; a result
+or draw only counts when both sides are.
+"""
+
+import os
+import re
+import time
+import logging
+from itertools import islice
+from typing import NamedTuple, Optional
+
+from search import normalize_name
+from stats_buffer import STAT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+WINS, LOSSES, DRAWS, KILLS, DEATHS = range(len(STAT_FIELDS))
+
+EVENT_LINE = re.compile(
+    r'\b(?P<kind>KILL|DEATH|RESULT|DRAW)\s+"(?P<first>(?:[^"\\]|\\.)*)"(?:\s+"(?P<second>(?:[^"\\]|\\.)*)")?'
+)
+ESCAPE = re.compile(r'\\(.)')
+# Events that only count when both players are registered
+TWO_SIDED = ('RESULT', 'DRAW')
+
+class GameEvent(NamedTuple):
+    """One parsed log event; second is None for DEATH"""
+    kind: str
+    first: str
+    second: Optional[str]
+
+class IngestResult(NamedTuple):
+    """What one ingestion pass read and applied"""
+    lines: int
+    events: int
+    players: int
+    unmatched: int
+    offset: int
+    duration: float
+
+def file_id(stat) -> str:
+    """Identity of a log file, so a rotated log is read from its start"""
+    return f"{stat.st_dev}:{stat.st_ino}"
+
+def read_lines(path: str, offset: int):
+    """Complete lines from offset on, as (offset after the line, text)"""
+    with open(path, 'rb') as log:
+        log.seek(offset)
+        for raw in log:
+            # A line still being written is picked up by the next pass
+            if not raw.endswith(b'\n'):
+                return
+            offset += len(raw)
+            yield offset, raw.decode('utf-8', errors='replace').rstrip('\r\n')
+
+def parse_events(lines):
+    """GameEvents found in lines of log text"""
+    for line in lines:
+        match = EVENT_LINE.search(line)
+        if match is None:
+            continue
+        second = match['second']
+        if match['kind'] != 'DEATH' and second is None:
+            continue
+        yield GameEvent(
+            match['kind'],
+            ESCAPE.sub(r'\1', match['first']),
+            ESCAPE.sub(r'\1', second) if second is not None else None
+        )
+
+def event_deltas(event: GameEvent):
+    """(in-game name, stat index) pairs an event adds one to"""
+    if event.kind == 'KILL':
+        if normalize_name(event.first) != normalize_name(event.second):
+            yield event.first, KILLS
+        yield event.second, DEATHS
+    elif event.kind == 'DEATH':
+        yield event.first, DEATHS
+    elif event.kind == 'RESULT':
+        yield event.first, WINS
+        yield event.second, LOSSES
+    else:
+        yield event.first, DRAWS
+        yield event.second, DRAWS
+
+class PlayerNames:
+    """Maps in-game names to registered players by their normalized username"""
+
+    def __init__(self, players):
+        self._ids = {}
+        ambiguous = set()
+        for player in players:
+            name = normalize_name(player.username)
+            if name in self._ids:
+                ambiguous.add(name)
+            self._ids[name] = player.discord_id
+        # Names shared by several players are never guessed
+        for name in ambiguous:
+            del self._ids[name]
+
+    def resolve(self, name: str) -> Optional[str]:
+        return self._ids.get(normalize_name(name))
+
+def aggregate(events, names: PlayerNames, unmatched: set):
+    """Sum events into {discord_id: [wins, losses, draws, kills, deaths]}; returns (deltas, count)"""
+    deltas = {}
+    count = 0
+    for event in events:
+        count += 1
+        resolved = [(names.resolve(name), name, field) for name, field in event_deltas(event)]
+        missing = [name for discord_id, name, _ in resolved if discord_id is None]
+        if missing:
+            unmatched.update(missing)
+            # A result needs both sides, or a win against a guest would count with no loss to match
+            if event.kind in TWO_SIDED:
+                continue
+        for discord_id, _, field in resolved:
+            if discord_id is not None:
+                deltas.setdefault(discord_id, [0] * len(STAT_FIELDS))[field] += 1
+    return deltas, count
+
+class LogIngestor:
+    """Applies new events from one log file, committing a batch of lines at a time"""
+
+    def __init__(self, db, path: str, batch_lines: int = 5000):
+        self.db = db
+        self.path = path
+        self.source = os.path.abspath(path)
+        self.batch_lines = batch_lines
+        self._warned = set()
+
+    def run_once(self) -> IngestResult:
+        """Apply every complete line written since the last committed offset"""
+        started = time.perf_counter()
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            logger.warning(f"Server log {self.path} does not exist yet")
+            return IngestResult(0, 0, 0, 0, 0, 0.0)
+
+        current = file_id(stat)
+        checkpoint_id, offset = self.db.get_ingest_checkpoint(self.source)
+        if checkpoint_id != current or stat.st_size < offset:
+            if checkpoint_id is not None:
+                logger.info(f"Server log {self.path} was rotated, reading it from the start")
+            offset = 0
+        if stat.st_size == offset:
+            return IngestResult(0, 0, 0, 0, offset, time.perf_counter() - started)
+
+        names = PlayerNames(self.db.get_all_players())
+        lines = read_lines(self.path, offset)
+        total_lines = total_events = 0
+        players = set()
+        unmatched = set()
+        while batch := list(islice(lines, self.batch_lines)):
+            deltas, events = aggregate(parse_events(text for _, text in batch), names, unmatched)
+            offset = batch[-1][0]
+            # The deltas and the offset they end at commit together
+            self.db.apply_ingested_deltas(deltas, self.source, current, offset)
+            total_lines += len(batch)
+            total_events += events
+            players.update(deltas)
+
+        new_names = unmatched - self._warned
+        if new_names:
+            self._warned |= new_names
+            logger.warning(f"Ignoring server log events for unregistered names: {', '.join(sorted(new_names))}")
+
+        result = IngestResult(total_lines, total_events, len(players), len(unmatched), offset,
+                              time.perf_counter() - started)
+        if total_lines:
+            logger.info(f"Ingested {result.events} events from {result.lines} log lines for "
+                        f"{result.players} players in {result.duration:.2f}s")
+        return result
+
+def log_ingestor_from_env(db) -> Optional[LogIngestor]:
+    """LogIngestor for SERVER_LOG_PATH, or None when no log is configured"""
+    path = os.getenv('SERVER_LOG_PATH')
+    if not path:
+        return None
+    return LogIngestor(db, path, batch_lines=int(os.getenv('SERVER_LOG_BATCH_LINES', '5000')))
@@ -1,18 +1,107 @@
 import os
+import sys
 import threading
 import logging
-import time
 import asyncio
-from app import app
-from bot import bot, run_bot
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Run mode: all (web + bot), async (web + bot on one event loop), web, bot, migrate, assets,
+# backup, restore, archive, ingest or season
+RUN_MODES = ('all', 'async', 'web', 'bot', 'migrate', 'assets', 'backup', 'restore', 'archive', 'ingest',
+             'season')
+if __name__ == "__main__" and len(sys.argv) > 1:
+    RUN_MODE = sys.argv[1].lower()
+else:
+    RUN_MODE = os.getenv('DUEL_LORDS_MODE', 'all').lower()
+
 # Global Discord bot thread
 discord_thread = None
 
+def __getattr__(name):
+    """Import the Flask app only when it is asked for (e.g. Gunicorn's main:app)"""
+    if name == 'app':
+        from app import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def migrate():
+    """Create or upgrade the database schema"""
+    from database import DatabaseManager
+    DatabaseManager().migrate()
+    
+    from app import app, db
+    with app.app_context():
+        # Import models so any ORM-only tables are created too
+        import models
+        db.create_all()
+    logger.info("Migration complete")
+
+def build_assets():
+    """Minify and fingerprint the static files for the web frontend"""
+    import assets
+    manifest = assets.build_assets()
+    logger.info(f"Built {len(manifest)} static assets")
+
+def backup():
+    """Write one online backup of the live database"""
+    from database import DatabaseManager
+    from backup import backup_manager_from_env
+    manager = DatabaseManager()
+    manager.ensure_schema()
+    result = backup_manager_from_env(manager).create_backup()
+    logger.info(f"Backup written to {result.path} ({result.snapshot_size} bytes, {result.duration:.2f}s)")
+
+def restore(snapshot):
+    """Restore the live database from a named snapshot"""
+    from database import DatabaseManager
+    from backup import backup_manager_from_env
+    backups = backup_manager_from_env(DatabaseManager())
+    if not snapshot:
+        logger.error("Usage: python main.py restore <snapshot>; available snapshots:")
+        for name in backups.list_snapshots():
+            logger.error(f"  {name}")
+        sys.exit(2)
+    backups.restore(snapshot)
+
+def archive():
+    """Move removed players and old finished matches into the archive tables"""
+    from database import DatabaseManager
+    from archive import archive_manager_from_env
+    manager = DatabaseManager()
+    manager.ensure_schema()
+    archive_manager_from_env(manager).run()
+
+def ingest(path):
+    """Apply a server log, e.g. a recorded one, from where its last ingestion stopped"""
+    from database import DatabaseManager
+    from ingest import LogIngestor
+    path = path or os.getenv('SERVER_LOG_PATH')
+    if not path:
+        logger.error("Usage: python main.py ingest <log file> (or set SERVER_LOG_PATH)")
+        sys.exit(2)
+    manager = DatabaseManager()
+    manager.ensure_schema()
+    result = LogIngestor(manager, path).run_once()
+    logger.info(f"{result.lines} lines, {result.events} events, {result.players} players updated, "
+                f"{result.unmatched} unregistered names; now at byte {result.offset}")
+
+def season(name):
+    """End the current season under name, or finish finalizing an interrupted one"""
+    from database import DatabaseManager
+    from seasons import season_manager_from_env
+    manager = DatabaseManager()
+    manager.ensure_schema()
+    seasons = season_manager_from_env(manager)
+    if not name:
+        seasons.resume()
+        return
+    result = seasons.end_season(name)
+    logger.info(f"Season {result.season_id} ({result.name}): {result.players} players ranked, "
+                f"{result.matches} matches, {result.duration:.2f}s")
+
 def start_discord_bot():
     """Start Discord bot in a separate thread"""
     global discord_thread
@@ -24,6 +113,7 @@ def start_discord_bot():
             if token:
                 # Create new event loop for this thread
                 asyncio.set_event_loop(asyncio.new_event_loop())
+                from bot import run_bot
                 run_bot()
             else:
                 logger.error("DISCORD_TOKEN not found!")
@@ -34,14 +124,45 @@ def start_discord_bot():
     discord_thread.start()
     logger.info("Discord bot thread started")
 
-# Start Discord bot when module is imported (for Gunicorn)
-start_discord_bot()
+if RUN_MODE not in RUN_MODES:
+    logger.error(f"Unknown run mode {RUN_MODE!r}, expected one of: {', '.join(RUN_MODES)}")
+    sys.exit(2)
+
+# Start Discord bot when module is imported (for Gunicorn), but not when a season worker
+# process re-imports this file as __mp_main__
+if __name__ not in ("__main__", "__mp_main__") and RUN_MODE == 'all':
+    start_discord_bot()
 
 if __name__ == "__main__":
-    logger.info("Starting Duel Lords Tournament Bot in development mode...")
-    
-    # In development, run Flask directly
-    try:
-        app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)
-    except Exception as e:
-        logger.error(f"Flask server failed to start: {e}")
+    if RUN_MODE == 'migrate':
+        migrate()
+    elif RUN_MODE == 'assets':
+        build_assets()
+    elif RUN_MODE == 'backup':
+        backup()
+    elif RUN_MODE == 'restore':
+        restore(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif RUN_MODE == 'archive':
+        archive()
+    elif RUN_MODE == 'ingest':
+        ingest(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif RUN_MODE == 'season':
+        season(' '.join(sys.argv[2:]))
+    elif RUN_MODE == 'bot':
+        from bot import run_bot
+        run_bot()
+    elif RUN_MODE == 'async':
+        from bot import run_bot
+        run_bot(web_port=int(os.getenv('PORT', '5000')))
+    else:
+        if RUN_MODE == 'all':
+            start_discord_bot()
+        
+        logger.info("Starting Duel Lords Tournament Bot in development mode...")
+        
+        # In development, run Flask directly
+        from app import app
+        try:
+            app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)
+        except Exception as e:
+            logger.error(f"Flask server failed to start: {e}")
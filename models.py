@@ -4,6 +4,8 @@ from sqlalchemy import func
 
 class Player(db.Model):
     """Player model for storing tournament participant data"""
+    __tablename__ = 'players'
+    
     id = db.Column(db.Integer, primary_key=True)
     discord_id = db.Column(db.String(20), unique=True, nullable=False)
     username = db.Column(db.String(100), nullable=False)
@@ -43,13 +45,15 @@ class Player(db.Model):
 
 class Match(db.Model):
     """Match model for storing scheduled and completed matches"""
+    __tablename__ = 'matches'
+    
     id = db.Column(db.Integer, primary_key=True)
-    player1_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
-    player2_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
+    player1_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
+    player2_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
     scheduled_time = db.Column(db.DateTime, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='scheduled')  # scheduled, completed, cancelled
-    winner_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=True)
+    winner_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=True)
     player1_kills = db.Column(db.Integer, default=0)
     player2_kills = db.Column(db.Integer, default=0)
     notes = db.Column(db.Text)
@@ -60,6 +64,8 @@ class Match(db.Model):
 
 class Tournament(db.Model):
     """Tournament model for organizing multiple matches"""
+    __tablename__ = 'tournaments'
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
@@ -0,0 +1,179 @@
+"""
+Pinned leaderboards kept current in place
+Each guild can have one leaderboard message that the bot edits instead of posting anew.
+Leaderboard changes from the change feed only mark the boards dirty; a single task waits
+out a debounce window so a burst of stat updates becomes one refresh, refreshes at most
+once per interval, and edits only the messages whose rendered text differs from what they
+last showed, spacing the edits to stay clear of Discord's rate limits.
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+
+import discord
+
+from utils import create_embed, leaderboard_text
+
+logger = logging.getLogger(__name__)
+
+PINNED_SIZE = 10
+
+def content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+def pinned_embed(content: str) -> discord.Embed:
+    """The pinned leaderboard message for rendered leaderboard text"""
+    embed = create_embed(
+        title="🏆 Live Leaderboard",
+        description=content or "No players registered yet!",
+        color=discord.Color.gold()
+    )
+    embed.set_footer(text="Updated automatically • Last updated")
+    return embed
+
+class PinnedLeaderboards:
+    """Debounced, diffed and paced edits of every guild's pinned leaderboard message"""
+
+    def __init__(self, bot, debounce_seconds: float = 5, min_interval_seconds: float = 30,
+                 edit_spacing_seconds: float = 0.5):
+        self.bot = bot
+        self.debounce = debounce_seconds
+        self.min_interval = min_interval_seconds
+        self.edit_spacing = edit_spacing_seconds
+        self._loop = None
+        self._dirty = None
+        self._task = None
+        self._last_refresh = 0.0
+
+        self.refreshes = 0
+        self.edits = 0
+        self.unchanged = 0
+        self.failures = 0
+
+    def start(self):
+        """Start the refresh task on the running loop; boards are checked once right away"""
+        self._loop = asyncio.get_running_loop()
+        self._dirty = asyncio.Event()
+        self._dirty.set()
+        self._task = asyncio.create_task(self._run(), name="pinned-leaderboards")
+
+    def on_changes(self, changes):
+        """Change feed subscriber: mark the boards dirty; runs on the feed thread"""
+        if changes.leaderboard and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._dirty.set)
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            # Let the burst that woke us finish, and keep to one refresh per interval
+            wait = max(self.debounce, self._last_refresh + self.min_interval - time.monotonic())
+            await asyncio.sleep(wait)
+            self._dirty.clear()
+            self._last_refresh = time.monotonic()
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error refreshing pinned leaderboards: {e}")
+
+    async def render(self):
+        """(text, digest) of the leaderboard as the pinned messages show it"""
+        players = await asyncio.to_thread(self.bot.db.get_leaderboard, PINNED_SIZE)
+        content = leaderboard_text(players, PINNED_SIZE)
+        return content, content_hash(content)
+
+    async def refresh(self):
+        """Edit every pinned leaderboard whose content is out of date"""
+        pins = await asyncio.to_thread(self.bot.db.get_pinned_leaderboards)
+        if not pins:
+            return
+        self.refreshes += 1
+        content, digest = await self.render()
+        stale = [pin for pin in pins if pin.content_hash != digest]
+        self.unchanged += len(pins) - len(stale)
+        for i, pin in enumerate(stale):
+            if i:
+                await asyncio.sleep(self.edit_spacing)
+            await self._edit(pin, content, digest)
+
+    async def _edit(self, pin, content: str, digest: str):
+        try:
+            channel = self.bot.get_channel(int(pin.channel_id)) or await self.bot.fetch_channel(int(pin.channel_id))
+            await channel.get_partial_message(int(pin.message_id)).edit(embed=pinned_embed(content))
+        except discord.NotFound as e:
+            # The message or its channel was deleted; stop editing it
+            logger.warning(f"Dropping pinned leaderboard {pin.message_id} in guild {pin.guild_id}: {e}")
+            await asyncio.to_thread(self.bot.db.remove_pinned_leaderboard, pin.guild_id, pin.message_id)
+            return
+        except discord.Forbidden as e:
+            # Retrying will not help until the permissions change; the next leaderboard change tries again
+            self.failures += 1
+            logger.warning(f"No permission to edit the pinned leaderboard in guild {pin.guild_id}: {e}")
+            return
+        except discord.HTTPException as e:
+            self.failures += 1
+            logger.error(f"Error editing pinned leaderboard in guild {pin.guild_id}: {e}")
+            # Still stale, so try again on the next refresh
+            self._dirty.set()
+            return
+        self.edits += 1
+        await asyncio.to_thread(self.bot.db.mark_pinned_leaderboard, pin.guild_id, pin.message_id, digest)
+
+    async def pin(self, guild_id: int, channel) -> bool:
+        """Post and pin the leaderboard in channel as the guild's board; False if it could not be pinned"""
+        content, digest = await self.render()
+        message = await channel.send(embed=pinned_embed(content))
+        pinned = True
+        try:
+            await message.pin(reason="Duel Lords live leaderboard")
+        except discord.HTTPException as e:
+            logger.warning(f"Could not pin the leaderboard in guild {guild_id}: {e}")
+            pinned = False
+        previous = await asyncio.to_thread(
+            self.bot.db.set_pinned_leaderboard, str(guild_id), str(channel.id), str(message.id), digest
+        )
+        if previous is not None and previous.message_id != str(message.id):
+            await self._delete(previous)
+        return pinned
+
+    async def unpin(self, guild_id: int) -> bool:
+        """Stop updating the guild's board and delete its message; False if there was none"""
+        previous = await asyncio.to_thread(self.bot.db.remove_pinned_leaderboard, str(guild_id))
+        if previous is None:
+            return False
+        await self._delete(previous)
+        return True
+
+    async def _delete(self, pin):
+        try:
+            channel = self.bot.get_channel(int(pin.channel_id)) or await self.bot.fetch_channel(int(pin.channel_id))
+            await channel.get_partial_message(int(pin.message_id)).delete()
+        except discord.HTTPException as e:
+            logger.warning(f"Could not delete old leaderboard message {pin.message_id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'refreshes': self.refreshes,
+            'edits': self.edits,
+            'unchanged': self.unchanged,
+            'failures': self.failures,
+        }
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+def pinned_leaderboards_from_env(bot) -> PinnedLeaderboards:
+    """PinnedLeaderboards configured from the LEADERBOARD_PIN_* environment variables"""
+    return PinnedLeaderboards(
+        bot,
+        debounce_seconds=float(os.getenv('LEADERBOARD_PIN_DEBOUNCE_SECONDS', '5')),
+        min_interval_seconds=float(os.getenv('LEADERBOARD_PIN_MIN_INTERVAL_SECONDS', '30')),
+        edit_spacing_seconds=float(os.getenv('LEADERBOARD_PIN_EDIT_SPACING_MS', '500')) / 1000
+    )
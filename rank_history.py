@@ -0,0 +1,52 @@
+"""
+Packed time-series encoding for leaderboard rank history
+Each player's history is a single blob of delta-encoded zigzag varints
+"""
+
+# Fields stored per snapshot point, in encoding order
+POINT_FIELDS = ('snapshot_id', 'taken_at', 'rank', 'wins', 'losses', 'draws', 'kills', 'deaths')
+
+def _zigzag(value: int) -> int:
+    """Map signed integers onto unsigned ones so small magnitudes stay small"""
+    return (value << 1) ^ (value >> 63)
+
+def _unzigzag(value: int) -> int:
+    """Inverse of _zigzag"""
+    return (value >> 1) ^ -(value & 1)
+
+def encode_point(point: tuple, previous: tuple = None) -> bytes:
+    """Encode one snapshot point as varint deltas against the previous point"""
+    previous = previous or (0,) * len(POINT_FIELDS)
+    out = bytearray()
+    for current, last in zip(point, previous):
+        value = _zigzag(current - last)
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+def iter_points(series: bytes):
+    """Decode a packed series, yielding absolute point tuples oldest first"""
+    width = len(POINT_FIELDS)
+    current = [0] * width
+    field = 0
+    value = 0
+    shift = 0
+    for byte in series or b'':
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+
+        current[field] += _unzigzag(value)
+        value = 0
+        shift = 0
+        field += 1
+        if field == width:
+            yield tuple(current)
+            field = 0
+
+def decode_series(series: bytes) -> list:
+    """Decode a packed series into a list of point dicts"""
+    return [dict(zip(POINT_FIELDS, point)) for point in iter_points(series)]
@@ -0,0 +1,162 @@
+"""
+Token bucket rate limiting for slash commands
+Buckets are refilled lazily when touched and idle ones are swept periodically,
+so memory only grows with recently active users and guilds
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ('user', 'guild', 'global')
+
+class Limit(NamedTuple):
+    """Bucket capacity and refill rate in tokens per second"""
+    capacity: float
+    rate: float
+
+    @classmethod
+    def parse(cls, spec: str) -> Optional["Limit"]:
+        """Parse "count/seconds", e.g. "3/10" for three uses every ten seconds"""
+        if not spec:
+            return None
+        count, seconds = spec.split('/')
+        return cls(float(count), float(count) / float(seconds))
+
+class TokenBucketStore:
+    """Token buckets keyed by tuple, each stored as a [tokens, last_refill, limit] list"""
+
+    def __init__(self, sweep_interval: float = 60.0, clock=time.monotonic):
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._last_sweep = clock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _level(self, key, limit: Limit, now: float) -> float:
+        """Current tokens in a bucket, refilled for the time since it was last touched"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return limit.capacity
+        return min(limit.capacity, bucket[0] + (now - bucket[1]) * limit.rate)
+
+    def acquire(self, keyed_limits) -> float:
+        """Take one token from every (key, limit) bucket, or none of them
+
+        Returns 0 when allowed, otherwise the seconds until all buckets have a token.
+        """
+        with self._lock:
+            now = self._clock()
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+
+            levels = [self._level(key, limit, now) for key, limit in keyed_limits]
+            wait = max(
+                ((1 - level) / limit.rate for level, (_, limit) in zip(levels, keyed_limits) if level < 1),
+                default=0.0
+            )
+            if wait:
+                return wait
+
+            for level, (key, limit) in zip(levels, keyed_limits):
+                self._buckets[key] = [level - 1, now, limit]
+            return 0.0
+
+    def sweep(self) -> int:
+        """Drop idle buckets now; returns how many were removed"""
+        with self._lock:
+            return self._sweep(self._clock())
+
+    def _sweep(self, now: float) -> int:
+        """Drop buckets that have refilled completely; they are the same as absent ones"""
+        idle = [
+            key for key, (tokens, stamp, limit) in self._buckets.items()
+            if tokens + (now - stamp) * limit.rate >= limit.capacity
+        ]
+        for key in idle:
+            del self._buckets[key]
+        self._last_sweep = now
+        if idle:
+            logger.debug(f"Swept {len(idle)} idle rate limit buckets, {len(self._buckets)} remain")
+        return len(idle)
+
+class ResponseCache:
+    """Small LRU of recent command responses, served to throttled requests"""
+
+    def __init__(self, max_entries: int = 512, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self._clock())
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, predicate) -> int:
+        """Drop every entry whose key matches predicate"""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def get(self, key, max_age: float):
+        """Cached value and its age in seconds, or None if missing or too old"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored = entry
+            age = self._clock() - stored
+            if age > max_age:
+                del self._entries[key]
+                return None
+            return value, age
+
+class RateLimiter:
+    """Per-command user, guild and global limits over one shared bucket store"""
+
+    def __init__(self, store: TokenBucketStore = None):
+        self.store = store or TokenBucketStore()
+        self.cache = ResponseCache()
+        self._commands = {}
+
+    def configure(self, command: str, user: str = None, guild: str = None, global_: str = None):
+        """Set a command's limits; RATE_LIMIT_<COMMAND>_<SCOPE> overrides each spec"""
+        specs = {'user': user, 'guild': guild, 'global': global_}
+        limits = {}
+        for scope in SCOPES:
+            spec = os.getenv(f"RATE_LIMIT_{command.upper()}_{scope.upper()}", specs[scope])
+            limit = Limit.parse(spec) if spec and spec.lower() != 'off' else None
+            if limit is not None:
+                limits[scope] = limit
+        self._commands[command] = limits
+
+    def hit(self, command: str, user_id: int, guild_id: Optional[int]) -> float:
+        """Record one use; returns 0 if allowed or the seconds to wait"""
+        if os.getenv('RATE_LIMITS_DISABLED') == '1':
+            return 0.0
+        limits = self._commands.get(command)
+        if not limits:
+            return 0.0
+
+        keyed = []
+        if 'user' in limits:
+            keyed.append(((command, 'user', user_id), limits['user']))
+        if 'guild' in limits and guild_id is not None:
+            keyed.append(((command, 'guild', guild_id), limits['guild']))
+        if 'global' in limits:
+            keyed.append(((command, 'global'), limits['global']))
+        return self.store.acquire(keyed)
@@ -0,0 +1,126 @@
+"""
+Lightweight typed result rows built straight from cursor tuples
+NamedTuples carry no per-instance __dict__, so they are much smaller than dict rows
+"""
+
+from typing import NamedTuple, Optional
+
+class PlayerRow(NamedTuple):
+    """One row of the players table"""
+    id: int
+    discord_id: str
+    username: str
+    wins: int
+    losses: int
+    draws: int
+    kills: int
+    deaths: int
+    registered_at: object
+    is_active: bool
+
+    @property
+    def total_matches(self) -> int:
+        """Calculate total matches played"""
+        return self.wins + self.losses + self.draws
+
+    @property
+    def win_rate(self) -> float:
+        """Calculate win rate percentage"""
+        total = self.wins + self.losses + self.draws
+        return round(self.wins / total * 100, 2) if total else 0.0
+
+    @property
+    def kd_ratio(self) -> float:
+        """Calculate kill/death ratio"""
+        if self.deaths == 0:
+            return float(self.kills)
+        return round(self.kills / self.deaths, 2)
+
+class UpcomingMatchRow(NamedTuple):
+    """A scheduled match joined with both players' names and Discord IDs"""
+    id: int
+    player1_id: int
+    player2_id: int
+    scheduled_time: str
+    created_at: str
+    status: str
+    winner_id: Optional[int]
+    player1_kills: int
+    player2_kills: int
+    notes: Optional[str]
+    reminder_sent: bool
+    player1_name: str
+    player1_discord_id: str
+    player2_name: str
+    player2_discord_id: str
+
+class MatchResultRow(NamedTuple):
+    """An entry of the match results log joined with both players' names"""
+    id: int
+    match_id: Optional[int]
+    player1_id: int
+    player2_id: int
+    player1_kills: int
+    player2_kills: int
+    winner_id: Optional[int]
+    played_at: str
+    recorded_at: str
+    reverts_result_id: Optional[int]
+    player1_name: str
+    player2_name: str
+
+class SeasonRow(NamedTuple):
+    """One finished season"""
+    id: int
+    name: str
+    started_at: object
+    ended_at: object
+    player_count: int
+    match_count: int
+    status: str
+    finalized_at: object
+
+class SeasonStandingRow(NamedTuple):
+    """A player's frozen final standing and summary for one season"""
+    season_id: int
+    player_id: int
+    discord_id: str
+    username: str
+    rank: int
+    wins: int
+    losses: int
+    draws: int
+    kills: int
+    deaths: int
+    matches: int
+    best_streak: int
+    best_match_kills: int
+    opponents: int
+
+    @property
+    def win_rate(self) -> float:
+        """Win rate percentage over the season"""
+        total = self.wins + self.losses + self.draws
+        return round(self.wins / total * 100, 2) if total else 0.0
+
+    @property
+    def kd_ratio(self) -> float:
+        """Kill/death ratio over the season"""
+        if self.deaths == 0:
+            return float(self.kills)
+        return round(self.kills / self.deaths, 2)
+
+class PinnedLeaderboardRow(NamedTuple):
+    """A guild's pinned leaderboard message and a digest of what it last showed"""
+    guild_id: str
+    channel_id: str
+    message_id: str
+    content_hash: Optional[str]
+
+def columns(row_type, alias: str = None, count: int = None) -> str:
+    """SELECT list for the leading table columns of a row type, in field order"""
+    fields = row_type._fields[:count]
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(prefix + field for field in fields)
+
+PLAYER_COLUMNS = columns(PlayerRow)
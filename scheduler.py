@@ -1,8 +1,10 @@
+import os
 import asyncio
 import logging
 from datetime import datetime, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from utils import create_embed
 import discord
 
@@ -22,6 +24,136 @@ class SchedulerManager:
         
         # Schedule existing matches that need reminders
         await self.schedule_existing_reminders()
+        
+        # Periodic leaderboard snapshots for rank history
+        snapshot_hours = float(os.getenv('RANK_SNAPSHOT_INTERVAL_HOURS', '24'))
+        self.scheduler.add_job(
+            self.take_rank_snapshot,
+            IntervalTrigger(hours=snapshot_hours),
+            id="rank_snapshot",
+            replace_existing=True
+        )
+        
+        # Drop audit log months past the retention window once a day
+        self.scheduler.add_job(
+            self.prune_audit_log,
+            IntervalTrigger(hours=24),
+            id="audit_retention",
+            replace_existing=True
+        )
+        
+        # Forget processed interaction IDs once Discord can no longer retry them
+        self.scheduler.add_job(
+            self.prune_processed_interactions,
+            IntervalTrigger(hours=24),
+            id="interaction_prune",
+            replace_existing=True
+        )
+        
+        # Pair queued players as their search windows widen
+        self.scheduler.add_job(
+            self.run_matchmaking,
+            IntervalTrigger(seconds=float(os.getenv('MATCH_QUEUE_SWEEP_SECONDS', '15'))),
+            id="matchmaking",
+            replace_existing=True
+        )
+        
+        # Trim the cross-process change log once every feed has read it
+        self.scheduler.add_job(
+            self.prune_change_log,
+            IntervalTrigger(hours=1),
+            id="change_log_prune",
+            replace_existing=True
+        )
+        
+        # Free rate limit buckets for users who have gone quiet
+        self.scheduler.add_job(
+            self.sweep_rate_limits,
+            IntervalTrigger(minutes=5),
+            id="rate_limit_sweep",
+            replace_existing=True
+        )
+        
+        # Pick up kills, deaths and results the game server has logged since the last pass
+        if self.bot.ingest is not None:
+            self.scheduler.add_job(
+                self.ingest_server_log,
+                IntervalTrigger(seconds=float(os.getenv('SERVER_LOG_POLL_SECONDS', '5'))),
+                id="server_log_ingest",
+                replace_existing=True
+            )
+        
+        # Keep the hot tables small; 0 disables the schedule, /archive still works
+        archive_hours = float(os.getenv('ARCHIVE_INTERVAL_HOURS', '24'))
+        if archive_hours > 0:
+            self.scheduler.add_job(
+                self.run_archive,
+                IntervalTrigger(hours=archive_hours),
+                id="archive",
+                replace_existing=True
+            )
+        
+        # Periodic online backups; 0 disables them, and PostgreSQL is left to pg_dump
+        backup_hours = float(os.getenv('BACKUP_INTERVAL_HOURS', '6'))
+        if backup_hours > 0 and self.bot.db.backend.name == 'sqlite':
+            self.scheduler.add_job(
+                self.run_backup,
+                IntervalTrigger(hours=backup_hours),
+                id="database_backup",
+                replace_existing=True
+            )
+    
+    async def prune_audit_log(self):
+        """Drop audit partitions older than AUDIT_RETENTION_MONTHS"""
+        months = int(os.getenv('AUDIT_RETENTION_MONTHS', '12'))
+        try:
+            await asyncio.to_thread(self.bot.audit.drop_before, months)
+        except Exception as e:
+            logger.error(f"Audit log retention failed: {e}")
+    
+    async def prune_processed_interactions(self):
+        """Drop idempotency keys older than a day"""
+        await asyncio.to_thread(self.bot.db.prune_processed_interactions)
+    
+    async def prune_change_log(self):
+        """Drop change log entries older than an hour"""
+        await asyncio.to_thread(self.bot.db.prune_change_log)
+    
+    async def run_matchmaking(self):
+        """Schedule matches for queued players that can now be paired"""
+        for pairing in self.bot.matchmaking.match_waiting():
+            await self.bot.start_queued_match(pairing)
+    
+    async def sweep_rate_limits(self):
+        """Drop rate limit buckets that have refilled completely"""
+        self.bot.limiter.store.sweep()
+    
+    async def ingest_server_log(self):
+        """Apply new server log events without blocking the event loop"""
+        try:
+            await asyncio.to_thread(self.bot.ingest.run_once)
+        except Exception as e:
+            logger.error(f"Server log ingestion failed: {e}")
+    
+    async def run_archive(self):
+        """Archive removed players and old matches without blocking the event loop"""
+        try:
+            await asyncio.to_thread(self.bot.archive.run)
+        except Exception as e:
+            logger.error(f"Scheduled archive run failed: {e}")
+    
+    async def run_backup(self):
+        """Write a scheduled online backup without blocking the event loop"""
+        try:
+            await asyncio.to_thread(self.bot.backups.create_backup)
+        except Exception as e:
+            logger.error(f"Scheduled backup failed: {e}")
+    
+    async def take_rank_snapshot(self):
+        """Record a leaderboard snapshot without blocking the event loop"""
+        success, message = await asyncio.to_thread(self.bot.db.take_rank_snapshot)
+        if not success:
+            logger.error(message)
     
     async def schedule_existing_reminders(self):
         """Schedule reminders for existing matches"""
@@ -29,17 +161,17 @@ class SchedulerManager:
             upcoming_matches = self.bot.db.get_upcoming_matches()
             
             for match in upcoming_matches:
-                if not match['reminder_sent']:
-                    match_time = datetime.fromisoformat(match['scheduled_time'])
+                if not match.reminder_sent:
+                    match_time = datetime.fromisoformat(match.scheduled_time)
                     reminder_time = match_time - timedelta(minutes=5)
                     
                     if reminder_time > datetime.now():
                         await self.schedule_reminder(
-                            int(match['player1_discord_id']),
-                            int(match['player2_discord_id']),
+                            int(match.player1_discord_id),
+                            int(match.player2_discord_id),
                             match_time,
                             None,  # guild_id not needed for existing matches
-                            match['id']
+                            match.id
                         )
                         
         except Exception as e:
@@ -151,7 +283,7 @@ class SchedulerManager:
             
             # Mark reminder as sent in database
             if match_id:
-                self.bot.db.mark_reminder_sent(match_id)
+                await asyncio.to_thread(self.bot.db.mark_reminder_sent, match_id)
                 
         except Exception as e:
             logger.error(f"Error sending match reminder: {e}")
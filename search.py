@@ -0,0 +1,182 @@
+"""
+In-memory player name indexes for search and autocomplete
+"""
+
+import math
+import heapq
+import threading
+import unicodedata
+from itertools import islice
+
+def normalize_name(name: str) -> str:
+    """Case- and accent-insensitive form of a player name"""
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).strip()
+
+def trigrams(text: str) -> set:
+    """Trigrams of a normalized name, padded so prefixes weigh more"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex:
+    """Fuzzy name lookup using trigram postings and Jaccard similarity"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._names = {}
+        self._normalized = {}
+        self._grams = {}
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, key):
+        return key in self._names
+
+    def add(self, key: str, name: str):
+        """Index a name under key, replacing any previous name"""
+        with self._lock:
+            self.remove(key)
+            normalized = normalize_name(name)
+            grams = trigrams(normalized)
+            self._names[key] = name
+            self._normalized[key] = normalized
+            self._grams[key] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: str):
+        """Drop a key from the index"""
+        with self._lock:
+            grams = self._grams.pop(key, None)
+            if grams is None:
+                return
+            del self._names[key]
+            del self._normalized[key]
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(key)
+                    if not postings:
+                        del self._postings[gram]
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._names.clear()
+            self._normalized.clear()
+            self._grams.clear()
+            self._postings.clear()
+
+    def search(self, query: str, limit: int = 10, min_similarity: float = 0.4,
+               max_candidates: int = 2000):
+        """Best matches for query as (key, name, score) tuples"""
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+
+        query_grams = trigrams(normalized)
+        query_size = len(query_grams)
+        with self._lock:
+            postings = sorted((self._postings.get(gram, ()) for gram in query_grams), key=len)
+
+            # A name sharing at least `needed` grams must appear in one of the rarest
+            # query_size - needed + 1 posting lists, so the common ones can be skipped
+            needed = max(1, math.ceil(query_size * min_similarity))
+            candidates = set()
+            for keys in postings[:query_size - needed + 1]:
+                candidates.update(islice(keys, max_candidates - len(candidates)))
+                if len(candidates) >= max_candidates:
+                    break
+
+            results = []
+            for key in candidates:
+                grams = self._grams[key]
+                common = len(query_grams & grams)
+                if common < needed:
+                    continue
+                score = common / (query_size + len(grams) - common)
+                if self._normalized[key].startswith(normalized):
+                    score += 1.0
+                results.append((round(score, 3), self._names[key], key))
+
+        best = heapq.nsmallest(limit, results, key=lambda result: (-result[0], result[1].casefold()))
+        return [(key, name, score) for score, name, key in best]
+
+class _TrieNode:
+    """One character step in the prefix trie"""
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children = {}
+        self.entries = {}
+
+class PrefixTrie:
+    """Prefix lookup of names for autocomplete"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._root = _TrieNode()
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def add(self, key: str, name: str):
+        """Insert name under key, replacing any previous name"""
+        with self._lock:
+            self.remove(key)
+            normalized = normalize_name(name)
+            node = self._root
+            for ch in normalized:
+                node = node.children.setdefault(ch, _TrieNode())
+            node.entries[key] = name
+            self._keys[key] = (normalized, name)
+
+    def remove(self, key: str):
+        """Drop a key, pruning nodes that become empty"""
+        with self._lock:
+            entry = self._keys.pop(key, None)
+            if entry is None:
+                return
+            path = [self._root]
+            for ch in entry[0]:
+                path.append(path[-1].children[ch])
+            path[-1].entries.pop(key, None)
+            for depth in range(len(entry[0]), 0, -1):
+                node = path[depth]
+                if node.children or node.entries:
+                    break
+                del path[depth - 1].children[entry[0][depth - 1]]
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._root = _TrieNode()
+            self._keys.clear()
+
+    def get(self, key: str):
+        """Name stored under key, or None"""
+        entry = self._keys.get(key)
+        return entry[1] if entry else None
+
+    def complete(self, prefix: str, limit: int = 25):
+        """Up to limit (key, name) pairs whose name starts with prefix, alphabetically"""
+        with self._lock:
+            node = self._root
+            for ch in normalize_name(prefix):
+                node = node.children.get(ch)
+                if node is None:
+                    return []
+
+            results = []
+            stack = [node]
+            while stack and len(results) < limit:
+                node = stack.pop()
+                results.extend(sorted(node.entries.items(), key=lambda item: item[1].casefold()))
+                stack.extend(node.children[ch] for ch in sorted(node.children, reverse=True))
+            return results[:limit]
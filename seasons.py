@@ -0,0 +1,317 @@
+"""
+Season rollover
+Ending a season freezes the live leaderboard into season_standings and zeroes every player's
+counters in one write, so no update lands half in one season and half in the next. The
+per-player season summaries (matches, best win streak, best match, distinct opponents) are
+then computed from the season's match results by a process pool, each worker reading one
+range of result ids, and joined per player in the parent; the awards are chosen from them.
+Season queries read only these tables.
+"""
+
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import NamedTuple
+
+from backends import backend_from_env
+
+logger = logging.getLogger(__name__)
+
+# Award name -> (standing field ranked on, description); ties go to the better final rank
+AWARDS = {
+    'champion': ('rank', "Season champion"),
+    'top_fragger': ('kills', "Most kills"),
+    'best_kd': ('kd_ratio', "Best K/D ratio"),
+    'longest_streak': ('best_streak', "Longest win streak"),
+    'most_active': ('matches', "Most matches played"),
+}
+
+# Result ids each worker reads at least; below this, starting processes and shipping the
+# per-player summaries back costs more than splitting the scan saves
+MIN_RESULTS_PER_WORKER = 250_000
+
+class SeasonResult(NamedTuple):
+    """Outcome of ending one season"""
+    season_id: int
+    name: str
+    players: int
+    matches: int
+    duration: float
+
+# Results counted by the season and not undone, in the order they were played
+SEASON_RESULTS = '''
+    SELECT r.player1_id, r.player2_id, r.player1_kills, r.player2_kills, r.winner_id, r.played_at, r.id
+    FROM match_results r
+    WHERE r.id > ? AND r.id <= ? AND r.reverts_result_id IS NULL {players}
+      AND NOT EXISTS (SELECT 1 FROM match_results u WHERE u.reverts_result_id = r.id)
+    ORDER BY r.played_at, r.id
+'''
+
+class Segment(NamedTuple):
+    """One player's results within one id range, summarised so ranges can be joined"""
+    player_id: int
+    matches: int
+    leading_wins: int
+    trailing_wins: int
+    best_streak: int
+    best_match_kills: int
+    # Distinct opponent ids; an array pickles as one buffer on the way back from a worker
+    opponents: array
+    first: tuple
+    last: tuple
+
+def _segments(rows):
+    """Segments of every player in rows, which must be in played order"""
+    # player_id -> [matches, leading wins (-1 while unbeaten), current streak, best streak,
+    #               best kills, opponents, first row, last row]
+    summaries = {}
+    for row in rows:
+        a, b, a_kills, b_kills, winner, _, _ = row
+        for player_id, opponent, kills in ((a, b, a_kills), (b, a, b_kills)):
+            summary = summaries.get(player_id)
+            if summary is None:
+                summary = summaries[player_id] = [0, -1, 0, 0, 0, set(), row, row]
+            if winner == player_id:
+                summary[2] += 1
+                if summary[2] > summary[3]:
+                    summary[3] = summary[2]
+            else:
+                if summary[1] < 0:
+                    summary[1] = summary[0]
+                summary[2] = 0
+            if kills > summary[4]:
+                summary[4] = kills
+            summary[0] += 1
+            summary[5].add(opponent)
+            summary[7] = row
+    return [Segment(player_id, matches, matches if leading < 0 else leading, current, best, kills,
+                    array('q', opponents), first[5:], last[5:])
+            for player_id, (matches, leading, current, best, kills, opponents, first, last) in summaries.items()]
+
+def summarize_range(db_path: str, low_id: int, high_id: int):
+    """Segments of every player with results in low_id < id <= high_id; runs in a worker process"""
+    backend = backend_from_env(db_path)
+    conn = backend.connect()
+    try:
+        rows = conn.execute(SEASON_RESULTS.format(players=''), (low_id, high_id)).fetchall()
+    finally:
+        conn.close()
+    return _segments(rows)
+
+def join_segments(segments):
+    """(matches, best_streak, best_match_kills, opponents) of one player's segments in played order"""
+    matches = best = kills = trailing = 0
+    for segment in segments:
+        # A streak running at the end of one range continues into the next
+        best = max(best, segment.best_streak, trailing + segment.leading_wins)
+        full = segment.leading_wins == segment.matches
+        trailing = trailing + segment.matches if full else segment.trailing_wins
+        matches += segment.matches
+        kills = max(kills, segment.best_match_kills)
+    if len(segments) == 1:
+        return matches, best, kills, len(segments[0].opponents)
+    return matches, best, kills, len(set().union(*(segment.opponents for segment in segments)))
+
+def choose_awards(standings, min_matches: int):
+    """(award, player_id, value) for each award someone qualifies for"""
+    awards = []
+    for award, (field, _) in AWARDS.items():
+        eligible = [s for s in standings if s.matches >= min_matches] if field == 'kd_ratio' else standings
+        if field == 'rank':
+            best = min(eligible, key=lambda s: s.rank, default=None)
+        else:
+            best = max(eligible, key=lambda s: (getattr(s, field), -s.rank), default=None)
+        if best is None or (field != 'rank' and not getattr(best, field)):
+            continue
+        value = best.wins if field == 'rank' else getattr(best, field)
+        awards.append((award, best.player_id, value))
+    return awards
+
+class SeasonManager:
+    """Ends seasons and computes their final standings, summaries and awards"""
+
+    def __init__(self, db_manager, workers: int = None, award_min_matches: int = 5):
+        self.db = db_manager
+        self.workers = workers or os.cpu_count() or 1
+        self.award_min_matches = award_min_matches
+        self._lock = threading.Lock()
+
+    def _freeze(self, name: str):
+        """Record the season, copy the live standings and reset the counters in one write"""
+        ended_at = datetime.utcnow().replace(microsecond=0)
+
+        def freeze(cursor):
+            cursor.execute("SELECT 1 FROM seasons WHERE status = 'frozen'")
+            if cursor.fetchone():
+                raise RuntimeError("The previous season is still being finalized")
+            cursor.execute('SELECT ended_at, last_result_id FROM seasons ORDER BY id DESC LIMIT 1')
+            previous = cursor.fetchone()
+            started_at, after_id = (previous[0], previous[1]) if previous else (None, 0)
+            cursor.execute('''
+                SELECT (SELECT COALESCE(MAX(id), 0) FROM match_results),
+                       (SELECT COALESCE(MAX(id), 0) FROM stat_adjustments)
+            ''')
+            last_result_id, last_adjustment_id = cursor.fetchone()
+            cursor.execute('''
+                SELECT COUNT(*) FROM match_results r
+                WHERE r.id > ? AND r.id <= ? AND r.reverts_result_id IS NULL
+                  AND NOT EXISTS (SELECT 1 FROM match_results u WHERE u.reverts_result_id = r.id)
+            ''', (after_id, last_result_id))
+            match_count = cursor.fetchone()[0]
+
+            cursor.execute('''
+                INSERT INTO seasons (name, started_at, ended_at, after_result_id, last_result_id,
+                                     last_adjustment_id, match_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                RETURNING id
+            ''', (name, started_at, ended_at, after_id, last_result_id, last_adjustment_id, match_count))
+            season_id = cursor.fetchone()[0]
+            # Final rankings in leaderboard order, for everyone with a result or logged kills this season
+            cursor.execute('''
+                INSERT INTO season_standings (season_id, player_id, discord_id, username, rank,
+                                              wins, losses, draws, kills, deaths)
+                SELECT ?, id, discord_id, username,
+                       ROW_NUMBER() OVER (ORDER BY wins DESC, kills DESC, (wins + losses + draws) DESC, id),
+                       wins, losses, draws, kills, deaths
+                FROM players
+                WHERE is_active = 1 AND wins + losses + draws + kills + deaths > 0
+            ''', (season_id,))
+            players = cursor.rowcount
+            cursor.execute('UPDATE seasons SET player_count = ? WHERE id = ?', (players, season_id))
+            cursor.execute('''
+                UPDATE players SET wins = 0, losses = 0, draws = 0, kills = 0, deaths = 0
+                WHERE wins <> 0 OR losses <> 0 OR draws <> 0 OR kills <> 0 OR deaths <> 0
+            ''')
+            return season_id
+
+        return self.db.write(freeze)
+
+    def _summaries(self, after_id: int, last_id: int):
+        """Per-player summaries, with each worker reading one range of result ids"""
+        span = max(MIN_RESULTS_PER_WORKER, -(-(last_id - after_id) // self.workers))
+        bounds = [(low, min(low + span, last_id)) for low in range(after_id, last_id, span)]
+        if len(bounds) <= 1:
+            segments = summarize_range(self.db.db_path, after_id, last_id)
+        else:
+            # spawn, not fork: the parent has writer and scheduler threads running
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=len(bounds), mp_context=context) as pool:
+                futures = [pool.submit(summarize_range, self.db.db_path, low, high) for low, high in bounds]
+                segments = [segment for future in futures for segment in future.result()]
+
+        # Each player's segments, in the order of their id ranges
+        by_player = {}
+        for segment in segments:
+            by_player.setdefault(segment.player_id, []).append(segment)
+        summaries, recount = [], []
+        for player_id, player_segments in by_player.items():
+            # Ranges only join cleanly if they follow each other in time, which back-dated
+            # results can break; those players are read again in one ordered pass
+            if any(later.first < earlier.last for earlier, later in zip(player_segments, player_segments[1:])):
+                recount.append(player_id)
+            else:
+                summaries.append((player_id, *join_segments(player_segments)))
+        if recount:
+            summaries.extend(self._recount(after_id, last_id, recount))
+        return summaries
+
+    def _recount(self, after_id: int, last_id: int, player_ids):
+        """Summaries of the given players from all of their season's results in order"""
+        summaries = []
+        with self.db.get_db_connection() as conn:
+            cursor = conn.cursor()
+            for player_id in player_ids:
+                cursor.execute(SEASON_RESULTS.format(players='AND (r.player1_id = ? OR r.player2_id = ?)'),
+                               (after_id, last_id, player_id, player_id))
+                segment = next(s for s in _segments(cursor.fetchall()) if s.player_id == player_id)
+                summaries.append((player_id, *join_segments([segment])))
+        return summaries
+
+    def finalize(self, season_id: int):
+        """Compute the summaries and awards of a frozen season and mark it final"""
+        season = self.db.get_season(season_id)
+        with self.db.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT after_result_id, last_result_id FROM seasons WHERE id = ?', (season_id,))
+            after_id, last_id = cursor.fetchone()
+        summaries = self._summaries(after_id, last_id)
+
+        def store_summaries(cursor):
+            cursor.executemany('''
+                UPDATE season_standings
+                SET matches = ?, best_streak = ?, best_match_kills = ?, opponents = ?
+                WHERE season_id = ? AND player_id = ?
+            ''', [(*summary[1:], season_id, summary[0]) for summary in summaries])
+
+        self.db.write(store_summaries)
+        standings = self.db.get_season_standings(season_id, limit=season.player_count)
+        awards = choose_awards(standings, self.award_min_matches)
+
+        def store_awards(cursor):
+            cursor.execute('DELETE FROM season_awards WHERE season_id = ?', (season_id,))
+            cursor.executemany(
+                'INSERT INTO season_awards (season_id, award, player_id, value) VALUES (?, ?, ?, ?)',
+                [(season_id, *award) for award in awards]
+            )
+            cursor.execute('''
+                UPDATE seasons SET status = 'final', finalized_at = CURRENT_TIMESTAMP WHERE id = ?
+            ''', (season_id,))
+
+        self.db.write(store_awards)
+        return len(standings), len(awards)
+
+    def _resume(self):
+        for season in self.db.get_seasons(limit=5):
+            if season.status == 'frozen':
+                logger.info(f"Resuming finalization of season {season.id} ({season.name})")
+                self.finalize(season.id)
+
+    def resume(self):
+        """Finalize seasons frozen by a run that stopped before finishing"""
+        with self._lock:
+            self._resume()
+
+    def end_season(self, name: str) -> SeasonResult:
+        """Freeze the live standings as a finished season, reset the counters and finalize it"""
+        with self._lock:
+            started = time.perf_counter()
+            self._resume()
+            self.db._read_barrier()
+            season_id = self._freeze(name)
+            players, awards = self.finalize(season_id)
+            season = self.db.get_season(season_id)
+            duration = time.perf_counter() - started
+
+        result = SeasonResult(season_id, name, players, season.match_count, duration)
+        logger.info(f"Season {season_id} ({name}) ended with {players} players, {season.match_count} "
+                    f"matches and {awards} awards in {duration:.2f}s")
+        return result
+
+def season_report(db_manager, season_id: int = None, limit: int = 20):
+    """JSON-ready final standings and awards of a finished season, or None"""
+    season = db_manager.get_season(season_id)
+    if season is None or season.status != 'final':
+        return None
+    return {
+        'season': season._asdict(),
+        'standings': [standing._asdict() for standing in db_manager.get_season_standings(season.id, limit)],
+        'awards': [
+            {'award': award, 'title': AWARDS[award][1], 'discord_id': standing.discord_id,
+             'username': standing.username, 'value': value}
+            for award, standing, value in db_manager.get_season_awards(season.id)
+        ],
+    }
+
+def season_manager_from_env(db_manager) -> SeasonManager:
+    """SeasonManager configured from the SEASON_* environment variables"""
+    workers = int(os.getenv('SEASON_WORKERS', '0'))
+    return SeasonManager(
+        db_manager,
+        workers=workers or None,
+        award_min_matches=int(os.getenv('SEASON_AWARD_MIN_MATCHES', '5'))
+    )
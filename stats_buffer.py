@@ -0,0 +1,155 @@
+"""
+Write-behind buffer for player stat deltas
+Deltas are journaled to disk, coalesced in memory per player and committed in batches
+"""
+
+import os
+import glob
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = ('wins', 'losses', 'draws', 'kills', 'deaths')
+
+class StatsBuffer:
+    """Coalescing, journaled write-behind buffer keyed by discord_id"""
+
+    def __init__(self, db_manager, journal_path: str, flush_interval_ms: int = 500,
+                 max_entries: int = 100):
+        self.db = db_manager
+        self.journal_path = journal_path
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._pending_seq = 0
+        self._seq = 0
+        self._journal = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Replay any unflushed journal entries, then start the flush thread"""
+        self.replay()
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name="stats-buffer", daemon=True)
+        self._thread.start()
+        logger.info(f"Write-behind stats buffer started (every {self.flush_interval * 1000:.0f}ms "
+                    f"or {self.max_entries} players)")
+
+    def _segments(self):
+        """Journal segments awaiting commit, oldest first"""
+        return sorted(glob.glob(f"{glob.escape(self.journal_path)}.*"))
+
+    def replay(self):
+        """Apply journal entries newer than the last committed sequence number"""
+        last_seq = self.db.get_stats_buffer_seq()
+        totals = {}
+        max_seq = last_seq
+        replayed = 0
+
+        for path in self._segments() + [self.journal_path]:
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding='utf-8') as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-write was never acknowledged
+                        logger.warning(f"Skipping unreadable journal line in {path}")
+                        continue
+                    if entry['seq'] <= last_seq:
+                        continue
+                    deltas = totals.setdefault(entry['id'], [0] * len(STAT_FIELDS))
+                    for i, value in enumerate(entry['d']):
+                        deltas[i] += value
+                    max_seq = max(max_seq, entry['seq'])
+                    replayed += 1
+
+        if totals:
+            self.db.apply_stat_deltas(totals, max_seq)
+            logger.info(f"Replayed {replayed} journaled stat updates for {len(totals)} players")
+
+        for path in self._segments():
+            os.remove(path)
+        if os.path.exists(self.journal_path):
+            os.truncate(self.journal_path, 0)
+        self._seq = max_seq
+
+    def add(self, discord_id: str, wins: int = 0, losses: int = 0, draws: int = 0,
+            kills: int = 0, deaths: int = 0):
+        """Journal a delta and merge it into the pending batch"""
+        values = (wins, losses, draws, kills, deaths)
+        with self._lock:
+            self._seq += 1
+            self._journal.write(json.dumps({'seq': self._seq, 'id': discord_id, 'd': values}) + '\n')
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+            deltas = self._pending.setdefault(discord_id, [0] * len(STAT_FIELDS))
+            for i, value in enumerate(values):
+                deltas[i] += value
+            self._pending_seq = self._seq
+            full = len(self._pending) >= self.max_entries
+
+        if full:
+            self._wake.set()
+
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def flush(self):
+        """Commit all pending deltas in one transaction"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                batch_seq = self._pending_seq
+
+                # Seal the current journal so new writes go to a fresh file
+                self._journal.close()
+                os.replace(self.journal_path, f"{self.journal_path}.{batch_seq:012d}")
+                self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+            try:
+                self.db.apply_stat_deltas(batch, batch_seq)
+            except Exception as e:
+                logger.error(f"Error flushing stats buffer: {e}")
+                # Keep the sealed segment and retry the deltas with the next batch
+                with self._lock:
+                    for discord_id, deltas in batch.items():
+                        merged = self._pending.setdefault(discord_id, [0] * len(STAT_FIELDS))
+                        for i, value in enumerate(deltas):
+                            merged[i] += value
+                    self._pending_seq = max(self._pending_seq, batch_seq)
+                return 0
+
+            for path in self._segments():
+                if int(path.rsplit('.', 1)[1]) <= batch_seq:
+                    os.remove(path)
+            return len(batch)
+
+    def _run(self):
+        """Flush on the interval, or early when the batch is full"""
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the flush thread and commit whatever is pending"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
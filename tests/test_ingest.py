@@ -0,0 +1,103 @@
+"""
+Server log ingestion against a recorded log, on a scratch SQLite database
+"""
+
+import os
+import shutil
+
+import pytest
+
+from backends import SQLiteBackend
+from database import DatabaseManager
+from ingest import LogIngestor
+from stats_buffer import STAT_FIELDS
+
+RECORDED_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'server.log')
+
+# [wins, losses, draws, kills, deaths] the recorded log adds
+EXPECTED = {
+    'alice': [1, 0, 0, 2, 2],
+    'bob': [0, 1, 1, 1, 4],
+    'carl': [0, 0, 1, 2, 2],
+    'zoe': [0, 0, 0, 0, 0],
+    'zoë': [0, 0, 0, 0, 0],
+}
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DatabaseManager(backend=SQLiteBackend(str(tmp_path / 'duel_lords.db')))
+    manager.migrate()
+    # Two players whose names only differ by an accent can't be told apart in the log
+    for i, name in enumerate(EXPECTED, 1):
+        assert manager.register_player(str(i), name).success
+    yield manager
+    manager.close()
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = str(tmp_path / 'server.log')
+    shutil.copyfile(RECORDED_LOG, path)
+    return path
+
+def totals(db):
+    return {player.username: [getattr(player, field) for field in STAT_FIELDS]
+            for player in db.get_all_players()}
+
+def append(path, text):
+    with open(path, 'a', encoding='utf-8') as log:
+        log.write(text)
+
+def test_recorded_log(db, log_path):
+    result = LogIngestor(db, log_path).run_once()
+    assert (result.lines, result.events, result.players) == (20, 13, 3)
+    assert result.offset == os.path.getsize(log_path)
+    assert totals(db) == EXPECTED
+
+def test_unregistered_and_ambiguous_names_are_skipped(db, log_path):
+    result = LogIngestor(db, log_path).run_once()
+    # guest and Zoe are never credited, and results against them don't count for the other side
+    assert result.unmatched == 2
+    assert totals(db)['zoe'] == totals(db)['zoë'] == [0] * len(STAT_FIELDS)
+    assert totals(db)['carl'][:3] == [0, 0, 1]
+
+def test_restart_does_not_double_count(db, log_path):
+    LogIngestor(db, log_path, batch_lines=6).run_once()
+    again = LogIngestor(db, log_path).run_once()
+    assert (again.lines, again.events) == (0, 0)
+    assert totals(db) == EXPECTED
+
+    append(log_path, '2026-10-19 21:00:00 KILL "Bob" "Alice"\n')
+    again = LogIngestor(db, log_path).run_once()
+    assert (again.lines, again.events) == (1, 1)
+    assert totals(db)['bob'][3] == EXPECTED['bob'][3] + 1
+
+def test_partial_line_is_not_consumed(db, log_path):
+    size = os.path.getsize(log_path)
+    append(log_path, '2026-10-19 21:00:00 KILL "Bob" "Al')
+    result = LogIngestor(db, log_path).run_once()
+    assert result.offset == size
+    assert totals(db) == EXPECTED
+
+    # The rest of the line arrives before the next pass
+    append(log_path, 'ice"\n')
+    result = LogIngestor(db, log_path).run_once()
+    assert (result.lines, result.events) == (1, 1)
+    assert totals(db)['alice'][4] == EXPECTED['alice'][4] + 1
+
+def test_truncated_log_is_read_from_start(db, log_path):
+    LogIngestor(db, log_path).run_once()
+    # Truncated in place, so the file keeps its identity but shrinks below the offset
+    with open(log_path, 'w', encoding='utf-8') as log:
+        log.write('2026-10-20 20:00:00 RESULT "Bob" "Alice"\n')
+    result = LogIngestor(db, log_path).run_once()
+    assert (result.lines, result.events) == (1, 1)
+    assert totals(db)['bob'][0] == 1
+
+def test_rotated_log_is_read_from_start(db, log_path):
+    LogIngestor(db, log_path).run_once()
+    rotated = log_path + '.new'
+    shutil.copyfile(RECORDED_LOG, rotated)
+    os.replace(rotated, log_path)
+    result = LogIngestor(db, log_path).run_once()
+    assert result.lines == 20
+    assert totals(db) == {name: [2 * value for value in values] for name, values in EXPECTED.items()}
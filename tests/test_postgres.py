@@ -0,0 +1,155 @@
+"""
+Database operations against PostgreSQL
+Skipped unless DATABASE_URL points at a PostgreSQL server. Every test empties the database
+first, so point it at a scratch database.
+"""
+
+import os
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv('DATABASE_URL', '').startswith(('postgres://', 'postgresql://')),
+    reason="DATABASE_URL does not point at PostgreSQL"
+)
+
+@pytest.fixture
+def db():
+    from backends import backend_from_env
+    from database import DatabaseManager
+    from audit import PARTITION_PREFIX
+
+    backend = backend_from_env()
+    manager = DatabaseManager(backend=backend)
+    manager.migrate()
+    conn = backend.connect()
+    tables = [name for (name,) in conn.execute(backend.list_tables, ('%',)).fetchall()]
+    for table in tables:
+        if table.startswith(PARTITION_PREFIX):
+            conn.execute(f'DROP TABLE {table}')
+    conn.execute(f"TRUNCATE {', '.join(t for t in tables if not t.startswith(PARTITION_PREFIX))} "
+                 f"RESTART IDENTITY CASCADE")
+    conn.commit()
+    conn.close()
+    manager.migrate()
+    yield manager
+    manager.close()
+
+def register(db, *names):
+    for i, name in enumerate(names, 1):
+        assert db.register_player(str(i), name).success
+    return [str(i) for i in range(1, len(names) + 1)]
+
+def test_register_and_update(db):
+    alice, bob = register(db, 'alice', 'bob')
+    assert not db.register_player(alice, 'alice again').success
+
+    outcome = db.update_player_stats(alice, wins=2, kills=7, deaths=1, interaction_id=101)
+    assert outcome.success and not outcome.replayed
+    replay = db.update_player_stats(alice, wins=2, kills=7, deaths=1, interaction_id=101)
+    assert replay.success and replay.replayed
+
+    player = db.get_player(alice)
+    assert (player.wins, player.kills, player.deaths) == (2, 7, 1)
+    assert [p.discord_id for p in db.get_leaderboard(10)] == [alice, bob]
+    assert db.remove_player(bob).success
+    assert db.get_player(bob) is None
+
+def test_record_and_revert(db):
+    alice, bob = register(db, 'alice', 'bob')
+    assert db.record_match_result(alice, bob, 5, 3, played_at=datetime(2026, 1, 1)).success
+    outcome = db.record_match_result(alice, bob, 2, 2, played_at=datetime(2026, 2, 1), interaction_id=7)
+    assert outcome.success and db.record_match_result(alice, bob, 2, 2, interaction_id=7).replayed
+
+    player = db.get_player(alice)
+    assert (player.wins, player.draws, player.kills) == (1, 1, 7)
+    record = db.get_head_to_head(alice, bob)
+    assert (record['matches'], record['player1_wins'], record['draws']) == (2, 1, 1)
+    assert record['last_played_at'].startswith('2026-02-01')
+
+    assert db.revert_match_result(2).success
+    assert not db.revert_match_result(2).success
+    player = db.get_player(alice)
+    assert (player.wins, player.draws, player.kills) == (1, 0, 5)
+    assert db.get_head_to_head(alice, bob)['last_played_at'].startswith('2026-01-01')
+    assert [result.id for result in db.get_match_history(alice)] == [1]
+
+    # Recounting from the log gives the same totals
+    assert db.rebuild_player_stats()[0]
+    assert db.get_player(alice).kills == 5
+
+def test_rank_history(db):
+    alice, bob = register(db, 'alice', 'bob')
+    db.take_rank_snapshot()
+    db.update_player_stats(bob, wins=3)
+    db.take_rank_snapshot()
+    assert [point['rank'] for point in db.get_rank_history(bob)] == [2, 1]
+    assert [point['wins'] for point in db.get_rank_history(bob)] == [0, 3]
+
+def test_season(db):
+    from seasons import SeasonManager, season_report
+
+    alice, bob, carl = register(db, 'alice', 'bob', 'carl')
+    for kills in ((3, 1), (4, 2), (1, 0)):
+        db.record_match_result(alice, bob, *kills)
+    # Stats without any match result, as log ingestion adds them
+    db.update_player_stats(carl, kills=4, deaths=6)
+
+    result = SeasonManager(db, workers=1, award_min_matches=1).end_season("Season 1")
+    assert (result.players, result.matches) == (3, 3)
+    assert all(p.wins == p.kills == 0 for p in db.get_leaderboard(10))
+
+    standings = db.get_season_standings(result.season_id)
+    # Equal wins are ranked by kills, so carl's logged kills rank above bob's
+    assert [(s.username, s.rank, s.wins, s.matches, s.best_streak) for s in standings] == [
+        ('alice', 1, 3, 3, 3), ('carl', 2, 0, 0, 0), ('bob', 3, 0, 3, 0)
+    ]
+    awards = {award: standing.username for award, standing, _ in db.get_season_awards(result.season_id)}
+    assert awards['champion'] == awards['longest_streak'] == 'alice'
+    assert [season.season_id for season in db.get_player_seasons(alice)] == [result.season_id]
+
+    report = season_report(db, result.season_id)
+    json.dumps(report)
+    assert report['season']['status'] == 'final'
+    # Results from a finished season stay as they are
+    assert not db.revert_match_result(1).success
+
+def test_archive(db):
+    from archive import ArchiveManager
+
+    alice, bob = register(db, 'alice', 'bob')
+    db.schedule_match(alice, bob, datetime.utcnow() - timedelta(days=60))
+    db.remove_player(bob)
+    # A player with a match still scheduled is kept
+    assert ArchiveManager(db).run().players == 0
+
+    conn = db.backend.connect()
+    conn.execute("UPDATE matches SET status = 'completed'")
+    conn.commit()
+    conn.close()
+    result = ArchiveManager(db).run()
+    assert (result.players, result.matches, result.hot_players, result.hot_matches) == (1, 1, 1, 0)
+    assert not db.register_player(bob, 'bob').success
+
+def test_audit(db):
+    from audit import AuditLog, partition_for
+
+    audit = AuditLog(db.backend)
+    audit.record('update_stats', 1, player_id=2, wins=1)
+    audit.record('record_result', 1, player_id=2, opponent_id=3, result="Match result recorded! ID: 1")
+    audit.record('register_player', 4, player_id=5)
+
+    events = audit.query(player_id=3)
+    assert [event.action for event in events] == ['record_result']
+    assert isinstance(events[0].occurred_at, datetime)
+    assert events[0].details == {'result': "Match result recorded! ID: 1"}
+    assert len(audit.query(actor_id=1)) == 2
+    assert len(audit.query(since=datetime.utcnow() - timedelta(hours=1))) == 3
+
+    conn = db.backend.connect()
+    assert audit.partitions(conn) == [partition_for(datetime.utcnow())]
+    conn.close()
+    assert audit.drop_before(1) == 0
+    audit.close()
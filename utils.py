@@ -93,6 +93,30 @@ def create_progress_bar(current: int, total: int, length: int = 10) -> str:
     bar = "█" * filled + "░" * (length - filled)
     return f"{bar} {current}/{total}"
 
+def create_sparkline(values: list) -> str:
+    """Create a text sparkline from a series of numbers"""
+    if not values:
+        return ""
+    
+    blocks = "▁▂▃▄▅▆▇█"
+    low, high = min(values), max(values)
+    if high == low:
+        return blocks[len(blocks) // 2] * len(values)
+    
+    scale = (len(blocks) - 1) / (high - low)
+    return "".join(blocks[int((value - low) * scale)] for value in values)
+
+def leaderboard_text(players, limit: int = 10) -> str:
+    """Leaderboard lines with medals for the top three"""
+    medals = ["🥇", "🥈", "🥉"]
+    text = ""
+    for i, player in enumerate(players[:limit]):
+        medal = medals[i] if i < 3 else f"#{i+1}"
+        text += f"{medal} **{player.username}**\n"
+        text += f"   🏆 {player.wins}W-{player.losses}L-{player.draws}D ({player.win_rate:.1f}%)\n"
+        text += f"   ⚔️ {player.kills} kills | 💀 {player.deaths} deaths\n\n"
+    return text
+
 def truncate_text(text: str, max_length: int = 100) -> str:
     """Truncate text to specified length"""
     if len(text) <= max_length:
@@ -0,0 +1,147 @@
+"""
+Single writer for database mutations
+Every write in a process is queued to one thread that owns the only write connection.
+Writes waiting in the queue are applied together in one transaction, each inside its own
+savepoint so a failing write is rolled back alone, and committed once; callers get a
+Future that resolves after the commit. With SQLite this replaces many connections racing
+for the file lock, and their "database is locked" errors, with one committer.
+"""
+
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+class WriteActor:
+    """Thread that applies queued write functions to its own connection, group-committing them"""
+
+    def __init__(self, backend, max_batch: int = 256):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.commits = 0
+        self.writes = 0
+        self.largest_group = 0
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._thread = None
+
+    def submit(self, fn) -> Future:
+        """Queue fn(cursor) to run in the next group; the Future holds its result once committed"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                    self._thread.start()
+        if threading.current_thread() is self._thread:
+            # Waiting on our own queue would never return
+            raise RuntimeError("Writes cannot be submitted from inside another write")
+        future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def run(self, fn):
+        """Apply fn(cursor) in the writer and wait for its commit; re-raises what fn raised"""
+        return self.submit(fn).result()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = self.backend.connect(named_rows=True)
+        return self._conn
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            group = [item]
+            # Whatever queued up while the last group committed goes into this one
+            while len(group) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                group.append(item)
+            self._commit(group)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _commit(self, group):
+        outcomes = []
+        try:
+            conn = self._connection()
+            cursor = conn.cursor()
+            self.backend.begin_write(cursor)
+            for fn, future in group:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                cursor.execute('SAVEPOINT write_op')
+                try:
+                    result = fn(cursor)
+                except Exception as e:
+                    cursor.execute('ROLLBACK TO SAVEPOINT write_op')
+                    cursor.execute('RELEASE SAVEPOINT write_op')
+                    outcomes.append((future, None, e))
+                else:
+                    cursor.execute('RELEASE SAVEPOINT write_op')
+                    outcomes.append((future, result, None))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error committing a group of {len(group)} writes: {e}")
+            # The connection may be unusable; the next group opens a fresh one
+            if self._conn is not None:
+                try:
+                    self._conn.rollback()
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.commits += 1
+        self.writes += len(outcomes)
+        self.largest_group = max(self.largest_group, len(outcomes))
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            'commits': self.commits,
+            'writes': self.writes,
+            'largest_group': self.largest_group,
+            'queued': self._queue.qsize(),
+        }
+
+    def close(self):
+        """Commit what is queued and stop the thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def writer_for(backend) -> WriteActor:
+    """The process's WriteActor for backend's database, shared by every manager"""
+    key = os.path.abspath(backend.db_path) if backend.db_path else id(backend)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = WriteActor(backend)
+            _writers[key] = writer
+        return writer